@@ -1,13 +1,18 @@
 @echo off
 
+REM Programador de tareas de Flota (alertas, caches y exportaciones).
+REM Es un proceso de larga duracion: configurar en el Programador de tareas
+REM de Windows para que se inicie una sola vez al arrancar el equipo.
+REM Los horarios se definen en FLOTA_TAREAS (flota/settings.py).
+
 REM Activar el entorno virtual
 call C:\Users\JuanPabloZapataChava\Flota\venv\Scripts\activate
 
 REM Ir al proyecto
 cd C:\Users\JuanPabloZapataChava\Flota
 
-REM Ejecutar el comando
-python manage.py enviar_alertas_documentos --dias 30
+REM Ejecutar el programador
+python manage.py programador
 
 REM Desactivar el entorno virtual
 deactivate
@@ -58,10 +58,13 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # WhiteNoise para static files
+    'gestion_flota.middleware.InstrumentacionMiddleware',  # tiempos por request (ver instrumentacion.py)
+    'gestion_flota.middleware.ConexionBDMiddleware',  # adquisición de la conexión (Server-Timing)
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'gestion_flota.middleware.EmpresaMiddleware',  # empresa actual (multiempresa)
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -86,6 +89,8 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'gestion_flota.context_processors.roles',
+                'gestion_flota.context_processors.empresas',
             ],
         },
     },
@@ -98,11 +103,41 @@ WSGI_APPLICATION = 'flota.wsgi.application'
 # Base de datos
 # =========================
 
+# Manejo de conexiones en PostgreSQL (DB_CONEXIONES):
+# - 'persistentes': cada worker reutiliza su conexión hasta DB_CONN_MAX_AGE
+#   segundos, verificándola en la primera consulta de cada request
+#   (health checks).
+# - 'pool': pool de conexiones de psycopg 3 (requiere 'psycopg[pool]' en
+#   lugar de psycopg2). Es lo recomendado con FLOTA_SERVIDOR=asgi.
+# - 'nuevas': una conexión por request (comportamiento anterior).
+# Con ASGI las conexiones persistentes no se reutilizan bien entre hilos:
+# el valor por defecto ahí es 'nuevas'.
+DB_CONEXIONES = os.environ.get(
+    "DB_CONEXIONES",
+    "nuevas" if os.environ.get("FLOTA_SERVIDOR") == "asgi" else "persistentes",
+)
+DB_CONN_MAX_AGE = int(os.environ.get("DB_CONN_MAX_AGE", "600"))
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", "2"))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", "10"))
+DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", "10"))
+
 if os.environ.get("DATABASE_URL"):
     # Producción: usar PostgreSQL
     DATABASES = {
-        'default': dj_database_url.parse(os.environ["DATABASE_URL"])
+        'default': dj_database_url.parse(
+            os.environ["DATABASE_URL"],
+            conn_max_age=DB_CONN_MAX_AGE if DB_CONEXIONES == "persistentes" else 0,
+            conn_health_checks=DB_CONEXIONES == "persistentes",
+        )
     }
+    if DB_CONEXIONES == "pool":
+        # El pool exige CONN_MAX_AGE = 0: Django devuelve la conexión al pool
+        # al terminar cada request
+        DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+            'min_size': DB_POOL_MIN,
+            'max_size': DB_POOL_MAX,
+            'timeout': DB_POOL_TIMEOUT,
+        }
 else:
     # Desarrollo local: SQLite
     DATABASES = {
@@ -113,6 +148,33 @@ else:
     }
 
 
+# =========================
+# Caché
+# =========================
+
+if os.environ.get("REDIS_URL"):
+    # Producción: caché compartida entre workers (requiere el paquete 'redis')
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+else:
+    # Desarrollo local: caché en memoria del proceso
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "flota",
+        }
+    }
+
+# Con la caché en memoria cada proceso tiene su copia y las señales no la
+# invalidan en los demás: las claves invalidadas por señales viven como
+# mucho esto (segundos). Ver gestion_flota/cache_compartida.py
+CACHE_LOCAL_TIMEOUT = int(os.environ.get("CACHE_LOCAL_TIMEOUT", 60))
+
+
 # =========================
 # Password validators
 # =========================
@@ -177,6 +239,139 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 
+# =========================
+# Exportaciones en segundo plano
+# =========================
+
+# Archivos generados (CSV comprimido / XLSX); no se sirven como media pública
+EXPORTACIONES_ROOT = os.environ.get("EXPORTACIONES_ROOT", BASE_DIR / "exportaciones")
+
+# Segundos durante los que una exportación idéntica reutiliza el archivo ya generado
+EXPORTACIONES_TTL = int(os.environ.get("EXPORTACIONES_TTL", 600))
+
+# Un trabajo 'procesando' sin latido del worker en este tiempo (segundos) se
+# da por abandonado: se vuelve a encolar hasta EXPORTACIONES_INTENTOS veces
+EXPORTACIONES_RECLAMO_TIMEOUT = int(os.environ.get("EXPORTACIONES_RECLAMO_TIMEOUT", 300))
+EXPORTACIONES_INTENTOS = int(os.environ.get("EXPORTACIONES_INTENTOS", 3))
+
+# Lanza un proceso worker local al encolar (si no hay un worker dedicado corriendo)
+EXPORTACIONES_LANZAR_WORKER = os.environ.get("EXPORTACIONES_LANZAR_WORKER", "True") == "True"
+
+# Filas por lote (y por transacción) en la importación masiva
+IMPORTACION_LOTE = int(os.environ.get("IMPORTACION_LOTE", 1000))
+
+# Días que se conservan los eventos de borrado del registro de cambios
+# (un cliente más atrasado que esto debe resincronizar desde cero)
+CAMBIOS_RETENCION_BORRADOS_DIAS = int(os.environ.get("CAMBIOS_RETENCION_BORRADOS_DIAS", 30))
+
+
+# =========================
+# Subidas directas de archivos (ver gestion_flota/subidas.py)
+# =========================
+
+# Backend de URLs firmadas; DestinoLocal recibe los archivos en SUBIDAS_ROOT
+SUBIDAS_DESTINO = os.environ.get("SUBIDAS_DESTINO", "gestion_flota.subidas.DestinoLocal")
+SUBIDAS_ROOT = os.environ.get("SUBIDAS_ROOT", BASE_DIR / "subidas")
+
+# Validez de la URL firmada (segundos) y tamaño máximo por archivo (bytes)
+SUBIDAS_TTL = int(os.environ.get("SUBIDAS_TTL", 900))
+SUBIDAS_TAMANO_MAX = int(os.environ.get("SUBIDAS_TAMANO_MAX", 20 * 1024 * 1024))
+
+# Una subida (o unas miniaturas) 'procesando' sin terminar en este tiempo
+# (segundos) se da por abandonada: se vuelve a encolar hasta SUBIDAS_INTENTOS veces
+SUBIDAS_RECLAMO_TIMEOUT = int(os.environ.get("SUBIDAS_RECLAMO_TIMEOUT", 300))
+SUBIDAS_INTENTOS = int(os.environ.get("SUBIDAS_INTENTOS", 3))
+
+# Lanza un worker local al asociar una subida (como las exportaciones)
+SUBIDAS_LANZAR_WORKER = os.environ.get("SUBIDAS_LANZAR_WORKER", "True") == "True"
+
+
+# =========================
+# Tareas programadas (manage.py programador)
+# =========================
+
+# La recolección semanal de archivos huérfanos solo los lista, salvo que se
+# active el borrado
+RECOLECTAR_ARCHIVOS_BORRAR = os.environ.get("RECOLECTAR_ARCHIVOS_BORRAR", "False") == "True"
+
+# cron: "minuto hora día-mes mes día-semana" en TIME_ZONE
+FLOTA_TAREAS = {
+    # Rollover del estado de documentos: antes que las cachés y las alertas
+    'estados_documentos': {
+        'cron': '0 0 * * *',
+        'comando': 'actualizar_estados_documentos',
+    },
+    'alertas_documentos': {
+        'cron': '0 7 * * *',
+        'comando': 'enviar_alertas_documentos',
+    },
+    'calentar_caches': {
+        'cron': '1 0 * * *',
+        'funcion': 'gestion_flota.services.calentar_caches',
+    },
+    'exportaciones': {
+        'cron': '* * * * *',
+        'comando': 'procesar_exportaciones',
+        'args': ['--una-vez'],
+    },
+    'subidas': {
+        'cron': '* * * * *',
+        'comando': 'procesar_subidas',
+        'args': ['--una-vez'],
+    },
+    'cambios': {
+        'cron': '15 2 * * *',
+        'comando': 'compactar_cambios',
+        'args': [],
+    },
+    'historial_tareas': {
+        'cron': '45 3 * * *',
+        'funcion': 'gestion_flota.programador.purgar_ejecuciones',
+    },
+    'archivos_huerfanos': {
+        'cron': '30 3 * * 0',
+        'comando': 'recolectar_archivos',
+        'args': ['--borrar'] if RECOLECTAR_ARCHIVOS_BORRAR else [],
+    },
+}
+
+# Días que se conserva el historial de ejecuciones (EjecucionTarea)
+PROGRAMADOR_RETENCION_DIAS = int(os.environ.get("PROGRAMADOR_RETENCION_DIAS", 14))
+
+
+# =========================
+# Instrumentación de requests (ver gestion_flota/instrumentacion.py)
+# =========================
+
+# Requests más lentos que esto (ms) se escriben en el log 'gestion_flota.lentos'
+INSTRUMENTACION_LENTO_MS = int(os.environ.get("FLOTA_REQUEST_LENTO_MS", 1000))
+
+# Muestras que guarda cada proceso por vista para los percentiles
+INSTRUMENTACION_MUESTRAS = int(os.environ.get("INSTRUMENTACION_MUESTRAS", 200))
+
+# Cada cuánto (segundos) publica cada proceso sus agregados en la caché
+INSTRUMENTACION_PUBLICAR_SEGUNDOS = int(os.environ.get("INSTRUMENTACION_PUBLICAR_SEGUNDOS", 30))
+
+# Token de /metrics (Prometheus: 'Authorization: Bearer <token>'); sin él,
+# /metrics solo la ve el staff con sesión
+METRICAS_TOKEN = os.environ.get("FLOTA_METRICAS_TOKEN", "")
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'consola': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'gestion_flota.lentos': {
+            'handlers': ['consola'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+
 # =========================
 # Config general
 # =========================
@@ -197,8 +392,29 @@ LOGOUT_REDIRECT_URL = 'login'
 # Email (desarrollo)
 # =========================
 
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+EMAIL_BACKEND = os.environ.get(
+    "EMAIL_BACKEND",
+    'django.core.mail.backends.console.EmailBackend'
+)
 DEFAULT_FROM_EMAIL = 'flotadmin@miempresa.com'
 
-# Correo al que llegarán las alertas
+# Servidor SMTP (con EMAIL_BACKEND=django.core.mail.backends.smtp.EmailBackend);
+# para pruebas locales sirve un SMTP de prueba, ej. `python -m aiosmtpd -n -l localhost:1025`
+EMAIL_HOST = os.environ.get("EMAIL_HOST", "localhost")
+EMAIL_PORT = int(os.environ.get("EMAIL_PORT", 25))
+EMAIL_HOST_USER = os.environ.get("EMAIL_HOST_USER", "")
+EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD", "")
+EMAIL_USE_TLS = os.environ.get("EMAIL_USE_TLS", "False") == "True"
+
+# Correo al que llegarán las alertas de vehículos sin responsable_email
 ALERTAS_EMAIL_DESTINO = 'tu.correo@miempresa.com'
+
+# Despacho de alertas: hilos en paralelo (cada uno con su conexión SMTP),
+# reintentos con backoff exponencial y límite global de mensajes por segundo (0 = sin límite)
+ALERTAS_CONCURRENCIA = int(os.environ.get("ALERTAS_CONCURRENCIA", 4))
+ALERTAS_REINTENTOS = int(os.environ.get("ALERTAS_REINTENTOS", 3))
+ALERTAS_BACKOFF = float(os.environ.get("ALERTAS_BACKOFF", 2))
+ALERTAS_MAX_POR_SEGUNDO = float(os.environ.get("ALERTAS_MAX_POR_SEGUNDO", 0))
+
+# Umbrales (días antes del vencimiento) que disparan una alerta; 'vencido' siempre aplica
+ALERTAS_UMBRALES = [30, 7]
@@ -1,20 +1,104 @@
 from django.contrib import admin
-from .models import Vehiculo, TipoDocumento, DocumentoVehiculo
+from .models import (
+    AlertaDocumento,
+    ArchivoContenido,
+    CambioFlota,
+    CompactacionCambios,
+    CorreoFallido,
+    DocumentoVehiculo,
+    EjecucionAlertas,
+    EjecucionTarea,
+    Empresa,
+    ExportacionJob,
+    Importacion,
+    SubidaArchivo,
+    TipoDocumento,
+    Vehiculo,
+)
+
+@admin.register(Empresa)
+class EmpresaAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'slug', 'activa', 'creado_en')
+    list_filter = ('activa',)
+    prepopulated_fields = {'slug': ('nombre',)}
+    filter_horizontal = ('usuarios',)
+
 
 @admin.register(Vehiculo)
 class VehiculoAdmin(admin.ModelAdmin):
-    list_display = ('placa', 'marca', 'modelo', 'anio', 'tipo', 'activo')
+    list_display = ('placa', 'marca', 'modelo', 'anio', 'tipo', 'activo', 'empresa')
     search_fields = ('placa', 'marca', 'modelo')
-    list_filter = ('activo', 'tipo')
+    list_filter = ('activo', 'tipo', 'empresa')
 
 
 @admin.register(TipoDocumento)
 class TipoDocumentoAdmin(admin.ModelAdmin):
-    list_display = ('nombre',)
+    list_display = ('nombre', 'dias_alerta', 'empresa')
+    list_filter = ('empresa',)
 
 
 @admin.register(DocumentoVehiculo)
 class DocumentoVehiculoAdmin(admin.ModelAdmin):
     list_display = ('vehiculo', 'tipo', 'fecha_vencimiento', 'estado')
-    list_filter = ('tipo', 'fecha_vencimiento')
+    list_filter = ('estado', 'tipo', 'fecha_vencimiento', 'empresa')
     search_fields = ('vehiculo__placa',)
+
+
+@admin.register(ExportacionJob)
+class ExportacionJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'formato', 'filtro', 'estado', 'intentos', 'filas', 'bytes', 'duracion', 'creado_en')
+    list_filter = ('estado', 'tipo', 'formato')
+
+
+@admin.register(AlertaDocumento)
+class AlertaDocumentoAdmin(admin.ModelAdmin):
+    list_display = ('documento', 'umbral', 'fecha_vencimiento', 'destinatario', 'detectado_en', 'notificado_en')
+    list_filter = ('umbral',)
+    search_fields = ('documento__vehiculo__placa', 'destinatario')
+
+
+@admin.register(EjecucionAlertas)
+class EjecucionAlertasAdmin(admin.ModelAdmin):
+    list_display = ('iniciado_en', 'fecha_corte', 'completada', 'documentos', 'mensajes', 'destinatarios', 'segundos')
+
+
+@admin.register(CorreoFallido)
+class CorreoFallidoAdmin(admin.ModelAdmin):
+    list_display = ('destinatarios', 'asunto', 'intentos', 'creado_en', 'reenviado_en')
+    search_fields = ('destinatarios',)
+
+
+@admin.register(EjecucionTarea)
+class EjecucionTareaAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'programada_para', 'propietario', 'exitosa', 'duracion', 'terminado_en')
+    list_filter = ('nombre', 'exitosa')
+
+
+@admin.register(Importacion)
+class ImportacionAdmin(admin.ModelAdmin):
+    list_display = ('nombre_archivo', 'tipo', 'filas', 'creados', 'actualizados', 'errores', 'duracion', 'creado_en')
+    list_filter = ('tipo',)
+
+
+@admin.register(SubidaArchivo)
+class SubidaArchivoAdmin(admin.ModelAdmin):
+    list_display = ('nombre_original', 'destino', 'estado', 'tamano', 'creado_por', 'creado_en', 'terminado_en')
+    list_filter = ('destino', 'estado')
+    search_fields = ('nombre_original', 'token')
+
+
+@admin.register(ArchivoContenido)
+class ArchivoContenidoAdmin(admin.ModelAdmin):
+    list_display = ('sha256', 'tamano', 'nombre', 'creado_en')
+    search_fields = ('sha256', 'nombre')
+
+
+@admin.register(CambioFlota)
+class CambioFlotaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'secuencia', 'modelo', 'objeto_id', 'operacion', 'creado_en')
+    list_filter = ('modelo', 'operacion')
+
+
+@admin.register(CompactacionCambios)
+class CompactacionCambiosAdmin(admin.ModelAdmin):
+    list_display = ('ejecutada_en', 'piso', 'reemplazados', 'borrados_descartados', 'restantes')
@@ -0,0 +1,449 @@
+import base64
+import hashlib
+from datetime import date
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.contrib.auth import authenticate
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition
+
+from .cambios import CAMPOS_CAMBIO, leer_cambios, piso_cambios
+from .empresas import activar_empresa, empresa_actual_id, resolver_empresa
+from .models import DocumentoVehiculo, ESTADOS_POR_FILTRO, TipoDocumento, Vehiculo
+from .paginacion import paginar_por_cursor
+from .permissions import user_is_lectura, user_is_operador
+from .services import asegurar_estados_al_dia
+
+# =========================
+# API JSON de solo lectura (v1)
+# =========================
+#
+# /api/v1/vehiculos/, /api/v1/documentos/, /api/v1/tipos-documento/
+# /api/v1/cambios/ (sincronización incremental, ver cambios.py)
+#
+# - ?campos=placa,marca elige los campos de cada resultado.
+# - Paginación por cursor: la respuesta trae las URLs 'siguiente'/'anterior'.
+# - ETag y Last-Modified salen de un agregado (conteo + último actualizado_en)
+#   sobre el mismo filtro: si el cliente manda If-None-Match y nada cambió,
+#   se responde 304 sin ejecutar la consulta de la página.
+# - Autenticación: sesión de Django o HTTP Basic (integraciones).
+
+VERSION_API = 'v1'
+
+LIMITE_POR_DEFECTO = 100
+LIMITE_MAXIMO = 500
+
+# El feed de cambios entrega lotes más grandes (eventos compactos)
+LIMITE_CAMBIOS_POR_DEFECTO = 1000
+LIMITE_CAMBIOS_MAXIMO = 5000
+
+
+def _url_archivo(archivo):
+    return archivo.url if archivo else None
+
+
+CAMPOS_VEHICULO = {
+    'id': lambda v: v.id,
+    'placa': lambda v: v.placa,
+    'marca': lambda v: v.marca,
+    'modelo': lambda v: v.modelo,
+    'anio': lambda v: v.anio,
+    'tipo': lambda v: v.tipo,
+    'activo': lambda v: v.activo,
+    'responsable_nombre': lambda v: v.responsable_nombre,
+    'responsable_email': lambda v: v.responsable_email,
+    'foto': lambda v: _url_archivo(v.foto),
+    'estado_documentos': lambda v: v.estado_documentos,
+    'creado_en': lambda v: v.creado_en,
+    'actualizado_en': lambda v: v.actualizado_en,
+}
+
+CAMPOS_DOCUMENTO = {
+    'id': lambda d: d.id,
+    'vehiculo': lambda d: d.vehiculo_id,
+    'placa': lambda d: d.vehiculo.placa,
+    'tipo': lambda d: d.tipo_id,
+    'tipo_nombre': lambda d: d.tipo.nombre,
+    'fecha_expedicion': lambda d: d.fecha_expedicion,
+    'fecha_vencimiento': lambda d: d.fecha_vencimiento,
+    'estado': lambda d: d.estado,
+    'archivo': lambda d: _url_archivo(d.archivo),
+    'creado_en': lambda d: d.creado_en,
+    'actualizado_en': lambda d: d.actualizado_en,
+}
+
+CAMPOS_TIPO = {
+    'id': lambda t: t.id,
+    'nombre': lambda t: t.nombre,
+    'descripcion': lambda t: t.descripcion,
+    'dias_alerta': lambda t: t.dias_alerta,
+    'actualizado_en': lambda t: t.actualizado_en,
+}
+
+
+# =========================
+# Autenticación y errores
+# =========================
+
+def _usuario_basic(request):
+    cabecera = request.headers.get('Authorization', '')
+    tipo, _, credenciales = cabecera.partition(' ')
+    if tipo.lower() != 'basic' or not credenciales:
+        return None
+    try:
+        usuario, _, clave = base64.b64decode(credenciales).decode().partition(':')
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return authenticate(request, username=usuario, password=clave)
+
+
+def _puede_leer(user):
+    # Mismas reglas que las vistas HTML: cualquier rol de flota puede leer
+    return user_is_operador(user) or user_is_lectura(user)
+
+
+def vista_api(vista):
+    """
+    Envuelve una vista de la API: solo GET/HEAD, usuario autenticado (sesión
+    o Basic), ValueError o ValidationError -> 400 y cabeceras de caché para revalidar siempre.
+    """
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return JsonResponse({'error': "Método no permitido."}, status=405, headers={'Allow': 'GET, HEAD'})
+
+        if not request.user.is_authenticated:
+            usuario = _usuario_basic(request)
+            if usuario is None:
+                return JsonResponse(
+                    {'error': "Autenticación requerida."},
+                    status=401,
+                    headers={'WWW-Authenticate': 'Basic realm="flota"'},
+                )
+            request.user = usuario
+            # EmpresaMiddleware no conocía al usuario de la cabecera
+            request.empresa_id = resolver_empresa(request)
+            activar_empresa(request.empresa_id)
+        if not _puede_leer(request.user):
+            return JsonResponse({'error': "No tienes permiso para leer la flota."}, status=403)
+
+        try:
+            response = vista(request, *args, **kwargs)
+        except ValueError as exc:
+            return JsonResponse({'error': str(exc)}, status=400)
+        except ValidationError as exc:
+            return JsonResponse({'error': ' '.join(exc.messages)}, status=400)
+        except Http404:
+            return JsonResponse({'error': "No encontrado."}, status=404)
+
+        response['Cache-Control'] = 'private, no-cache'
+        response['Vary'] = 'Authorization, Cookie'
+        return response
+    return envoltura
+
+
+# =========================
+# Parámetros
+# =========================
+
+def _campos(request, disponibles):
+    pedidos = request.GET.get('campos')
+    if not pedidos:
+        return list(disponibles)
+    campos = [c.strip() for c in pedidos.split(',') if c.strip()]
+    desconocidos = [c for c in campos if c not in disponibles]
+    if desconocidos:
+        raise ValueError(f"Campos desconocidos: {', '.join(desconocidos)}.")
+    return campos
+
+
+def _entero(request, nombre):
+    valor = request.GET.get(nombre)
+    if not valor:
+        return None
+    try:
+        return int(valor)
+    except ValueError:
+        raise ValueError(f"'{nombre}' debe ser un número entero.")
+
+
+def _fecha(request, nombre):
+    valor = request.GET.get(nombre)
+    if not valor:
+        return None
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise ValueError(f"'{nombre}' debe tener el formato AAAA-MM-DD.")
+
+
+def _fecha_hora(request, nombre):
+    valor = request.GET.get(nombre)
+    if not valor:
+        return None
+    fecha_hora = parse_datetime(valor)
+    if fecha_hora is None:
+        raise ValueError(f"'{nombre}' debe ser una fecha y hora ISO 8601.")
+    return fecha_hora
+
+
+def _booleano(request, nombre):
+    valor = request.GET.get(nombre)
+    if valor is None or valor == '':
+        return None
+    if valor.lower() in ('1', 'true', 'si', 'sí'):
+        return True
+    if valor.lower() in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f"'{nombre}' debe ser true o false.")
+
+
+def _limite(request):
+    limite = _entero(request, 'limite') or LIMITE_POR_DEFECTO
+    return max(1, min(limite, LIMITE_MAXIMO))
+
+
+# =========================
+# Filtros
+# =========================
+
+def _vehiculos_filtrados(request):
+    vehiculos = Vehiculo.objects.buscar(request.GET.get('q'))
+    activo = _booleano(request, 'activo')
+    if activo is not None:
+        vehiculos = vehiculos.filter(activo=activo)
+    if request.GET.get('tipo'):
+        vehiculos = vehiculos.filter(tipo__iexact=request.GET['tipo'])
+    desde = _fecha_hora(request, 'actualizado_desde')
+    if desde:
+        vehiculos = vehiculos.filter(actualizado_en__gte=desde)
+    return vehiculos
+
+
+def _documentos_filtrados(request):
+    documentos = DocumentoVehiculo.objects.all()
+
+    estado = request.GET.get('estado')
+    if estado:
+        # Acepta el filtro de los listados ('vencidos') o el estado ('vencido')
+        estado = ESTADOS_POR_FILTRO.get(estado, estado)
+        if estado not in ESTADOS_POR_FILTRO.values():
+            raise ValueError("'estado' debe ser vencido, proximo o vigente.")
+        documentos = documentos.filter(estado=estado)
+
+    tipo = _entero(request, 'tipo')
+    if tipo is not None:
+        documentos = documentos.filter(tipo_id=tipo)
+    vehiculo = _entero(request, 'vehiculo')
+    if vehiculo is not None:
+        documentos = documentos.filter(vehiculo_id=vehiculo)
+
+    desde = _fecha(request, 'vence_desde')
+    if desde:
+        documentos = documentos.filter(fecha_vencimiento__gte=desde)
+    hasta = _fecha(request, 'vence_hasta')
+    if hasta:
+        documentos = documentos.filter(fecha_vencimiento__lte=hasta)
+    actualizado = _fecha_hora(request, 'actualizado_desde')
+    if actualizado:
+        documentos = documentos.filter(actualizado_en__gte=actualizado)
+    return documentos
+
+
+# =========================
+# ETag / Last-Modified
+# =========================
+
+def condicional(calcular_marca):
+    """
+    Decorador: ETag y Last-Modified a partir de calcular_marca(request, ...),
+    que devuelve (valores_que_identifican_la_version, ultima_modificacion).
+    La marca se calcula una vez por request aunque la pidan ambas funciones.
+    """
+    def _marca(request, *args, **kwargs):
+        if not hasattr(request, '_marca_api'):
+            # El estado de los documentos debe estar al día antes de medirlo
+            asegurar_estados_al_dia()
+            valores, ultima = calcular_marca(request, *args, **kwargs)
+            clave = repr((VERSION_API, empresa_actual_id(), request.path, sorted(request.GET.lists()), valores))
+            request._marca_api = (hashlib.sha1(clave.encode()).hexdigest(), ultima)
+        return request._marca_api
+
+    return condition(
+        etag_func=lambda request, *args, **kwargs: _marca(request, *args, **kwargs)[0],
+        last_modified_func=lambda request, *args, **kwargs: _marca(request, *args, **kwargs)[1],
+    )
+
+
+def _ultima(*fechas):
+    fechas = [f for f in fechas if f is not None]
+    return max(fechas) if fechas else None
+
+
+def _marca_vehiculos(request):
+    agregado = _vehiculos_filtrados(request).order_by().aggregate(
+        total=Count('id'),
+        ultimo=Max('actualizado_en'),
+    )
+    ultima = agregado['ultimo']
+    if 'estado_documentos' in _campos(request, CAMPOS_VEHICULO):
+        documentos = DocumentoVehiculo.objects.order_by().aggregate(
+            total=Count('id'),
+            ultimo=Max('actualizado_en'),
+        )
+        agregado['documentos'] = documentos
+        ultima = _ultima(ultima, documentos['ultimo'])
+    return agregado, ultima
+
+
+def _marca_vehiculo(request, pk):
+    agregado = Vehiculo.objects.filter(pk=pk).aggregate(
+        ultimo=Max('actualizado_en'),
+        total_documentos=Count('documentos'),
+        ultimo_documento=Max('documentos__actualizado_en'),
+    )
+    return agregado, _ultima(agregado['ultimo'], agregado['ultimo_documento'])
+
+
+def _marca_documentos(request):
+    # La placa y el nombre del tipo salen en cada documento
+    agregado = _documentos_filtrados(request).order_by().aggregate(
+        total=Count('id'),
+        ultimo=Max('actualizado_en'),
+        ultimo_vehiculo=Max('vehiculo__actualizado_en'),
+        ultimo_tipo=Max('tipo__actualizado_en'),
+    )
+    return agregado, _ultima(agregado['ultimo'], agregado['ultimo_vehiculo'], agregado['ultimo_tipo'])
+
+
+def _marca_documento(request, pk):
+    fila = (
+        DocumentoVehiculo.objects.filter(pk=pk)
+        .values_list('actualizado_en', 'vehiculo__actualizado_en', 'tipo__actualizado_en')
+        .first()
+    )
+    return fila, _ultima(*(fila or ()))
+
+
+def _marca_tipos(request):
+    agregado = TipoDocumento.objects.order_by().aggregate(
+        total=Count('id'),
+        ultimo=Max('actualizado_en'),
+    )
+    return agregado, agregado['ultimo']
+
+
+# =========================
+# Respuestas
+# =========================
+
+def _serializar(objeto, campos, disponibles):
+    return {campo: disponibles[campo](objeto) for campo in campos}
+
+
+def _url_pagina(request, cursor):
+    if cursor is None:
+        return None
+    parametros = request.GET.copy()
+    parametros['cursor'] = cursor
+    return request.build_absolute_uri(f"{request.path}?{urlencode(sorted(parametros.items()))}")
+
+
+def _respuesta_paginada(request, queryset, orden, campos, disponibles):
+    pagina = paginar_por_cursor(
+        queryset,
+        orden,
+        cursor=request.GET.get('cursor'),
+        por_pagina=_limite(request),
+        estricto=True,
+    )
+    return JsonResponse({
+        'resultados': [_serializar(obj, campos, disponibles) for obj in pagina],
+        'siguiente': _url_pagina(request, pagina.cursor_siguiente),
+        'anterior': _url_pagina(request, pagina.cursor_anterior),
+    })
+
+
+# =========================
+# Vistas
+# =========================
+
+@vista_api
+@condicional(_marca_vehiculos)
+def vehiculos(request):
+    campos = _campos(request, CAMPOS_VEHICULO)
+    queryset = _vehiculos_filtrados(request)
+    if 'estado_documentos' in campos:
+        queryset = queryset.con_estado_documentos()
+    return _respuesta_paginada(request, queryset, ('placa', 'id'), campos, CAMPOS_VEHICULO)
+
+
+@vista_api
+@condicional(_marca_vehiculo)
+def vehiculo(request, pk):
+    campos = _campos(request, CAMPOS_VEHICULO)
+    objeto = get_object_or_404(Vehiculo.objects.con_estado_documentos(), pk=pk)
+    return JsonResponse(_serializar(objeto, campos, CAMPOS_VEHICULO))
+
+
+@vista_api
+@condicional(_marca_documentos)
+def documentos(request):
+    campos = _campos(request, CAMPOS_DOCUMENTO)
+    queryset = _documentos_filtrados(request).select_related('vehiculo', 'tipo')
+    return _respuesta_paginada(request, queryset, ('fecha_vencimiento', 'id'), campos, CAMPOS_DOCUMENTO)
+
+
+@vista_api
+@condicional(_marca_documento)
+def documento(request, pk):
+    campos = _campos(request, CAMPOS_DOCUMENTO)
+    objeto = get_object_or_404(DocumentoVehiculo.objects.select_related('vehiculo', 'tipo'), pk=pk)
+    return JsonResponse(_serializar(objeto, campos, CAMPOS_DOCUMENTO))
+
+
+@vista_api
+@condicional(_marca_tipos)
+def tipos_documento(request):
+    campos = _campos(request, CAMPOS_TIPO)
+    return JsonResponse({
+        'resultados': [_serializar(t, campos, CAMPOS_TIPO) for t in TipoDocumento.objects.all()],
+    })
+
+
+@vista_api
+@gzip_page
+def cambios(request):
+    """
+    Eventos del registro de cambios posteriores a ?desde=<secuencia>.
+    El cliente guarda 'ultimo' y lo manda como 'desde' en la siguiente
+    llamada; mientras 'hay_mas' sea true, puede pedir el siguiente lote.
+    410 si la secuencia ya se compactó (hay que empezar de nuevo en 0).
+    """
+    desde = _entero(request, 'desde') or 0
+    limite = _entero(request, 'limite') or LIMITE_CAMBIOS_POR_DEFECTO
+    limite = max(1, min(limite, LIMITE_CAMBIOS_MAXIMO))
+    modelos = [m for m in request.GET.get('modelos', '').split(',') if m]
+    desconocidos = [m for m in modelos if m not in CAMPOS_CAMBIO]
+    if desconocidos:
+        raise ValueError(f"Modelos desconocidos: {', '.join(desconocidos)}.")
+
+    try:
+        filas, hay_mas = leer_cambios(desde, limite, modelos)
+    except LookupError as exc:
+        return JsonResponse({'error': str(exc), 'piso': piso_cambios()}, status=410)
+
+    return JsonResponse({
+        'cambios': [
+            {'seq': seq, 'modelo': modelo, 'id': objeto_id, 'op': operacion, 'datos': datos}
+            for seq, modelo, objeto_id, operacion, datos in filas
+        ],
+        'ultimo': filas[-1][0] if filas else desde,
+        'hay_mas': hay_mas,
+    })
@@ -0,0 +1,18 @@
+from django.apps import AppConfig
+
+
+class GestionFlotaConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'gestion_flota'
+    verbose_name = "Gestión de flota"
+
+    def ready(self):
+        # Conecta los receivers de invalidación de caché
+        from . import signals  # noqa: F401
+
+        # Aviso de manage.py check --deploy si la caché no es compartida
+        from . import cache_compartida  # noqa: F401
+
+        # Ganchos de la instrumentación de requests (SQL, plantillas, storage, correo)
+        from . import instrumentacion
+        instrumentacion.instalar()
@@ -0,0 +1,223 @@
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramSimilarity,
+)
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from .empresas import empresa_actual_id
+
+# =========================
+# Búsqueda de vehículos
+# =========================
+#
+# - PostgreSQL: índices GIN pg_trgm sobre UPPER(columna) (migración 0009),
+#   que aceleran los mismos icontains de siempre; el ranking combina
+#   SearchRank y similitud de trigramas sobre la placa.
+# - SQLite: tabla virtual FTS5 con tokenizer trigram, espejo de
+#   placa/marca/modelo/tipo mantenido por signals; ranking con bm25().
+# - Cualquier otro caso (u otra base, o términos de menos de 3 letras):
+#   los icontains de siempre.
+
+TABLA_FTS = 'gestion_flota_vehiculo_fts'
+
+# Pesos bm25 por columna: placa, marca, modelo, tipo
+PESOS_FTS = (10.0, 4.0, 4.0, 1.0)
+
+AUTOCOMPLETAR_LIMITE = 10
+BUSQUEDA_LIMITE = 50
+
+# El tokenizer trigram no puede buscar términos más cortos
+_MINIMO_TRIGRAMA = 3
+
+# Si la tabla FTS5 existe, por alias de base de datos (se consulta una vez)
+_fts_por_alias = {}
+
+
+def _usa_fts():
+    if connection.vendor != 'sqlite':
+        return False
+    if connection.alias not in _fts_por_alias:
+        _fts_por_alias[connection.alias] = TABLA_FTS in connection.introspection.table_names()
+    return _fts_por_alias[connection.alias]
+
+
+def normalizar_placa(placa):
+    """
+    Las placas se guardan en mayúsculas y sin espacios (ver Vehiculo.save()).
+    """
+    return ''.join((placa or '').split()).upper()
+
+
+def _consulta_fts(q):
+    """
+    Convierte la búsqueda libre en una consulta FTS5: cada palabra como frase
+    entre comillas (subcadena en cualquier columna) y todas obligatorias.
+    Devuelve None si alguna palabra es demasiado corta para el índice.
+    """
+    palabras = q.split()
+    if not palabras or any(len(p) < _MINIMO_TRIGRAMA for p in palabras):
+        return None
+    return ' '.join('"{}"'.format(p.replace('"', '""')) for p in palabras)
+
+
+def filtro_icontains(q):
+    """
+    Búsqueda original del listado: placa, marca, modelo o tipo contienen 'q'.
+    En PostgreSQL la sirven los índices de trigramas.
+    """
+    return (
+        Q(placa__icontains=q) |
+        Q(marca__icontains=q) |
+        Q(modelo__icontains=q) |
+        Q(tipo__icontains=q)
+    )
+
+
+def filtro_busqueda(q):
+    """
+    Q para filtrar vehículos por la búsqueda libre 'q', usando el índice
+    disponible en el backend actual.
+    """
+    q = q.strip()
+    if _usa_fts():
+        consulta = _consulta_fts(q)
+        if consulta is not None:
+            return Q(id__in=RawSQL(
+                f"SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s",
+                [consulta],
+            ))
+    return filtro_icontains(q)
+
+
+def buscar_vehiculos(q, limite=BUSQUEDA_LIMITE):
+    """
+    Vehículos activos que coinciden con 'q', del más relevante al menos
+    relevante (coincidencias en la placa pesan más que en marca o modelo).
+    Devuelve una lista de Vehiculo.
+    """
+    from .models import Vehiculo
+
+    q = (q or '').strip()
+    if not q:
+        return []
+    activos = Vehiculo.objects.filter(activo=True)
+
+    if connection.vendor == 'postgresql':
+        vector = (
+            SearchVector('placa', weight='A', config='simple') +
+            SearchVector('marca', 'modelo', weight='B', config='simple') +
+            SearchVector('tipo', weight='C', config='simple')
+        )
+        return list(
+            activos.filter(filtro_icontains(q))
+            .annotate(rango=(
+                SearchRank(vector, SearchQuery(q, config='simple')) +
+                TrigramSimilarity('placa', q)
+            ))
+            .order_by('-rango', 'placa')[:limite]
+        )
+
+    consulta = _consulta_fts(q) if _usa_fts() else None
+    if consulta is not None:
+        pesos = ', '.join(str(p) for p in PESOS_FTS)
+        # La empresa se filtra antes del LIMIT, no después en 'activos'
+        empresa_id = empresa_actual_id()
+        filtro_empresa, parametros = '', [consulta]
+        if empresa_id is not None:
+            filtro_empresa = "AND v.empresa_id = %s "
+            parametros.append(empresa_id)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT f.rowid FROM {TABLA_FTS} f "
+                f"JOIN gestion_flota_vehiculo v ON v.id = f.rowid "
+                f"WHERE {TABLA_FTS} MATCH %s AND v.activo {filtro_empresa}"
+                f"ORDER BY bm25({TABLA_FTS}, {pesos}) LIMIT %s",
+                [*parametros, limite],
+            )
+            ids = [fila[0] for fila in cursor.fetchall()]
+        por_id = activos.in_bulk(ids)
+        return [por_id[i] for i in ids if i in por_id]
+
+    # Sin índice de texto: primero las placas que empiezan por 'q'
+    return list(
+        activos.filter(filtro_icontains(q))
+        .annotate(rango=Case(
+            When(placa__istartswith=q, then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField(),
+        ))
+        .order_by('-rango', 'placa')[:limite]
+    )
+
+
+def _siguiente_prefijo(prefijo):
+    return prefijo[:-1] + chr(ord(prefijo[-1]) + 1)
+
+
+def autocompletar_placas(prefijo, limite=AUTOCOMPLETAR_LIMITE):
+    """
+    Vehículos activos cuya placa empieza por 'prefijo'. Se consulta como
+    rango (placa >= 'ABC' AND placa < 'ABD') para que lo resuelva el índice
+    B-tree de placa; vale porque las placas se guardan normalizadas
+    (Vehiculo.save() y la migración 0019).
+    Devuelve dicts con id, placa, marca y modelo.
+    """
+    from .models import Vehiculo
+
+    prefijo = normalizar_placa(prefijo)
+    if not prefijo:
+        return []
+    return list(
+        Vehiculo.objects.filter(
+            activo=True,
+            placa__gte=prefijo,
+            placa__lt=_siguiente_prefijo(prefijo),
+        )
+        .order_by('placa')
+        .values('id', 'placa', 'marca', 'modelo')[:limite]
+    )
+
+
+# =========================
+# Sincronización del índice FTS5 (SQLite)
+# =========================
+
+def indexar_vehiculo(vehiculo):
+    if not _usa_fts():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLA_FTS} WHERE rowid = %s", [vehiculo.pk])
+        cursor.execute(
+            f"INSERT INTO {TABLA_FTS} (rowid, placa, marca, modelo, tipo) "
+            f"VALUES (%s, %s, %s, %s, %s)",
+            [vehiculo.pk, vehiculo.placa, vehiculo.marca, vehiculo.modelo, vehiculo.tipo],
+        )
+
+
+def desindexar_vehiculo(vehiculo_id):
+    if not _usa_fts():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLA_FTS} WHERE rowid = %s", [vehiculo_id])
+
+
+def reconstruir_indice_busqueda():
+    """
+    Vuelve a llenar la tabla FTS5 desde gestion_flota_vehiculo (tras cargas
+    con bulk_create/update(), que no disparan signals). Devuelve las filas
+    indexadas, o None si el backend no usa FTS5.
+    """
+    if not _usa_fts():
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLA_FTS}")
+        cursor.execute(
+            f"INSERT INTO {TABLA_FTS} (rowid, placa, marca, modelo, tipo) "
+            f"SELECT id, placa, marca, modelo, tipo FROM gestion_flota_vehiculo"
+        )
+        cursor.execute(f"SELECT count(*) FROM {TABLA_FTS}")
+        return cursor.fetchone()[0]
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+# =========================
+# Caché compartida entre procesos
+# =========================
+#
+# Las cachés de la aplicación (conteos, dashboard, roles, empresas) se
+# invalidan con señales, que solo corren en el proceso que hizo el cambio.
+# Con Redis (REDIS_URL) la invalidación la ven todos los workers, el
+# importador y el programador; con la caché en memoria de desarrollo cada
+# proceso tiene su copia, así que esas claves viven como mucho
+# CACHE_LOCAL_TIMEOUT segundos. La instrumentación (instrumentacion.py)
+# también necesita la caché compartida para juntar los procesos.
+
+
+def cache_compartida(alias='default'):
+    """
+    True si todos los procesos ven la misma caché (Redis, Memcached, base
+    de datos, archivos).
+    """
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
+
+
+def vida_cache(segundos):
+    """
+    Vida de una clave invalidada por señales: 'segundos' con caché
+    compartida; acotada a CACHE_LOCAL_TIMEOUT si la caché es del proceso.
+    """
+    if cache_compartida():
+        return segundos
+    return min(segundos, settings.CACHE_LOCAL_TIMEOUT)
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def revisar_cache_compartida(app_configs, **kwargs):
+    if cache_compartida():
+        return []
+    return [
+        checks.Warning(
+            "La caché es local a cada proceso: las invalidaciones no llegan a "
+            "los demás workers ni a los comandos, y /diagnostico/requests/ y "
+            "/metrics solo ven el worker que responde.",
+            hint="Configura REDIS_URL en producción.",
+            id='gestion_flota.W001',
+        )
+    ]
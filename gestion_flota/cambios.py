@@ -0,0 +1,199 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from .empresas import empresa_actual_id
+
+# =========================
+# Registro de cambios para sincronización incremental
+# =========================
+#
+# Cada alta, modificación o borrado de Vehiculo / DocumentoVehiculo deja una
+# fila en CambioFlota (signals.py para los save()/delete(); las operaciones
+# masivas -importación, rollover de estados- lo registran a mano). El cliente
+# pide /api/v1/cambios/?desde=<secuencia> y aplica los eventos en orden.
+#
+# La secuencia no es el id: el id se asigna al insertar y una transacción
+# larga (una importación) puede confirmar ids menores que otros ya
+# entregados, que el cliente se saltaría. Los eventos se insertan sin
+# secuencia y publicar_cambios() numera, bajo un bloqueo, los que ya están
+# confirmados: lo que se confirme después recibe un número mayor.
+#
+# La compactación deja solo el último evento de cada objeto (el estado
+# actual no se pierde) y descarta los borrados más viejos que
+# CAMBIOS_RETENCION_BORRADOS_DIAS; CompactacionCambios.piso marca desde
+# dónde un cliente atrasado tiene que resincronizar.
+
+# Campos que viajan en cada evento
+CAMPOS_CAMBIO = {
+    'vehiculo': (
+        'placa', 'marca', 'modelo', 'anio', 'tipo', 'activo',
+        'responsable_nombre', 'responsable_email', 'foto',
+        'creado_en', 'actualizado_en',
+    ),
+    'documento': (
+        'vehiculo_id', 'tipo_id', 'fecha_expedicion', 'fecha_vencimiento',
+        'estado', 'archivo', 'creado_en', 'actualizado_en',
+    ),
+}
+
+# Eventos numerados por publicación
+LOTE_PUBLICACION = 5000
+
+
+def _modelo(instancia):
+    from .models import DocumentoVehiculo
+
+    return 'documento' if isinstance(instancia, DocumentoVehiculo) else 'vehiculo'
+
+
+def datos_cambio(instancia):
+    modelo = _modelo(instancia)
+    datos = {'id': instancia.pk}
+    for campo in CAMPOS_CAMBIO[modelo]:
+        valor = getattr(instancia, campo)
+        if campo in ('foto', 'archivo'):
+            valor = valor.url if valor else None
+        datos[campo] = valor
+    return datos
+
+
+def registrar_cambio(instancia, operacion):
+    from .models import CambioFlota
+
+    CambioFlota.objects.create(
+        empresa_id=instancia.empresa_id,
+        modelo=_modelo(instancia),
+        objeto_id=instancia.pk,
+        operacion=operacion,
+        datos=None if operacion == 'borrar' else datos_cambio(instancia),
+    )
+
+
+def registrar_cambios(instancias, operacion):
+    """
+    Versión masiva de registrar_cambio() para bulk_create/bulk_update y
+    update(): un INSERT por lote.
+    """
+    from .models import CambioFlota
+
+    CambioFlota.objects.bulk_create(
+        [
+            CambioFlota(
+                empresa_id=instancia.empresa_id,
+                modelo=_modelo(instancia),
+                objeto_id=instancia.pk,
+                operacion=operacion,
+                datos=datos_cambio(instancia),
+            )
+            for instancia in instancias
+        ],
+        batch_size=1000,
+    )
+
+
+def piso_cambios():
+    from .models import CompactacionCambios
+
+    ultima = CompactacionCambios.objects.order_by('-ejecutada_en').values_list('piso', flat=True).first()
+    return ultima or 0
+
+
+def publicar_cambios(lote=LOTE_PUBLICACION):
+    """
+    Asigna secuencia, en orden de id, a los eventos confirmados que aún no
+    la tienen. Devuelve cuántos numeró.
+    """
+    from .models import CambioFlota, SecuenciaCambios
+
+    pendientes = CambioFlota.objects.filter(secuencia__isnull=True)
+    if not pendientes.exists():
+        return 0
+
+    with transaction.atomic():
+        # El UPDATE bloquea el contador hasta el commit: la siguiente
+        # publicación ve confirmados los eventos de esta y numera después
+        if not SecuenciaCambios.objects.filter(pk=1).update(ultima=F('ultima')):
+            SecuenciaCambios.objects.create(
+                pk=1,
+                ultima=CambioFlota.objects.aggregate(ultima=Max('secuencia'))['ultima'] or 0,
+            )
+        ultima = SecuenciaCambios.objects.values_list('ultima', flat=True).get(pk=1)
+
+        ids = list(pendientes.order_by('id').values_list('id', flat=True)[:lote])
+        CambioFlota.objects.bulk_update(
+            [CambioFlota(id=cambio_id, secuencia=ultima + n) for n, cambio_id in enumerate(ids, 1)],
+            ['secuencia'],
+            batch_size=1000,
+        )
+        SecuenciaCambios.objects.filter(pk=1).update(ultima=ultima + len(ids))
+    return len(ids)
+
+
+def leer_cambios(desde, limite, modelos=None):
+    """
+    Eventos con secuencia mayor que 'desde', en orden (solo los de la
+    empresa actual, si hay una). Devuelve (eventos, hay_mas). Lanza
+    LookupError si 'desde' (distinto de 0) quedó por debajo del piso de la
+    compactación.
+    """
+    from .models import CambioFlota
+
+    # Desde 0 siempre se puede: la compactación conserva el estado actual
+    if 0 < desde < piso_cambios():
+        raise LookupError("La secuencia ya fue compactada: resincronice desde 0.")
+
+    # Tras una importación grande se publica un lote por llamada; hay_mas
+    # avisa que quedan eventos por numerar
+    quedan = publicar_cambios() == LOTE_PUBLICACION
+
+    eventos = CambioFlota.objects.filter(secuencia__gt=desde)
+    empresa_id = empresa_actual_id()
+    if empresa_id is not None:
+        eventos = eventos.filter(empresa_id=empresa_id)
+    if modelos:
+        eventos = eventos.filter(modelo__in=modelos)
+    filas = list(
+        eventos.order_by('secuencia')
+        .values_list('secuencia', 'modelo', 'objeto_id', 'operacion', 'datos')[:limite + 1]
+    )
+    return filas[:limite], len(filas) > limite or quedan
+
+
+def compactar_cambios(retencion_borrados_dias=None):
+    """
+    Deja un solo evento (el último) por objeto y descarta los borrados más
+    viejos que la retención. Devuelve la CompactacionCambios registrada.
+    """
+    from .models import CambioFlota, CompactacionCambios
+
+    if retencion_borrados_dias is None:
+        retencion_borrados_dias = settings.CAMBIOS_RETENCION_BORRADOS_DIAS
+
+    publicar_cambios()
+
+    ultimos = (
+        CambioFlota.objects.order_by()
+        .values('modelo', 'objeto_id')
+        .annotate(ultimo=Max('id'))
+        .values('ultimo')
+    )
+    reemplazados = CambioFlota.objects.exclude(id__in=ultimos).delete()[0]
+
+    viejos = CambioFlota.objects.filter(
+        operacion='borrar',
+        secuencia__isnull=False,
+        creado_en__lt=timezone.now() - timedelta(days=retencion_borrados_dias),
+    )
+    piso = max(viejos.aggregate(piso=Max('secuencia'))['piso'] or 0, piso_cambios())
+    descartados = viejos.delete()[0]
+
+    return CompactacionCambios.objects.create(
+        piso=piso,
+        reemplazados=reemplazados,
+        borrados_descartados=descartados,
+        restantes=CambioFlota.objects.count(),
+    )
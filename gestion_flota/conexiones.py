@@ -0,0 +1,28 @@
+import time
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# =========================
+# Conexión a la base de datos por request
+# =========================
+#
+# settings.DB_CONEXIONES decide si cada request abre una conexión nueva, si
+# reutiliza la persistente del worker o si la toma de un pool (ver
+# settings.py). La instrumentación mide cuánto tarda el ORM en adquirirla
+# en cada request (ConexionBDMiddleware lo publica); adquirir_conexion() la
+# fuerza y la mide por separado, para benchmark_conexiones.
+
+
+def adquirir_conexion(alias=DEFAULT_DB_ALIAS):
+    """
+    Deja lista la conexión del hilo actual (abriéndola, verificándola con el
+    health check o tomándola del pool) y devuelve los segundos que tomó.
+    """
+    conexion = connections[alias]
+    inicio = time.perf_counter()
+    conexion.ensure_connection()
+    # Con CONN_HEALTH_CHECKS, una conexión persistente caída se descarta aquí
+    # y no en la primera consulta de la vista
+    conexion.close_if_health_check_failed()
+    conexion.ensure_connection()
+    return time.perf_counter() - inicio
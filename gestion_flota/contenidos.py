@@ -0,0 +1,238 @@
+import hashlib
+import logging
+import os
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .cambios import registrar_cambio
+
+logger = logging.getLogger(__name__)
+
+
+# =========================
+# Índice de contenido de los PDF de documentos
+# =========================
+#
+# Los PDF se guardan por su SHA-256 (documentos_vehiculos/contenido/ab/abcd...pdf)
+# y ArchivoContenido registra hash y tamaño de cada blob. Subir de nuevo el
+# mismo certificado reutiliza el blob existente en vez de guardar otra copia;
+# cambiar la fecha de un documento ya no mueve ni duplica su archivo.
+# Los blobs sin documentos los borra el comando recolectar_archivos: una
+# corrida los marca (huerfano_desde) y una posterior, pasada la gracia, los
+# borra si nadie los volvió a usar.
+
+PREFIJO_CONTENIDO = 'documentos_vehiculos/contenido'
+
+BLOQUE_HASH = 64 * 1024
+
+
+def calcular_sha256(archivo):
+    """
+    SHA-256 y tamaño del archivo, leído en bloques. Deja el archivo al inicio.
+    """
+    sha = hashlib.sha256()
+    tamano = 0
+    archivo.seek(0)
+    for bloque in iter(lambda: archivo.read(BLOQUE_HASH), b''):
+        sha.update(bloque)
+        tamano += len(bloque)
+    archivo.seek(0)
+    return sha.hexdigest(), tamano
+
+
+def ruta_contenido(sha256, extension='.pdf'):
+    return f"{PREFIJO_CONTENIDO}/{sha256[:2]}/{sha256}{extension}"
+
+
+def _storage_documentos():
+    from .models import DocumentoVehiculo
+
+    return DocumentoVehiculo._meta.get_field('archivo').storage
+
+
+def obtener_o_guardar_contenido(archivo, nombre_original=''):
+    """
+    Devuelve el ArchivoContenido del contenido de 'archivo', guardándolo en
+    el storage solo si no existía ya un blob con el mismo SHA-256.
+    """
+    from .models import ArchivoContenido
+
+    sha256, tamano = calcular_sha256(archivo)
+    existente = ArchivoContenido.objects.filter(sha256=sha256).first()
+    if existente is not None:
+        if existente.huerfano_desde is None:
+            return existente
+        # Marcado como huérfano: se desmarca antes de usarlo. Si la
+        # recolección ya lo borró (0 filas), se guarda de nuevo.
+        if ArchivoContenido.objects.filter(pk=existente.pk).update(huerfano_desde=None):
+            existente.huerfano_desde = None
+            return existente
+
+    storage = _storage_documentos()
+    extension = os.path.splitext(nombre_original)[1].lower() or '.pdf'
+    nombre = storage.save(ruta_contenido(sha256, extension), archivo)
+    try:
+        with transaction.atomic():
+            return ArchivoContenido.objects.create(sha256=sha256, tamano=tamano, nombre=nombre)
+    except IntegrityError:
+        # Otra subida del mismo contenido ganó la carrera: se usa la suya
+        storage.delete(nombre)
+        return ArchivoContenido.objects.get(sha256=sha256)
+
+
+def asignar_contenido(documento, archivo, nombre_original=''):
+    """
+    Apunta documento.archivo al blob de 'archivo' (nuevo o reutilizado).
+    No guarda el documento.
+    """
+    contenido = obtener_o_guardar_contenido(archivo, nombre_original or getattr(archivo, 'name', ''))
+    documento.contenido = contenido
+    documento.archivo = contenido.nombre
+    return contenido
+
+
+def indexar_documentos_existentes():
+    """
+    Registra en el índice los archivos de documentos subidos antes de que
+    existiera (contenido vacío). Si el contenido ya tiene blob, el documento
+    pasa a apuntar a ese blob y su copia queda huérfana para la recolección.
+    Devuelve (indexados, deduplicados, errores).
+    """
+    from .models import ArchivoContenido, DocumentoVehiculo
+
+    storage = _storage_documentos()
+    indexados = deduplicados = errores = 0
+    pendientes = (
+        DocumentoVehiculo.objects.filter(contenido__isnull=True)
+        .exclude(archivo='')
+        .exclude(archivo__isnull=True)
+        .values_list('id', 'archivo')
+    )
+    for documento_id, nombre in pendientes.iterator():
+        try:
+            with storage.open(nombre, 'rb') as archivo:
+                sha256, tamano = calcular_sha256(archivo)
+        except Exception:
+            logger.exception("No se pudo leer %s", nombre)
+            errores += 1
+            continue
+
+        contenido, creado = ArchivoContenido.objects.get_or_create(
+            sha256=sha256,
+            defaults={'tamano': tamano, 'nombre': nombre},
+        )
+        # update() para no recalcular el estado; la URL del archivo cambia
+        DocumentoVehiculo.objects.filter(pk=documento_id).update(
+            contenido=contenido,
+            archivo=contenido.nombre,
+            actualizado_en=timezone.now(),
+        )
+        registrar_cambio(DocumentoVehiculo.objects.get(pk=documento_id), 'actualizar')
+        indexados += 1
+        deduplicados += not creado
+    return indexados, deduplicados, errores
+
+
+def verificar_contenidos():
+    """
+    Recalcula el hash de cada blob. Devuelve [(ArchivoContenido, problema)]
+    para los que faltan en el storage o ya no coinciden con su SHA-256.
+    """
+    from .models import ArchivoContenido
+
+    storage = _storage_documentos()
+    problemas = []
+    for contenido in ArchivoContenido.objects.iterator():
+        try:
+            with storage.open(contenido.nombre, 'rb') as archivo:
+                sha256, tamano = calcular_sha256(archivo)
+        except FileNotFoundError:
+            problemas.append((contenido, "no existe en el storage"))
+            continue
+        if sha256 != contenido.sha256 or tamano != contenido.tamano:
+            problemas.append((contenido, "el contenido no coincide con su hash"))
+    return problemas
+
+
+def _listar_archivos(storage, directorio):
+    directorios, archivos = storage.listdir(directorio)
+    for archivo in archivos:
+        yield f"{directorio}/{archivo}"
+    for subdirectorio in directorios:
+        yield from _listar_archivos(storage, f"{directorio}/{subdirectorio}")
+
+
+def marcar_huerfanos():
+    """
+    Marca con la hora actual los blobs que se quedaron sin documentos y
+    desmarca los que volvieron a usarse. La gracia de la recolección se
+    cuenta desde esta marca, no desde que se subió el blob.
+    Devuelve (marcados, desmarcados).
+    """
+    from .models import ArchivoContenido
+
+    marcados = ArchivoContenido.objects.filter(
+        documentos__isnull=True, huerfano_desde__isnull=True,
+    ).update(huerfano_desde=timezone.now())
+    desmarcados = ArchivoContenido.objects.filter(
+        documentos__isnull=False, huerfano_desde__isnull=False,
+    ).update(huerfano_desde=None)
+    return marcados, desmarcados
+
+
+def buscar_huerfanos(gracia):
+    """
+    Blobs y archivos sin ningún documento que los use:
+    - ArchivoContenido sin documentos desde antes de 'gracia' (datetime;
+      ver marcar_huerfanos);
+    - archivos bajo documentos_vehiculos/ que no son ni el archivo de un
+      documento ni un blob del índice (copias viejas por placa/tipo/fecha).
+    Devuelve (contenidos, nombres_sueltos).
+    """
+    from .models import ArchivoContenido, DocumentoVehiculo
+
+    contenidos = list(
+        ArchivoContenido.objects.filter(documentos__isnull=True, huerfano_desde__lt=gracia)
+    )
+
+    storage = _storage_documentos()
+    en_uso = set(
+        DocumentoVehiculo.objects.exclude(archivo='').values_list('archivo', flat=True)
+    )
+    en_uso.update(ArchivoContenido.objects.values_list('nombre', flat=True))
+    try:
+        sueltos = [
+            nombre for nombre in _listar_archivos(storage, 'documentos_vehiculos')
+            if nombre not in en_uso
+            and storage.get_modified_time(nombre) < gracia
+        ]
+    except (FileNotFoundError, NotImplementedError):
+        sueltos = []
+    return contenidos, sueltos
+
+
+def borrar_huerfanos(contenidos, sueltos):
+    from .models import ArchivoContenido
+
+    storage = _storage_documentos()
+    liberados = 0
+    for contenido in contenidos:
+        # Se vuelve a comprobar con la fila bloqueada: una subida que lo
+        # reutilice lo desmarca antes (obtener_o_guardar_contenido) y espera
+        # a este bloqueo
+        with transaction.atomic():
+            vigente = (
+                ArchivoContenido.objects.select_for_update()
+                .filter(pk=contenido.pk, huerfano_desde=contenido.huerfano_desde)
+                .first()
+            )
+            if vigente is None or vigente.huerfano_desde is None or vigente.documentos.exists():
+                continue
+            vigente.delete()
+        storage.delete(contenido.nombre)
+        liberados += contenido.tamano
+    for nombre in sueltos:
+        liberados += storage.size(nombre)
+        storage.delete(nombre)
+    return liberados
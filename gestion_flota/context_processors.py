@@ -0,0 +1,57 @@
+from django.utils.functional import SimpleLazyObject
+
+from .empresas import empresas_usuario
+from .models import Empresa
+from .permissions import user_is_admin, user_is_lectura, user_is_operador
+
+
+class RolesFlota:
+    """
+    Roles del usuario para los templates: {{ roles_flota.es_admin }}, etc.
+    Usa la resolución memorizada de permissions.py (sin consultas extra).
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @property
+    def es_admin(self):
+        return user_is_admin(self.user)
+
+    @property
+    def es_operador(self):
+        return user_is_operador(self.user)
+
+    @property
+    def es_lectura(self):
+        return user_is_lectura(self.user)
+
+
+def roles(request):
+    user = getattr(request, 'user', None)
+    if user is None:
+        return {}
+    return {
+        'roles_flota': SimpleLazyObject(lambda: RolesFlota(user)),
+    }
+
+
+def empresas(request):
+    """
+    Empresas del usuario para el selector de la barra de navegación
+    ({{ empresas_flota }}, vacío si tiene una sola) y la actual.
+    """
+    user = getattr(request, 'user', None)
+    if user is None:
+        return {}
+
+    def _empresas():
+        ids = empresas_usuario(user)
+        if len(ids) < 2:
+            return []
+        return list(Empresa.objects.filter(id__in=ids).order_by('nombre'))
+
+    return {
+        'empresas_flota': SimpleLazyObject(_empresas),
+        'empresa_actual_id': getattr(request, 'empresa_id', None),
+    }
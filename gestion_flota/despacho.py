@@ -0,0 +1,165 @@
+import logging
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.mail import get_connection
+
+logger = logging.getLogger(__name__)
+
+
+# =========================
+# Despacho concurrente de correos
+# =========================
+#
+# Cada hilo del pool mantiene su propia conexión SMTP abierta y la reutiliza
+# para todos sus mensajes. Los hilos no tocan la base de datos: los callbacks
+# (marcar enviado, cola de fallidos) se ejecutan en el hilo que llama.
+
+@dataclass
+class ResultadoDespacho:
+    enviados: int = 0
+    fallidos: list = field(default_factory=list)  # [(mensaje, error, intentos)]
+    segundos: float = 0.0
+
+    @property
+    def mensajes_por_segundo(self):
+        if not self.segundos:
+            return 0.0
+        return self.enviados / self.segundos
+
+
+def es_error_permanente(exc):
+    """
+    Rechazos definitivos del servidor (códigos 5xx, destinatario inválido):
+    reintentar no sirve.
+    """
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return True
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 500 <= exc.smtp_code < 600
+    return False
+
+
+class _Limitador:
+    """
+    Límite global de mensajes por segundo compartido por todos los hilos.
+    """
+
+    def __init__(self, por_segundo):
+        self.intervalo = 1.0 / por_segundo if por_segundo else 0
+        self.siguiente = time.monotonic()
+        self.lock = threading.Lock()
+
+    def esperar(self):
+        if not self.intervalo:
+            return
+        with self.lock:
+            ahora = time.monotonic()
+            turno = max(self.siguiente, ahora)
+            self.siguiente = turno + self.intervalo
+        if turno > ahora:
+            time.sleep(turno - ahora)
+
+
+class Despachador:
+    """
+    Envía EmailMessage con un pool de hilos, reintentos por destinatario con
+    backoff exponencial (backoff, 2*backoff, 4*backoff...) y un límite global
+    de mensajes por segundo.
+    """
+
+    def __init__(self, concurrencia=None, reintentos=None, backoff=None,
+                 max_por_segundo=None, backend=None):
+        self.concurrencia = max(1, concurrencia or settings.ALERTAS_CONCURRENCIA)
+        self.reintentos = settings.ALERTAS_REINTENTOS if reintentos is None else reintentos
+        self.backoff = settings.ALERTAS_BACKOFF if backoff is None else backoff
+        self.max_por_segundo = (
+            settings.ALERTAS_MAX_POR_SEGUNDO if max_por_segundo is None else max_por_segundo
+        )
+        self.backend = backend
+
+        self._local = threading.local()
+        self._conexiones = []
+        self._lock = threading.Lock()
+        self._limitador = _Limitador(self.max_por_segundo)
+
+    def _conexion(self):
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = get_connection(backend=self.backend)
+            conexion.open()
+            self._local.conexion = conexion
+            with self._lock:
+                self._conexiones.append(conexion)
+        return conexion
+
+    def _reiniciar_conexion(self):
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is not None:
+            try:
+                conexion.close()
+            except Exception:
+                pass
+            with self._lock:
+                self._conexiones.remove(conexion)
+            self._local.conexion = None
+
+    def _enviar_uno(self, mensaje):
+        """
+        Devuelve (mensaje, error, intentos); error es None si se envió.
+        """
+        intentos = 0
+        while True:
+            intentos += 1
+            self._limitador.esperar()
+            try:
+                self._conexion().send_messages([mensaje])
+                return mensaje, None, intentos
+            except Exception as exc:
+                # La conexión puede quedar en mal estado: se abre otra
+                self._reiniciar_conexion()
+                if es_error_permanente(exc) or intentos > self.reintentos:
+                    return mensaje, exc, intentos
+                espera = self.backoff * (2 ** (intentos - 1))
+                logger.warning(
+                    "Fallo enviando a %s (intento %s), reintento en %.1f s: %s",
+                    ", ".join(mensaje.to), intentos, espera, exc,
+                )
+                time.sleep(espera)
+
+    def enviar(self, mensajes, al_enviar=None, al_fallar=None):
+        """
+        Envía todos los mensajes. 'al_enviar(mensaje)' y
+        'al_fallar(mensaje, error, intentos)' se llaman desde este hilo.
+        Devuelve un ResultadoDespacho.
+        """
+        resultado = ResultadoDespacho()
+        inicio = time.perf_counter()
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrencia) as pool:
+                futuros = [pool.submit(self._enviar_uno, m) for m in mensajes]
+                for futuro in as_completed(futuros):
+                    mensaje, error, intentos = futuro.result()
+                    if error is None:
+                        resultado.enviados += 1
+                        if al_enviar:
+                            al_enviar(mensaje)
+                    else:
+                        resultado.fallidos.append((mensaje, error, intentos))
+                        if al_fallar:
+                            al_fallar(mensaje, error, intentos)
+        finally:
+            for conexion in self._conexiones:
+                try:
+                    conexion.close()
+                except Exception:
+                    pass
+            self._conexiones = []
+
+        resultado.segundos = time.perf_counter() - inicio
+        return resultado
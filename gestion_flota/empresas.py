@@ -0,0 +1,157 @@
+import contextvars
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db import models
+
+from .cache_compartida import cache_compartida
+from .instrumentacion import contar_cache
+
+# =========================
+# Empresa actual (multiempresa)
+# =========================
+#
+# EmpresaMiddleware fija la empresa del request en un contextvar y el
+# manager por defecto de Vehiculo, DocumentoVehiculo y TipoDocumento filtra
+# por ella: las vistas y servicios no cambian. Sin empresa fijada (comandos,
+# workers, admin de un superusuario sin empresa) las consultas ven todas;
+# los workers que trabajan para una empresa usan usar_empresa().
+
+_empresa_actual = contextvars.ContextVar('flota_empresa_actual', default=None)
+
+# Usuario sin empresa asignada: sus consultas no devuelven nada
+SIN_EMPRESA = 0
+
+EMPRESAS_CACHE_TIMEOUT = 60 * 15
+
+
+def empresa_actual_id():
+    return _empresa_actual.get()
+
+
+def activar_empresa(empresa_id):
+    """
+    Fija la empresa del contexto actual. La usa el middleware al empezar
+    cada request (no se restablece al salir: las respuestas en streaming
+    siguen leyendo con la misma empresa).
+    """
+    _empresa_actual.set(empresa_id)
+
+
+@contextmanager
+def usar_empresa(empresa):
+    """
+    Con 'empresa' (instancia, id o None para todas) como empresa actual.
+    """
+    token = _empresa_actual.set(getattr(empresa, 'pk', empresa))
+    try:
+        yield
+    finally:
+        _empresa_actual.reset(token)
+
+
+def empresa_para_guardar():
+    """
+    Empresa que se asigna a un registro nuevo sin empresa: la actual o, si
+    no hay ninguna fijada y existe una sola empresa, esa.
+    """
+    from .models import Empresa
+
+    empresa_id = empresa_actual_id()
+    if empresa_id == SIN_EMPRESA:
+        raise PermissionDenied("El usuario no pertenece a ninguna empresa.")
+    if empresa_id is not None:
+        return empresa_id
+    ids = list(Empresa.objects.values_list('id', flat=True)[:2])
+    if len(ids) == 1:
+        return ids[0]
+    raise ValueError("No hay una empresa actual: use usar_empresa() o indique la empresa.")
+
+
+# =========================
+# Empresas del usuario
+# =========================
+
+def _clave_empresas(user_id):
+    return f"flota:empresas:{user_id}"
+
+
+def _consultar_empresas(user):
+    return tuple(user.empresas.filter(activa=True).order_by('id').values_list('id', flat=True))
+
+
+def empresas_usuario(user) -> tuple:
+    """
+    Ids de las empresas del usuario, memorizados en el user y, si la caché
+    es compartida, en la caché (como los roles en permissions.py): quitar a
+    alguien de una empresa tiene que valer en todos los workers.
+    """
+    if not user.is_authenticated:
+        return ()
+
+    ids = getattr(user, '_flota_empresas', None)
+    if ids is not None:
+        return ids
+
+    if not cache_compartida():
+        ids = _consultar_empresas(user)
+    else:
+        clave = _clave_empresas(user.pk)
+        ids = cache.get(clave)
+        contar_cache('empresas', ids is not None)
+        if ids is None:
+            ids = _consultar_empresas(user)
+            cache.set(clave, ids, EMPRESAS_CACHE_TIMEOUT)
+
+    user._flota_empresas = ids
+    return ids
+
+
+def invalidar_empresas_usuario(*user_ids):
+    cache.delete_many([_clave_empresas(user_id) for user_id in user_ids])
+
+
+def resolver_empresa(request):
+    """
+    Empresa del request: la elegida en la sesión si el usuario pertenece a
+    ella; si no, la primera del usuario. Un superusuario sin empresa ve
+    todas; cualquier otro usuario sin empresa, ninguna.
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return None
+    ids = empresas_usuario(user)
+    elegida = request.session.get('empresa_id') if hasattr(request, 'session') else None
+    if elegida in ids:
+        return elegida
+    if ids:
+        return ids[0]
+    return None if user.is_superuser else SIN_EMPRESA
+
+
+# =========================
+# Manager por empresa
+# =========================
+
+class EmpresaManager(models.Manager):
+    """
+    Manager por defecto de los modelos con empresa: filtra por la empresa
+    actual. El acceso por relaciones (doc.vehiculo) usa el base manager,
+    que no filtra.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        empresa_id = empresa_actual_id()
+        if empresa_id is not None:
+            queryset = queryset.filter(empresa_id=empresa_id)
+        return queryset
+
+
+def espacio_cache(empresa_id):
+    """
+    Prefijo de las claves de caché de una empresa (None: la vista de todas):
+    cada empresa tiene sus propios conteos y snapshot del dashboard.
+    """
+    return f"flota:e{empresa_id if empresa_id is not None else 'todas'}"
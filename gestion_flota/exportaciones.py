@@ -0,0 +1,368 @@
+import csv
+import gzip
+import hashlib
+import io
+import logging
+import os
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .empresas import SIN_EMPRESA, empresa_actual_id, usar_empresa
+from .models import DocumentoVehiculo, ExportacionJob, Vehiculo
+from .services import asegurar_estados_al_dia
+from .xlsx import escribir_xlsx
+
+logger = logging.getLogger(__name__)
+
+# Filas leídas por viaje a la base de datos (cursor del lado del servidor
+# en PostgreSQL); la memoria se mantiene plana sin importar el total.
+EXPORT_CHUNK_SIZE = 2000
+
+
+ENCABEZADOS_VEHICULOS = [
+    'Placa',
+    'Marca',
+    'Modelo',
+    'Año',
+    'Tipo',
+    'Activo',
+    'Responsable',
+    'Email responsable',
+    'Estado documentos',
+]
+
+ENCABEZADOS_DOCUMENTOS = [
+    'Placa',
+    'Tipo documento',
+    'Fecha expedición',
+    'Fecha vencimiento',
+    'Estado',
+    'Responsable',
+    'Email responsable',
+]
+
+
+def filas_vehiculos(q=None):
+    """
+    Genera las filas del export de vehículos activos (filtro de búsqueda 'q'),
+    leyendo tuplas con values_list() en bloques en lugar de instancias.
+    """
+    asegurar_estados_al_dia()
+    qs = (
+        Vehiculo.objects.filter(activo=True)
+        .buscar(q)
+        .con_estado_documentos()
+        .order_by('placa')
+        .values_list(
+            'placa',
+            'marca',
+            'modelo',
+            'anio',
+            'tipo',
+            'activo',
+            'responsable_nombre',
+            'responsable_email',
+            'estado_docs',
+        )
+    )
+
+    for (placa, marca, modelo, anio, tipo, activo,
+         responsable, email, estado_docs) in qs.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            placa,
+            marca,
+            modelo,
+            anio or '',
+            tipo,
+            'Sí' if activo else 'No',
+            responsable or '',
+            email or '',
+            estado_docs,
+        ]
+
+
+def filas_documentos(estado=None):
+    """
+    Genera las filas del export de documentos, respetando el filtro 'estado'
+    (vencidos, proximos, vigentes o todos).
+    """
+    asegurar_estados_al_dia()
+    qs = (
+        DocumentoVehiculo.objects.por_estado(estado)
+        .order_by('fecha_vencimiento', 'id')
+        .values_list(
+            'vehiculo__placa',
+            'tipo__nombre',
+            'fecha_expedicion',
+            'fecha_vencimiento',
+            'estado',
+            'vehiculo__responsable_nombre',
+            'vehiculo__responsable_email',
+        )
+    )
+
+    for (placa, tipo, expedicion, vencimiento, estado_doc,
+         responsable, email) in qs.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            placa,
+            tipo,
+            expedicion or '',
+            vencimiento,
+            estado_doc,
+            responsable or '',
+            email or '',
+        ]
+
+
+class Echo:
+    """
+    Pseudo-buffer para csv.writer: devuelve la línea en lugar de guardarla.
+    """
+
+    def write(self, value):
+        return value
+
+
+def csv_en_streaming(encabezados, filas):
+    """
+    Generador de líneas CSV (str) listo para StreamingHttpResponse.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(encabezados)
+    for fila in filas:
+        yield writer.writerow(fila)
+
+
+# =========================
+# Exportaciones en segundo plano
+# =========================
+
+def storage_exportaciones():
+    """
+    Almacenamiento local de los archivos generados (fuera de MEDIA_ROOT:
+    solo se descargan a través de la vista con control de permisos).
+    """
+    return FileSystemStorage(location=settings.EXPORTACIONES_ROOT)
+
+
+def _limite_reclamo():
+    """
+    Un trabajo 'procesando' cuyo último latido es anterior a esto quedó
+    huérfano (el worker se cayó o lo mataron).
+    """
+    return timezone.now() - timedelta(seconds=settings.EXPORTACIONES_RECLAMO_TIMEOUT)
+
+
+def _huella(empresa_id, tipo, formato, filtro, hoy):
+    crudo = f"{empresa_id}|{tipo}|{formato}|{filtro}|{hoy.isoformat()}"
+    return hashlib.sha256(crudo.encode()).hexdigest()
+
+
+def solicitar_exportacion(tipo, formato='csv', filtro='', usuario=None):
+    """
+    Encola una exportación de los datos de la empresa actual y devuelve el
+    ExportacionJob.
+
+    Si ya existe una exportación idéntica en curso (pendiente, o procesando
+    con un worker vivo), o una terminada hace menos de EXPORTACIONES_TTL
+    segundos cuyo archivo sigue disponible, se reutiliza.
+    """
+    filtro = filtro or ''
+    empresa_id = empresa_actual_id()
+    if empresa_id == SIN_EMPRESA:
+        raise PermissionDenied("El usuario no pertenece a ninguna empresa.")
+    huella = _huella(empresa_id, tipo, formato, filtro, date.today())
+    limite = timezone.now() - timedelta(seconds=settings.EXPORTACIONES_TTL)
+
+    existentes = ExportacionJob.objects.filter(huella=huella).order_by('-creado_en')
+    en_curso = existentes.filter(
+        Q(estado='pendiente') | Q(estado='procesando', reclamado_en__gte=_limite_reclamo())
+    ).first()
+    if en_curso:
+        return en_curso
+
+    reciente = existentes.filter(estado='listo', terminado_en__gte=limite).first()
+    if reciente and storage_exportaciones().exists(reciente.archivo):
+        return reciente
+
+    job = ExportacionJob.objects.create(
+        tipo=tipo,
+        formato=formato,
+        filtro=filtro,
+        huella=huella,
+        empresa_id=empresa_id,
+        creado_por=usuario if usuario and usuario.is_authenticated else None,
+    )
+    if settings.EXPORTACIONES_LANZAR_WORKER:
+        lanzar_worker()
+    return job
+
+
+def lanzar_worker(comando='procesar_exportaciones'):
+    """
+    Arranca un proceso local que procesa una cola (por defecto la de
+    exportaciones) y termina cuando queda vacía. Varios procesos a la vez
+    son seguros: cada trabajo se reclama con un UPDATE condicional.
+    """
+    manage_py = os.path.join(settings.BASE_DIR, 'manage.py')
+    subprocess.Popen(
+        [sys.executable, manage_py, comando, '--una-vez'],
+        cwd=settings.BASE_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def recuperar_abandonados():
+    """
+    Vuelve a encolar los trabajos 'procesando' sin latido reciente; los que
+    ya agotaron EXPORTACIONES_INTENTOS quedan en 'error'. Devuelve cuántos
+    trabajos recuperó.
+    """
+    limite = _limite_reclamo()
+    abandonados = ExportacionJob.objects.filter(
+        Q(reclamado_en__lt=limite) | Q(reclamado_en__isnull=True, iniciado_en__lt=limite),
+        estado='procesando',
+    )
+    fallidos = abandonados.filter(intentos__gte=settings.EXPORTACIONES_INTENTOS).update(
+        estado='error',
+        error="El worker dejó de responder; se agotaron los reintentos.",
+        terminado_en=timezone.now(),
+    )
+    reencolados = abandonados.update(estado='pendiente', reclamado_en=None)
+    if fallidos or reencolados:
+        logger.warning(
+            "Exportaciones abandonadas: %s reencoladas, %s con error", reencolados, fallidos,
+        )
+    return reencolados
+
+
+def reclamar_siguiente():
+    """
+    Toma el trabajo pendiente más antiguo marcándolo 'procesando' (antes
+    recupera los abandonados). Devuelve None si la cola está vacía.
+    """
+    recuperar_abandonados()
+    for job_id in (
+        ExportacionJob.objects.filter(estado='pendiente')
+        .order_by('creado_en')
+        .values_list('id', flat=True)[:10]
+    ):
+        ahora = timezone.now()
+        reclamado = ExportacionJob.objects.filter(id=job_id, estado='pendiente').update(
+            estado='procesando',
+            iniciado_en=ahora,
+            reclamado_en=ahora,
+            intentos=F('intentos') + 1,
+        )
+        if reclamado:
+            return ExportacionJob.objects.get(id=job_id)
+    return None
+
+
+class ReclamoPerdido(Exception):
+    """
+    Otro worker recuperó el trabajo (este dejó de latir a tiempo).
+    """
+
+
+def _con_latido(job, filas):
+    """
+    Deja pasar las filas renovando el reclamo del trabajo cada tercio de
+    EXPORTACIONES_RECLAMO_TIMEOUT, así una exportación larga no se toma por
+    abandonada.
+    """
+    intervalo = settings.EXPORTACIONES_RECLAMO_TIMEOUT / 3
+    proximo = time.monotonic() + intervalo
+    for fila in filas:
+        if time.monotonic() >= proximo:
+            vigente = ExportacionJob.objects.filter(
+                id=job.id, estado='procesando', intentos=job.intentos,
+            ).update(reclamado_en=timezone.now())
+            if not vigente:
+                raise ReclamoPerdido(job.pk)
+            proximo = time.monotonic() + intervalo
+        yield fila
+
+
+def _filas_y_encabezados(job):
+    if job.tipo == 'vehiculos':
+        return ENCABEZADOS_VEHICULOS, filas_vehiculos(job.filtro)
+    return ENCABEZADOS_DOCUMENTOS, filas_documentos(job.filtro)
+
+
+def ejecutar_exportacion(job):
+    """
+    Genera el archivo del trabajo (CSV comprimido con gzip o XLSX) y registra
+    filas, bytes y duración. Las filas salen de la empresa del trabajo.
+    """
+    with usar_empresa(job.empresa_id):
+        return _ejecutar_exportacion(job)
+
+
+def _ejecutar_exportacion(job):
+    storage = storage_exportaciones()
+    encabezados, filas = _filas_y_encabezados(job)
+    filas = _con_latido(job, filas)
+    nombre = f"{job.tipo}/{job.pk}-{job.huella[:12]}.{'csv.gz' if job.formato == 'csv' else 'xlsx'}"
+    ruta = storage.path(nombre)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+
+    inicio = time.perf_counter()
+    try:
+        if job.formato == 'xlsx':
+            total = escribir_xlsx(ruta, encabezados, filas, nombre_hoja=job.get_tipo_display())
+        else:
+            total = 0
+            with gzip.open(ruta, 'wb') as comprimido:
+                texto = io.TextIOWrapper(comprimido, encoding='utf-8', newline='')
+                writer = csv.writer(texto)
+                writer.writerow(encabezados)
+                for fila in filas:
+                    writer.writerow(fila)
+                    total += 1
+                texto.flush()
+                texto.detach()
+    except ReclamoPerdido:
+        # El trabajo ya es de otro worker: no se toca su estado
+        logger.warning("La exportación %s fue recuperada por otro worker", job.pk)
+        return job
+    except Exception as exc:
+        logger.exception("Falló la exportación %s", job.pk)
+        job.estado = 'error'
+        job.error = str(exc)
+        job.terminado_en = timezone.now()
+        job.duracion = time.perf_counter() - inicio
+        job.save(update_fields=['estado', 'error', 'terminado_en', 'duracion'])
+        return job
+
+    job.estado = 'listo'
+    job.archivo = nombre
+    job.filas = total
+    job.bytes = storage.size(nombre)
+    job.duracion = time.perf_counter() - inicio
+    job.terminado_en = timezone.now()
+    job.save(update_fields=['estado', 'archivo', 'filas', 'bytes', 'duracion', 'terminado_en'])
+    return job
+
+
+def procesar_exportaciones_pendientes(limite=None):
+    """
+    Procesa trabajos pendientes hasta vaciar la cola (o hasta 'limite').
+    Devuelve la lista de trabajos procesados.
+    """
+    procesados = []
+    while limite is None or len(procesados) < limite:
+        job = reclamar_siguiente()
+        if job is None:
+            break
+        procesados.append(ejecutar_exportacion(job))
+    return procesados
@@ -1,12 +1,48 @@
 from django import forms
+from django.core.validators import FileExtensionValidator
 from .models import Vehiculo, DocumentoVehiculo
+from .subidas import tomar_subida
+
+
+# =========================
+# Subida directa (ver subidas.py)
+# =========================
+
+class SubidaDirectaMixin:
+    """
+    Agrega el campo oculto 'subida' (token de una subida directa) a un
+    formulario con archivo. Si viene, cleaned_data['subida'] es la
+    SubidaArchivo ya verificada y el archivo no viaja en el POST.
+    """
+    destino_subida = None
+    campo_archivo = None
+
+    def __init__(self, *args, usuario=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.usuario = usuario
+        if self.campo_archivo in self.fields:
+            self.fields['subida'] = forms.UUIDField(required=False, widget=forms.HiddenInput)
+            self.fields[self.campo_archivo].widget.attrs['data-subida-destino'] = self.destino_subida
+
+    def clean(self):
+        cleaned_data = super().clean()
+        token = cleaned_data.get('subida')
+        if token:
+            try:
+                cleaned_data['subida'] = tomar_subida(token, self.usuario, self.destino_subida)
+            except ValueError as exc:
+                self.add_error(self.campo_archivo, str(exc))
+        return cleaned_data
 
 
 # =========================
 # Vehículo
 # =========================
 
-class VehiculoForm(forms.ModelForm):
+class VehiculoForm(SubidaDirectaMixin, forms.ModelForm):
+    destino_subida = 'vehiculo'
+    campo_archivo = 'foto'
+
     class Meta:
         model = Vehiculo
         fields = [
@@ -54,7 +90,10 @@ class VehiculoForm(forms.ModelForm):
 # Documento de Vehículo
 # =========================
 
-class DocumentoVehiculoForm(forms.ModelForm):
+class DocumentoVehiculoForm(SubidaDirectaMixin, forms.ModelForm):
+    destino_subida = 'documento'
+    campo_archivo = 'archivo'
+
     class Meta:
         model = DocumentoVehiculo
         fields = ['tipo', 'fecha_expedicion', 'fecha_vencimiento', 'archivo']
@@ -75,3 +114,51 @@ class DocumentoVehiculoForm(forms.ModelForm):
 
             # Resto de campos
             field.widget.attrs.update({'class': 'form-control'})
+
+
+# =========================
+# Importación masiva
+# =========================
+#
+# Mismas reglas de validación que los formularios de arriba, sin los campos
+# de archivo y sin consultas por fila: la placa única y el tipo de documento
+# los resuelve el importador con mapas en memoria (ver importacion.py).
+
+class VehiculoImportForm(VehiculoForm):
+    class Meta(VehiculoForm.Meta):
+        fields = [
+            'placa',
+            'marca',
+            'modelo',
+            'anio',
+            'tipo',
+            'activo',
+            'responsable_nombre',
+            'responsable_email',
+        ]
+
+    def validate_unique(self):
+        pass
+
+
+class DocumentoImportForm(DocumentoVehiculoForm):
+    class Meta(DocumentoVehiculoForm.Meta):
+        fields = ['fecha_expedicion', 'fecha_vencimiento']
+
+
+class ImportacionForm(forms.Form):
+    TIPO_CHOICES = [
+        ('vehiculos', 'Vehículos'),
+        ('documentos', 'Documentos'),
+    ]
+
+    tipo = forms.ChoiceField(choices=TIPO_CHOICES)
+    archivo = forms.FileField(
+        validators=[FileExtensionValidator(['csv', 'xlsx'])],
+        help_text="CSV (UTF-8) o Excel (XLSX) con una fila de encabezados.",
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['tipo'].widget.attrs.update({'class': 'form-select'})
+        self.fields['archivo'].widget.attrs.update({'class': 'form-control'})
@@ -0,0 +1,138 @@
+import io
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+
+# =========================
+# Miniaturas de las fotos de vehículos
+# =========================
+#
+# Cada foto se reduce a anchos fijos en WebP y JPEG, guardados junto a la
+# original (vehiculos/ABC123/foto-320.webp, ...). Vehiculo.miniaturas
+# guarda los nombres; las plantillas arman <picture> con srcset a partir de
+# ahí y el navegador baja solo el tamaño que necesita.
+
+ANCHOS_MINIATURA = (320, 640, 1280)
+
+# formato -> (formato de Pillow, extensión, opciones de guardado)
+FORMATOS_MINIATURA = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def _storage_foto():
+    from .models import Vehiculo
+
+    return Vehiculo._meta.get_field('foto').storage
+
+
+def nombre_miniatura(nombre_foto, ancho, extension):
+    base = os.path.splitext(nombre_foto)[0]
+    return f"{base}-{ancho}.{extension}"
+
+
+def generar_derivados(nombre_foto):
+    """
+    Genera las miniaturas de la foto 'nombre_foto' y las guarda en el mismo
+    storage. No toca la base de datos (se usa desde los procesos del
+    backfill). Devuelve el dict que va en Vehiculo.miniaturas.
+    """
+    storage = _storage_foto()
+    with storage.open(nombre_foto, 'rb') as archivo:
+        imagen = Image.open(archivo)
+        imagen = ImageOps.exif_transpose(imagen).convert('RGB')
+
+    miniaturas = {
+        'origen': nombre_foto,
+        'ancho': imagen.width,
+        'alto': imagen.height,
+    }
+    for formato in FORMATOS_MINIATURA:
+        miniaturas[formato] = {}
+
+    for ancho in ANCHOS_MINIATURA:
+        reducida = imagen
+        if imagen.width > ancho:
+            alto = round(imagen.height * ancho / imagen.width)
+            reducida = imagen.resize((ancho, alto), Image.LANCZOS)
+
+        for formato, (formato_pil, extension, opciones) in FORMATOS_MINIATURA.items():
+            buffer = io.BytesIO()
+            reducida.save(buffer, formato_pil, **opciones)
+            nombre = nombre_miniatura(nombre_foto, ancho, extension)
+            if storage.exists(nombre):
+                storage.delete(nombre)
+            miniaturas[formato][str(reducida.width)] = storage.save(nombre, ContentFile(buffer.getvalue()))
+
+        # No se agranda: una foto más angosta que este ancho ya quedó completa
+        if imagen.width <= ancho:
+            break
+
+    return miniaturas
+
+
+def _nombres(miniaturas):
+    return {
+        nombre
+        for formato in FORMATOS_MINIATURA
+        for nombre in (miniaturas or {}).get(formato, {}).values()
+    }
+
+
+def borrar_derivados(anteriores, actuales=None):
+    """
+    Borra del storage las miniaturas de 'anteriores' que no siguen en uso
+    en 'actuales' (todas, si no se pasa).
+    """
+    storage = _storage_foto()
+    for nombre in _nombres(anteriores) - _nombres(actuales):
+        storage.delete(nombre)
+
+
+def generar_miniaturas(vehiculo):
+    """
+    Genera (o regenera) las miniaturas de la foto del vehículo y las guarda
+    en Vehiculo.miniaturas. Si la foto no se puede leer, deja las miniaturas
+    vacías y las plantillas usan la original.
+    """
+    from .models import Vehiculo
+
+    anteriores = vehiculo.miniaturas
+    miniaturas = {}
+    if vehiculo.foto:
+        try:
+            miniaturas = generar_derivados(vehiculo.foto.name)
+        except Exception:
+            logger.exception("No se pudieron generar las miniaturas del vehículo %s", vehiculo.pk)
+
+    borrar_derivados(anteriores, miniaturas)
+
+    # update() para no volver a disparar los signals de post_save
+    Vehiculo.objects.filter(pk=vehiculo.pk).update(miniaturas=miniaturas)
+    vehiculo.miniaturas = miniaturas
+    return miniaturas
+
+
+def miniaturas_vigentes(vehiculo):
+    """
+    Miniaturas de la foto actual. Mientras el worker regenera las de una
+    foto nueva, las guardadas son de la anterior y no se usan.
+    """
+    miniaturas = vehiculo.miniaturas or {}
+    if not vehiculo.foto or miniaturas.get('origen') != vehiculo.foto.name:
+        return {}
+    return miniaturas
+
+
+def srcset(vehiculo, formato):
+    storage = _storage_foto()
+    return ', '.join(
+        f"{storage.url(nombre)} {ancho}w"
+        for ancho, nombre in miniaturas_vigentes(vehiculo).get(formato, {}).items()
+    )
@@ -0,0 +1,443 @@
+import csv
+import io
+import logging
+import os
+import time
+import unicodedata
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.forms.models import model_to_dict
+from django.utils import timezone, translation
+
+from .busqueda import normalizar_placa, reconstruir_indice_busqueda
+from .cambios import registrar_cambios
+from .empresas import empresa_actual_id, empresa_para_guardar, usar_empresa
+from .exportaciones import storage_exportaciones
+from .forms import DocumentoImportForm, VehiculoImportForm
+from .models import DocumentoVehiculo, Importacion, TipoDocumento, Vehiculo
+from .services import invalidar_conteos_documentos, invalidar_snapshot_dashboard
+from .xlsx import fecha_desde_excel, leer_xlsx
+
+logger = logging.getLogger(__name__)
+
+
+# =========================
+# Importación masiva (CSV / XLSX)
+# =========================
+#
+# El archivo se lee fila por fila y se procesa en lotes: cada lote se valida
+# con los formularios de siempre, resuelve placas y tipos con una consulta
+# (no una por fila) y se escribe con bulk_create/bulk_update en su propia
+# transacción. Las filas rechazadas van a un CSV de errores.
+
+# Encabezado normalizado (minúsculas, sin tildes) -> campo. Acepta los
+# encabezados de los exports, así un export se puede volver a importar.
+COLUMNAS_VEHICULOS = {
+    'placa': 'placa',
+    'marca': 'marca',
+    'modelo': 'modelo',
+    'ano': 'anio',
+    'anio': 'anio',
+    'tipo': 'tipo',
+    'activo': 'activo',
+    'responsable': 'responsable_nombre',
+    'responsable_nombre': 'responsable_nombre',
+    'email responsable': 'responsable_email',
+    'responsable_email': 'responsable_email',
+}
+
+COLUMNAS_DOCUMENTOS = {
+    'placa': 'placa',
+    'tipo documento': 'tipo',
+    'tipo': 'tipo',
+    'fecha expedicion': 'fecha_expedicion',
+    'fecha_expedicion': 'fecha_expedicion',
+    'fecha vencimiento': 'fecha_vencimiento',
+    'fecha_vencimiento': 'fecha_vencimiento',
+}
+
+_VERDADEROS = {'si', 's', 'true', '1', 'x', 'yes', 'verdadero'}
+_FALSOS = {'no', 'n', 'false', '0', 'falso'}
+
+
+def _normalizar(texto):
+    texto = unicodedata.normalize('NFKD', str(texto or '').strip().lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def _limpiar(valor):
+    if isinstance(valor, str):
+        return valor.strip()
+    return '' if valor is None else valor
+
+
+def leer_filas(archivo, nombre):
+    """
+    Devuelve (encabezados, iterador de filas) de un CSV (UTF-8, separado por
+    coma, punto y coma o tabulador) o de un XLSX, según la extensión de
+    'nombre'. 'archivo' es un archivo binario con seek.
+    """
+    if nombre.lower().endswith('.xlsx'):
+        filas = leer_xlsx(archivo)
+    else:
+        texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+        muestra = texto.read(4096)
+        texto.seek(0)
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t')
+        except csv.Error:
+            dialecto = csv.excel
+        filas = csv.reader(texto, dialecto)
+
+    encabezados = next(filas, None) or []
+    return [str(e or '') for e in encabezados], filas
+
+
+@dataclass
+class ResultadoImportacion:
+    filas: int = 0
+    creados: int = 0
+    actualizados: int = 0
+    errores: int = 0
+    segundos: float = 0.0
+
+    @property
+    def filas_por_segundo(self):
+        if not self.segundos:
+            return 0.0
+        return self.filas / self.segundos
+
+
+class _Importador:
+    columnas = {}
+    obligatorias = ()
+
+    def __init__(self, encabezados, errores_destino=None, lote=None, usuario=None):
+        self.lote = max(1, lote or settings.IMPORTACION_LOTE)
+        self.usuario = usuario if usuario and usuario.is_authenticated else None
+        self.resultado = ResultadoImportacion()
+
+        # Campo -> posición de la columna (la primera si se repite)
+        self.indices = {}
+        for posicion, encabezado in enumerate(encabezados):
+            campo = self.columnas.get(_normalizar(encabezado))
+            if campo:
+                self.indices.setdefault(campo, posicion)
+
+        faltantes = [c for c in self.obligatorias if c not in self.indices]
+        if faltantes:
+            raise ValueError(f"Faltan columnas obligatorias: {', '.join(faltantes)}.")
+
+        self.escritor = None
+        if errores_destino is not None:
+            self.escritor = csv.writer(errores_destino)
+            self.escritor.writerow(['Fila', 'Error', *encabezados])
+
+    def importar(self, filas):
+        inicio = time.perf_counter()
+        lote = []
+        # Fila 1 = encabezados
+        for numero, fila in enumerate(filas, start=2):
+            if not any(_limpiar(v) != '' for v in fila):
+                continue
+            self.resultado.filas += 1
+            lote.append((numero, fila))
+            if len(lote) >= self.lote:
+                self._procesar_lote(lote)
+                lote = []
+        if lote:
+            self._procesar_lote(lote)
+
+        self.terminar()
+        self.resultado.segundos = time.perf_counter() - inicio
+        return self.resultado
+
+    def _datos(self, fila):
+        return {
+            campo: _limpiar(fila[posicion]) if posicion < len(fila) else ''
+            for campo, posicion in self.indices.items()
+        }
+
+    def _error(self, numero, fila, mensaje):
+        self.resultado.errores += 1
+        if self.escritor:
+            self.escritor.writerow([numero, mensaje, *fila])
+
+    @staticmethod
+    def _errores_form(form):
+        return '; '.join(
+            f"{campo}: {' '.join(mensajes)}"
+            for campo, mensajes in form.errors.items()
+        )
+
+    def _guardar(self, lote, crear, actualizar, campos):
+        """
+        Escribe un lote en una transacción. Si falla, todas sus filas se
+        reportan como error y se sigue con el siguiente lote.
+        """
+        try:
+            with transaction.atomic():
+                if crear:
+                    self.modelo.objects.bulk_create(crear)
+                    registrar_cambios(crear, 'crear')
+                if actualizar:
+                    self.modelo.objects.bulk_update(actualizar, campos)
+                    registrar_cambios(actualizar, 'actualizar')
+        except DatabaseError as exc:
+            logger.exception("Falló un lote de la importación")
+            for numero, fila in lote:
+                self._error(numero, fila, f"Error al guardar el lote: {exc}")
+            return
+        self.resultado.creados += len(crear)
+        self.resultado.actualizados += len(actualizar)
+
+    def _procesar_lote(self, lote):
+        raise NotImplementedError
+
+    def terminar(self):
+        pass
+
+
+class ImportadorVehiculos(_Importador):
+    """
+    Crea o actualiza vehículos por placa. En los existentes solo cambian las
+    columnas presentes en el archivo.
+    """
+    modelo = Vehiculo
+    columnas = COLUMNAS_VEHICULOS
+    obligatorias = ('placa',)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.campos = VehiculoImportForm._meta.fields
+        self.placas_vistas = {}
+
+    def _procesar_lote(self, lote):
+        pendientes = []
+        for numero, fila in lote:
+            datos = self._datos(fila)
+            if 'activo' in datos:
+                activo = _normalizar(datos['activo'])
+                if activo == '':
+                    # Vacío: se conserva el valor actual (o activo si es nuevo)
+                    del datos['activo']
+                elif activo in _VERDADEROS:
+                    datos['activo'] = True
+                elif activo in _FALSOS:
+                    datos['activo'] = False
+                else:
+                    self._error(numero, fila, f"activo: valor no válido {datos['activo']!r}.")
+                    continue
+
+            placa = normalizar_placa(str(datos['placa']))
+            if placa in self.placas_vistas:
+                self._error(numero, fila, f"Placa repetida en el archivo (fila {self.placas_vistas[placa]}).")
+                continue
+            if placa:
+                self.placas_vistas[placa] = numero
+            pendientes.append((numero, fila, placa, datos))
+
+        # Una consulta por lote para saber qué placas ya existen (en
+        # cualquier empresa: la placa es única entre todas)
+        existentes = Vehiculo._base_manager.in_bulk(
+            [placa for _, _, placa, _ in pendientes if placa],
+            field_name='placa',
+        )
+
+        ahora = timezone.now()
+        empresa_id = empresa_actual_id()
+        validos, crear, actualizar = [], [], []
+        for numero, fila, placa, datos in pendientes:
+            instancia = existentes.get(placa)
+            if instancia is not None and instancia.empresa_id != empresa_id:
+                self._error(numero, fila, "placa: el vehículo está registrado en otra empresa.")
+                continue
+            inicial = model_to_dict(instancia, fields=self.campos) if instancia else {'activo': True}
+            form = VehiculoImportForm(data={**inicial, **datos}, instance=instancia)
+            if not form.is_valid():
+                self._error(numero, fila, self._errores_form(form))
+                continue
+            if instancia is not None and not form.has_changed():
+                continue
+
+            vehiculo = form.save(commit=False)
+            if instancia is None:
+                vehiculo.creado_por = self.usuario
+                # bulk_create no llama a save(): la empresa se asigna aquí
+                vehiculo.empresa_id = empresa_id
+                crear.append(vehiculo)
+            else:
+                # bulk_update no aplica auto_now
+                vehiculo.actualizado_en = ahora
+                actualizar.append(vehiculo)
+            validos.append((numero, fila))
+
+        self._guardar(validos, crear, actualizar, [*self.campos, 'actualizado_en'])
+
+    def terminar(self):
+        if self.resultado.creados or self.resultado.actualizados:
+            # bulk_create/bulk_update no disparan signals
+            reconstruir_indice_busqueda()
+            invalidar_snapshot_dashboard()
+
+
+class ImportadorDocumentos(_Importador):
+    """
+    Crea documentos por (placa, tipo, fecha de vencimiento); si ya existe,
+    actualiza la fecha de expedición. El tipo se busca por nombre.
+    """
+    modelo = DocumentoVehiculo
+    columnas = COLUMNAS_DOCUMENTOS
+    obligatorias = ('placa', 'tipo', 'fecha_vencimiento')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tipos = {_normalizar(t.nombre): t for t in TipoDocumento.objects.all()}
+        self.claves_vistas = {}
+
+    @staticmethod
+    def _fecha(valor):
+        # En XLSX las fechas llegan como número de serie
+        if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            return fecha_desde_excel(valor)
+        return valor
+
+    def _procesar_lote(self, lote):
+        pendientes = []
+        for numero, fila in lote:
+            datos = self._datos(fila)
+            tipo = self.tipos.get(_normalizar(datos['tipo']))
+            if tipo is None:
+                self._error(numero, fila, f"tipo: no existe el tipo de documento {datos['tipo']!r}.")
+                continue
+
+            form = DocumentoImportForm(data={
+                'fecha_expedicion': self._fecha(datos.get('fecha_expedicion', '')),
+                'fecha_vencimiento': self._fecha(datos['fecha_vencimiento']),
+            })
+            if not form.is_valid():
+                self._error(numero, fila, self._errores_form(form))
+                continue
+            pendientes.append((numero, fila, normalizar_placa(str(datos['placa'])), tipo, form.cleaned_data))
+
+        vehiculos = dict(
+            Vehiculo.objects.filter(placa__in={p[2] for p in pendientes})
+            .values_list('placa', 'id')
+        )
+
+        por_clave = []
+        for numero, fila, placa, tipo, limpio in pendientes:
+            vehiculo_id = vehiculos.get(placa)
+            if vehiculo_id is None:
+                self._error(numero, fila, f"placa: no existe el vehículo {placa!r}.")
+                continue
+            clave = (vehiculo_id, tipo.pk, limpio['fecha_vencimiento'])
+            if clave in self.claves_vistas:
+                self._error(numero, fila, f"Documento repetido en el archivo (fila {self.claves_vistas[clave]}).")
+                continue
+            self.claves_vistas[clave] = numero
+            por_clave.append((numero, fila, clave, tipo, limpio))
+
+        # Documentos ya cargados de estos vehículos, en una consulta
+        existentes = {
+            (d.vehiculo_id, d.tipo_id, d.fecha_vencimiento): d
+            for d in DocumentoVehiculo.objects.filter(
+                vehiculo_id__in={c[0] for _, _, c, _, _ in por_clave},
+                fecha_vencimiento__in={c[2] for _, _, c, _, _ in por_clave},
+            )
+        }
+
+        ahora = timezone.now()
+        validos, crear, actualizar = [], [], []
+        for numero, fila, clave, tipo, limpio in por_clave:
+            documento = existentes.get(clave)
+            if documento is None:
+                documento = DocumentoVehiculo(
+                    vehiculo_id=clave[0],
+                    empresa_id=empresa_actual_id(),
+                    tipo=tipo,
+                    fecha_expedicion=limpio['fecha_expedicion'],
+                    fecha_vencimiento=limpio['fecha_vencimiento'],
+                )
+                # bulk_create no llama a save(): el estado se calcula aquí
+                documento.estado = documento.calcular_estado()
+                crear.append(documento)
+            elif documento.fecha_expedicion != limpio['fecha_expedicion']:
+                documento.fecha_expedicion = limpio['fecha_expedicion']
+                documento.actualizado_en = ahora
+                actualizar.append(documento)
+            else:
+                continue
+            validos.append((numero, fila))
+
+        self._guardar(validos, crear, actualizar, ['fecha_expedicion', 'actualizado_en'])
+
+    def terminar(self):
+        if self.resultado.creados or self.resultado.actualizados:
+            invalidar_conteos_documentos()
+            invalidar_snapshot_dashboard()
+
+
+IMPORTADORES = {
+    'vehiculos': ImportadorVehiculos,
+    'documentos': ImportadorDocumentos,
+}
+
+
+def importar_archivo(tipo, archivo, nombre, errores_destino=None, lote=None, usuario=None):
+    """
+    Importa 'archivo' (CSV o XLSX, según 'nombre') como 'vehiculos' o
+    'documentos'. Escribe las filas rechazadas en 'errores_destino' (archivo
+    de texto) si se indica. Devuelve un ResultadoImportacion.
+    Todo se carga en la empresa actual (placas y tipos se buscan en ella).
+    Lanza ValueError si faltan columnas obligatorias o no hay empresa.
+    """
+    # Fechas y números se interpretan con el formato local (dd/mm/aaaa)
+    with translation.override(settings.LANGUAGE_CODE), usar_empresa(empresa_para_guardar()):
+        encabezados, filas = leer_filas(archivo, nombre)
+        importador = IMPORTADORES[tipo](encabezados, errores_destino, lote, usuario)
+        return importador.importar(filas)
+
+
+def importar_subida(tipo, archivo, usuario=None):
+    """
+    Importa un archivo subido desde la web y registra el resultado en una
+    Importacion, con el CSV de errores en el almacenamiento de exportaciones.
+    """
+    importacion = Importacion.objects.create(
+        empresa_id=empresa_para_guardar(),
+        tipo=tipo,
+        nombre_archivo=archivo.name[:255],
+        creado_por=usuario if usuario and usuario.is_authenticated else None,
+    )
+    storage = storage_exportaciones()
+    nombre_errores = f"importaciones/{importacion.pk}-errores.csv"
+    ruta = storage.path(nombre_errores)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+
+    try:
+        with open(ruta, 'w', encoding='utf-8', newline='') as errores:
+            resultado = importar_archivo(
+                tipo, archivo.file, archivo.name,
+                errores_destino=errores,
+                usuario=usuario,
+            )
+    except ValueError:
+        importacion.delete()
+        storage.delete(nombre_errores)
+        raise
+
+    if not resultado.errores:
+        storage.delete(nombre_errores)
+        nombre_errores = ''
+
+    importacion.filas = resultado.filas
+    importacion.creados = resultado.creados
+    importacion.actualizados = resultado.actualizados
+    importacion.errores = resultado.errores
+    importacion.duracion = resultado.segundos
+    importacion.archivo_errores = nombre_errores
+    importacion.save()
+    return importacion
@@ -0,0 +1,445 @@
+import bisect
+import contextvars
+import json
+import logging
+import os
+import re
+import socket
+import statistics
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from dataclasses import dataclass, field
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.backends.signals import connection_created
+from django.utils.module_loading import import_string
+
+from .cache_compartida import cache_compartida
+
+logger = logging.getLogger(__name__)
+logger_lentos = logging.getLogger('gestion_flota.lentos')
+
+
+# =========================
+# Instrumentación de requests
+# =========================
+#
+# InstrumentacionMiddleware abre una Medicion por request (en un contextvar,
+# así la ven también los hilos de sync_to_async) y al final la suma a los
+# agregados del proceso:
+# - consultas SQL, su tiempo y sus huellas (SQL sin valores): una huella
+#   repetida en el mismo request es la firma de un N+1;
+# - tiempo de render de plantillas;
+# - tiempo en el storage de archivos y en el envío de correo;
+# - adquisición de la conexión (abrirla, tomarla del pool o su health
+#   check), medida cuando la primera consulta la pide: un request que no
+#   consulta no paga ninguna (ConexionBDMiddleware la publica).
+# Los requests más lentos que INSTRUMENTACION_LENTO_MS van al log
+# 'gestion_flota.lentos' como JSON. Con una caché compartida cada proceso
+# publica sus agregados en ella y /diagnostico/requests/ (solo staff) junta
+# los de todos; /metrics los expone para Prometheus (ver metricas.py). Con
+# la caché local cada proceso solo ve lo suyo, y así lo avisan ambos.
+
+_medicion_actual = contextvars.ContextVar('flota_medicion', default=None)
+
+# Huellas repetidas que se guardan por vista
+DUPLICADAS_POR_VISTA = 10
+
+
+@dataclass
+class Medicion:
+    consultas: int = 0
+    tiempo_sql: float = 0.0
+    tiempo_plantillas: float = 0.0
+    tiempo_storage: float = 0.0
+    tiempo_email: float = 0.0
+    tiempo_conexion: float = 0.0
+    huellas: Counter = field(default_factory=Counter)
+    # Tiempos que se están midiendo: una plantilla que renderiza otra (los
+    # widgets de un formulario) o un storage que llama a otro método no
+    # se cuentan dos veces
+    en_curso: set = field(default_factory=set)
+
+    def duplicadas(self):
+        return [(huella, veces) for huella, veces in self.huellas.most_common() if veces > 1]
+
+
+def medicion_actual():
+    return _medicion_actual.get()
+
+
+def iniciar_medicion():
+    medicion = Medicion()
+    _medicion_actual.set(medicion)
+    return medicion
+
+
+def terminar_medicion():
+    _medicion_actual.set(None)
+
+
+_LISTA_PARAMETROS = re.compile(r'\(\s*%s(?:\s*,\s*%s)+\s*\)')
+_ESPACIOS = re.compile(r'\s+')
+
+
+def huella_sql(sql):
+    """
+    SQL normalizado: los valores ya vienen aparte (%s); además se colapsan
+    las listas IN de largo variable y los espacios.
+    """
+    sql = _LISTA_PARAMETROS.sub('(%s, ...)', sql)
+    return _ESPACIOS.sub(' ', sql).strip()[:500]
+
+
+# =========================
+# Ganchos
+# =========================
+
+def _envoltura_sql(execute, sql, params, many, context):
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.tiempo_sql += time.perf_counter() - inicio
+        medicion.consultas += 1
+        medicion.huellas[huella_sql(sql)] += 1
+
+
+def _conexion_creada(sender, connection, **kwargs):
+    if _envoltura_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_envoltura_sql)
+
+
+def _medir(funcion, atributo):
+    """
+    Envuelve 'funcion' para sumar su duración a Medicion.<atributo> cuando
+    hay una medición activa.
+    """
+    @wraps(funcion)
+    def envoltura(*args, **kwargs):
+        medicion = _medicion_actual.get()
+        if medicion is None or atributo in medicion.en_curso:
+            return funcion(*args, **kwargs)
+        medicion.en_curso.add(atributo)
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            setattr(medicion, atributo, getattr(medicion, atributo) + time.perf_counter() - inicio)
+            medicion.en_curso.discard(atributo)
+    envoltura._flota_medido = True
+    return envoltura
+
+
+def _envolver(clase, metodos, atributo):
+    for nombre in metodos:
+        original = clase.__dict__.get(nombre)
+        if original is not None and not getattr(original, '_flota_medido', False):
+            setattr(clase, nombre, _medir(original, atributo))
+
+
+_METODOS_STORAGE = ('_open', '_save', 'delete', 'exists', 'size', 'url', 'listdir', 'get_modified_time')
+
+# Lo que hace el ORM antes de cada cursor: verificar la conexión persistente
+# (CONN_HEALTH_CHECKS, una vez por request) y abrirla o tomarla del pool
+_METODOS_CONEXION = ('close_if_health_check_failed', 'ensure_connection')
+
+_instalado = False
+
+
+def instalar():
+    """
+    Conecta los ganchos (se llama una vez, desde AppConfig.ready()).
+    """
+    global _instalado
+    if _instalado:
+        return
+    _instalado = True
+
+    connection_created.connect(_conexion_creada, dispatch_uid='flota_instrumentacion_sql')
+
+    from django.core.files.storage import FileSystemStorage, storages
+    from django.template.backends.django import Template
+
+    _envolver(Template, ('render',), 'tiempo_plantillas')
+    for clase in {type(storages['default']), FileSystemStorage}:
+        _envolver(clase, _METODOS_STORAGE, 'tiempo_storage')
+    _envolver(import_string(settings.EMAIL_BACKEND), ('send_messages',), 'tiempo_email')
+    for clase in {BaseDatabaseWrapper, type(connections[DEFAULT_DB_ALIAS])}:
+        _envolver(clase, _METODOS_CONEXION, 'tiempo_conexion')
+
+
+# =========================
+# Agregados por vista
+# =========================
+
+# Límites (segundos) del histograma de duración que expone /metrics
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@dataclass
+class _Vista:
+    requests: int = 0
+    # Últimas muestras: (duración, consultas, sql, plantillas, externo), en s
+    muestras: deque = field(default_factory=lambda: deque(maxlen=settings.INSTRUMENTACION_MUESTRAS))
+    # Huella -> [requests en que se repitió, máximo de repeticiones]
+    duplicadas: dict = field(default_factory=dict)
+    # Acumulados desde que arrancó el proceso (contadores de /metrics); el
+    # histograma tiene un casillero por límite más el de +Inf
+    histograma: list = field(default_factory=lambda: [0] * (len(LIMITES_LATENCIA) + 1))
+    segundos: float = 0.0
+    consultas: int = 0
+    segundos_sql: float = 0.0
+
+
+class Agregados:
+    """
+    Agregados de los requests atendidos por este proceso, y de los aciertos
+    y fallos de las cachés de la aplicación (ver contar_cache()).
+    """
+
+    def __init__(self):
+        self._candado = threading.Lock()
+        self._vistas = defaultdict(_Vista)
+        # Nombre de la caché -> [aciertos, fallos]
+        self._caches = defaultdict(lambda: [0, 0])
+
+    def registrar(self, vista, duracion, medicion):
+        muestra = (
+            round(duracion, 5),
+            medicion.consultas,
+            round(medicion.tiempo_sql, 5),
+            round(medicion.tiempo_plantillas, 5),
+            round(medicion.tiempo_storage + medicion.tiempo_email, 5),
+        )
+        casillero = bisect.bisect_left(LIMITES_LATENCIA, duracion)
+        with self._candado:
+            datos = self._vistas[vista]
+            datos.requests += 1
+            datos.muestras.append(muestra)
+            datos.histograma[casillero] += 1
+            datos.segundos += duracion
+            datos.consultas += medicion.consultas
+            datos.segundos_sql += medicion.tiempo_sql
+            for huella, veces in medicion.duplicadas():
+                visto = datos.duplicadas.setdefault(huella, [0, 0])
+                visto[0] += 1
+                visto[1] = max(visto[1], veces)
+            if len(datos.duplicadas) > DUPLICADAS_POR_VISTA * 5:
+                datos.duplicadas = dict(
+                    sorted(datos.duplicadas.items(), key=lambda item: -item[1][0])[:DUPLICADAS_POR_VISTA]
+                )
+
+    def registrar_cache(self, nombre, acierto):
+        with self._candado:
+            self._caches[nombre][0 if acierto else 1] += 1
+
+    def instantanea(self):
+        with self._candado:
+            return {
+                'vistas': {
+                    vista: {
+                        'requests': datos.requests,
+                        'muestras': list(datos.muestras),
+                        'duplicadas': dict(datos.duplicadas),
+                        'histograma': list(datos.histograma),
+                        'segundos': datos.segundos,
+                        'consultas': datos.consultas,
+                        'segundos_sql': datos.segundos_sql,
+                    }
+                    for vista, datos in self._vistas.items()
+                },
+                'caches': {nombre: list(valores) for nombre, valores in self._caches.items()},
+            }
+
+
+agregados = Agregados()
+
+
+def contar_cache(nombre, acierto):
+    """
+    Anota un acierto o un fallo de la caché 'nombre' (conteos, dashboard,
+    roles...). Lo llaman los helpers que leen la caché.
+    """
+    agregados.registrar_cache(nombre, acierto)
+
+
+# Un proceso que no publica en este tiempo se da por terminado
+_VIDA_PROCESO = 60 * 10
+_ultima_publicacion = 0.0
+
+# Cada proceso ocupa una ranura con cache.add(), que es atómico: no hay un
+# registro compartido que dos workers lean y reescriban a la vez
+MAX_PROCESOS = 64
+# (proceso, ranura) que ocupa este proceso
+_ranura = None
+
+
+def _proceso():
+    # Se calcula cada vez: los workers de gunicorn son forks del maestro
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _clave_proceso(proceso):
+    return f"flota:instrumentacion:proceso:{proceso}"
+
+
+def _clave_ranura(indice):
+    return f"flota:instrumentacion:ranura:{indice}"
+
+
+def _ocupar_ranura(proceso):
+    global _ranura
+    if _ranura is not None and _ranura[0] == proceso:
+        clave = _clave_ranura(_ranura[1])
+        if cache.get(clave) == proceso:
+            cache.touch(clave, _VIDA_PROCESO)
+            return
+    # Primera publicación, fork de gunicorn o ranura vencida
+    for indice in range(MAX_PROCESOS):
+        if cache.add(_clave_ranura(indice), proceso, _VIDA_PROCESO):
+            _ranura = (proceso, indice)
+            return
+    _ranura = None
+    logger.warning("Sin ranura para publicar los agregados de %s (más de %s procesos).", proceso, MAX_PROCESOS)
+
+
+def publicar_agregados(forzar=False):
+    """
+    Deja los agregados de este proceso en la caché, como mucho una vez cada
+    INSTRUMENTACION_PUBLICAR_SEGUNDOS, y devuelve lo publicado (None si no
+    publicó). Con la caché local no hace nada: ningún otro proceso los leería.
+    """
+    global _ultima_publicacion
+    if not cache_compartida():
+        return None
+    ahora = time.time()
+    if not forzar and ahora - _ultima_publicacion < settings.INSTRUMENTACION_PUBLICAR_SEGUNDOS:
+        return None
+    _ultima_publicacion = ahora
+
+    proceso = _proceso()
+    instantanea = agregados.instantanea()
+    cache.set(_clave_proceso(proceso), instantanea, _VIDA_PROCESO)
+    _ocupar_ranura(proceso)
+    return instantanea
+
+
+def instantaneas_procesos(propia=None):
+    """
+    Agregados por proceso: {proceso: instantánea}. Los de este ('propia' o,
+    si no se pasa, al día) y los que los demás publicaron en la caché (solo
+    si es compartida).
+    """
+    proceso = _proceso()
+    instantaneas = {proceso: propia or agregados.instantanea()}
+    if cache_compartida():
+        ranuras = cache.get_many([_clave_ranura(indice) for indice in range(MAX_PROCESOS)])
+        otros = {_clave_proceso(p): p for p in ranuras.values() if p != proceso}
+        for clave, instantanea in cache.get_many(list(otros)).items():
+            instantaneas[otros[clave]] = instantanea
+    return instantaneas
+
+
+def registrar_request(request, response, duracion, medicion):
+    """
+    Suma el request a los agregados y, si fue lento, lo escribe en el log.
+    """
+    coincidencia = getattr(request, 'resolver_match', None)
+    vista = coincidencia.view_name if coincidencia else '(sin vista)'
+    agregados.registrar(vista, duracion, medicion)
+
+    if duracion * 1000 >= settings.INSTRUMENTACION_LENTO_MS:
+        logger_lentos.warning(json.dumps({
+            'vista': vista,
+            'metodo': request.method,
+            'ruta': request.path,
+            'estado': response.status_code,
+            'ms': round(duracion * 1000, 1),
+            'conexion_ms': round(getattr(request, 'adquisicion_bd', 0) * 1000, 2),
+            'consultas': medicion.consultas,
+            'sql_ms': round(medicion.tiempo_sql * 1000, 1),
+            'plantillas_ms': round(medicion.tiempo_plantillas * 1000, 1),
+            'storage_ms': round(medicion.tiempo_storage * 1000, 1),
+            'email_ms': round(medicion.tiempo_email * 1000, 1),
+            'duplicadas': [{'sql': huella, 'veces': veces} for huella, veces in medicion.duplicadas()[:5]],
+        }, ensure_ascii=False))
+
+    response['Server-Timing'] = ', '.join(filter(None, [
+        response.get('Server-Timing', ''),
+        f'sql;desc="{medicion.consultas} consultas";dur={medicion.tiempo_sql * 1000:.1f}',
+        f'plantillas;dur={medicion.tiempo_plantillas * 1000:.1f}',
+        f'total;dur={duracion * 1000:.1f}',
+    ]))
+
+
+# =========================
+# Resumen (percentiles)
+# =========================
+
+def _percentiles(valores, puntos=(50, 95, 99)):
+    if not valores:
+        return {f'p{p}': None for p in puntos}
+    if len(valores) == 1:
+        return {f'p{p}': valores[0] for p in puntos}
+    cortes = statistics.quantiles(valores, n=100, method='inclusive')
+    return {f'p{p}': cortes[p - 1] for p in puntos}
+
+
+def _ms(valores):
+    return {clave: None if valor is None else round(valor * 1000, 1) for clave, valor in valores.items()}
+
+
+def resumen_requests():
+    """
+    Percentiles por vista, juntando los agregados publicados por todos los
+    procesos (más los de este, al día). Ordenado por p99 de duración.
+    """
+    instantaneas = instantaneas_procesos().values()
+
+    vistas = defaultdict(lambda: {'requests': 0, 'muestras': [], 'duplicadas': {}})
+    for instantanea in instantaneas:
+        for vista, datos in instantanea['vistas'].items():
+            total = vistas[vista]
+            total['requests'] += datos['requests']
+            total['muestras'].extend(datos['muestras'])
+            for huella, (requests, maximo) in datos['duplicadas'].items():
+                visto = total['duplicadas'].setdefault(huella, [0, 0])
+                visto[0] += requests
+                visto[1] = max(visto[1], maximo)
+
+    filas = []
+    for vista, datos in vistas.items():
+        duraciones, consultas, sql, plantillas, externo = (list(c) for c in zip(*datos['muestras']))
+        filas.append({
+            'vista': vista,
+            'requests': datos['requests'],
+            'muestras': len(duraciones),
+            'duracion_ms': _ms(_percentiles(duraciones)),
+            'consultas': {**_percentiles(consultas, (50, 95)), 'max': max(consultas)},
+            'sql_ms': _ms(_percentiles(sql, (50, 95))),
+            'plantillas_ms': _ms(_percentiles(plantillas, (50, 95))),
+            'externo_ms': _ms(_percentiles(externo, (50, 95))),
+            'duplicadas': [
+                {'sql': huella, 'requests': requests, 'max_repeticiones': maximo}
+                for huella, (requests, maximo) in sorted(
+                    datos['duplicadas'].items(), key=lambda item: -item[1][0]
+                )[:DUPLICADAS_POR_VISTA]
+            ],
+        })
+    filas.sort(key=lambda fila: -(fila['duracion_ms']['p99'] or 0))
+    resumen = {'procesos': len(instantaneas), 'cache_compartida': cache_compartida(), 'vistas': filas}
+    if not resumen['cache_compartida']:
+        resumen['aviso'] = (
+            "La caché es local a cada proceso: estos datos son solo del worker "
+            "que respondió. Configura REDIS_URL para juntar todos."
+        )
+    return resumen
@@ -0,0 +1,32 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from gestion_flota.services import actualizar_estados_documentos
+
+
+class Command(BaseCommand):
+    help = (
+        "Rollover diario del estado de los documentos (vigente / próximo / "
+        "vencido): solo actualiza las filas que cruzaron un umbral."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fecha',
+            type=date.fromisoformat,
+            default=None,
+            help='Fecha de referencia AAAA-MM-DD (por defecto hoy).'
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        cambios = actualizar_estados_documentos(hoy=options['fecha'])
+        segundos = time.perf_counter() - inicio
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Estados actualizados en {segundos:.2f} s: "
+            f"{cambios['vencido']} a vencido, {cambios['proximo']} a próximo, "
+            f"{cambios['vigente']} a vigente."
+        ))
@@ -0,0 +1,132 @@
+import random
+import statistics
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from gestion_flota.busqueda import (
+    autocompletar_placas,
+    buscar_vehiculos,
+    filtro_busqueda,
+    filtro_icontains,
+    reconstruir_indice_busqueda,
+)
+from gestion_flota.empresas import empresa_para_guardar
+from gestion_flota.models import Vehiculo
+
+MARCAS = ['Toyota', 'Chevrolet', 'Renault', 'Mazda', 'Nissan', 'Kia', 'Ford', 'Hyundai']
+MODELOS = ['Hilux', 'Duster', 'Spark', 'Frontier', 'Sportage', 'Ranger', 'Tucson', 'Logan']
+TIPOS = ['Camioneta', 'Automóvil', 'Camión', 'Moto']
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _placa(i):
+    letras = ''.join(string.ascii_uppercase[(i // 1000 // 26 ** n) % 26] for n in (2, 1, 0))
+    return f"{letras}{i % 1000:03d}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la búsqueda de vehículos con índice (FTS5 / pg_trgm) contra "
+        "los icontains originales, y mide el autocompletado de placas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--generar',
+            type=int,
+            default=0,
+            help='Crea N vehículos sintéticos (dentro de una transacción que '
+                 'se revierte al final) antes de medir.',
+        )
+        parser.add_argument(
+            '--repeticiones',
+            type=int,
+            default=20,
+            help='Veces que se repite cada consulta (por defecto 20).',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options['generar']:
+                    self._generar(options['generar'])
+                self._medir_todo(options['repeticiones'])
+                if options['generar']:
+                    raise _Rollback
+        except _Rollback:
+            self.stdout.write("Datos sintéticos revertidos.")
+
+    def _generar(self, total):
+        aleatorio = random.Random(42)
+        # bulk_create no llama a save(): la empresa se asigna aquí
+        empresa_id = empresa_para_guardar()
+        Vehiculo.objects.bulk_create(
+            [
+                Vehiculo(
+                    placa=_placa(i),
+                    marca=aleatorio.choice(MARCAS),
+                    modelo=aleatorio.choice(MODELOS),
+                    tipo=aleatorio.choice(TIPOS),
+                    empresa_id=empresa_id,
+                )
+                for i in range(total)
+            ],
+            batch_size=1000,
+        )
+        # bulk_create no dispara signals: el índice FTS5 se llena de una vez
+        reconstruir_indice_busqueda()
+        self.stdout.write(f"Generados {total} vehículos.")
+
+    def _medir_todo(self, repeticiones):
+        placa = Vehiculo.objects.order_by('?').values_list('placa', flat=True).first()
+        if placa is None:
+            self.stdout.write("No hay vehículos; use --generar N.")
+            return
+
+        activos = Vehiculo.objects.filter(activo=True)
+        terminos = [placa[:4], 'Toyota', 'Hilux', 'toyota hilux']
+
+        for q in terminos:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"== q={q!r}"))
+            self._medir(
+                'icontains (original)', repeticiones,
+                lambda: list(activos.filter(filtro_icontains(q)).order_by('placa')[:24]),
+            )
+            self._medir(
+                'índice (listado)', repeticiones,
+                lambda: list(activos.filter(filtro_busqueda(q)).order_by('placa')[:24]),
+            )
+            self._medir('índice con ranking', repeticiones, lambda: buscar_vehiculos(q))
+
+        prefijo = placa[:3]
+        self.stdout.write(self.style.MIGRATE_HEADING(f"== autocompletar {prefijo!r}"))
+        self._medir(
+            'icontains (original)', repeticiones,
+            lambda: list(
+                activos.filter(filtro_icontains(prefijo))
+                .order_by('placa')
+                .values('id', 'placa', 'marca', 'modelo')[:10]
+            ),
+        )
+        self._medir('rango de placa', repeticiones, lambda: autocompletar_placas(prefijo))
+
+    def _medir(self, nombre, repeticiones, consulta):
+        tiempos = []
+        filas = 0
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            filas = len(consulta())
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+
+        tiempos.sort()
+        p95 = tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))]
+        self.stdout.write(
+            f"  {nombre}: mediana={statistics.median(tiempos):.2f} ms "
+            f"p95={p95:.2f} ms filas={filas}"
+        )
@@ -0,0 +1,113 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import connection
+
+from gestion_flota.conexiones import adquirir_conexion
+from gestion_flota.empresas import usar_empresa
+from gestion_flota.models import Vehiculo
+
+MODOS = ('nuevas', 'persistentes', 'pool')
+
+
+def _resumen(valores):
+    ordenados = sorted(valores)
+    return {
+        'media': statistics.fmean(ordenados),
+        'p50': ordenados[len(ordenados) // 2],
+        'p99': ordenados[min(len(ordenados) - 1, int(len(ordenados) * 0.99))],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara los modos de conexión a la base (DB_CONEXIONES): simula "
+        "requests del detalle de vehículo y mide el tiempo de adquirir la "
+        "conexión y el total por request. Pensado para PostgreSQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modos', default=','.join(MODOS), help='Modos a comparar, separados por coma.')
+        parser.add_argument('--peticiones', type=int, default=200, help='Requests simulados por modo.')
+        # Uso interno: mide un solo modo (el de DB_CONEXIONES) y responde en JSON
+        parser.add_argument('--interno', action='store_true', help='(interno)')
+
+    def handle(self, *args, **options):
+        if options['interno']:
+            self.stdout.write(json.dumps(self._medir(options['peticiones'])))
+            return
+
+        modos = [m.strip() for m in options['modos'].split(',') if m.strip()]
+        desconocidos = [m for m in modos if m not in MODOS]
+        if desconocidos:
+            raise CommandError(f"Modos desconocidos: {', '.join(desconocidos)}.")
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING(
+                f"La base es {connection.vendor}: sin pool y con conexiones locales, "
+                "los resultados no representan a PostgreSQL."
+            ))
+            modos = [m for m in modos if m != 'pool']
+
+        base = None
+        for modo in modos:
+            # Cada modo en su propio proceso: settings.py arma DATABASES con él
+            proceso = subprocess.run(
+                [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'benchmark_conexiones',
+                 '--interno', '--peticiones', str(options['peticiones'])],
+                env={**os.environ, 'DB_CONEXIONES': modo},
+                capture_output=True,
+                text=True,
+            )
+            if proceso.returncode != 0:
+                error = proceso.stderr.strip().splitlines()[-1:] or ['sin detalle']
+                self.stdout.write(self.style.ERROR(f"{modo}: falló ({error[0]})"))
+                continue
+
+            resultado = json.loads(proceso.stdout.strip().splitlines()[-1])
+            adquisicion, total = resultado['adquisicion'], resultado['total']
+            linea = (
+                f"{modo}: adquirir conexión media={adquisicion['media'] * 1000:.2f} ms "
+                f"p50={adquisicion['p50'] * 1000:.2f} ms p99={adquisicion['p99'] * 1000:.2f} ms | "
+                f"request media={total['media'] * 1000:.2f} ms p99={total['p99'] * 1000:.2f} ms"
+            )
+            if base is None:
+                base = total['media']
+            else:
+                linea += f" | ahorro por request {(base - total['media']) * 1000:+.2f} ms"
+            self.stdout.write(self.style.SUCCESS(linea))
+
+    def _medir(self, peticiones):
+        with usar_empresa(None):
+            vehiculo_id = Vehiculo.objects.order_by('id').values_list('id', flat=True).first()
+        if vehiculo_id is None:
+            raise CommandError("No hay vehículos para simular el detalle.")
+
+        adquisiciones, totales = [], []
+        # Las primeras 10 no cuentan: abren el pool o la conexión persistente
+        for numero in range(peticiones + 10):
+            # Mismas señales que el handler: cierran las conexiones vencidas
+            request_started.send(sender=self.__class__)
+            inicio = time.perf_counter()
+            adquisicion = adquirir_conexion()
+            with usar_empresa(None):
+                vehiculo = Vehiculo.objects.con_estado_documentos().get(pk=vehiculo_id)
+                list(vehiculo.documentos.select_related('tipo'))
+            total = time.perf_counter() - inicio
+            request_finished.send(sender=self.__class__)
+
+            if numero >= 10:
+                adquisiciones.append(adquisicion)
+                totales.append(total)
+
+        return {
+            'modo': settings.DB_CONEXIONES,
+            'adquisicion': _resumen(adquisiciones),
+            'total': _resumen(totales),
+        }
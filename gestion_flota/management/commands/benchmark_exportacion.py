@@ -0,0 +1,113 @@
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+
+from gestion_flota import views
+from gestion_flota.models import DocumentoVehiculo, TipoDocumento, Vehiculo
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _rss_pico_mb():
+    if resource is None:
+        return None
+    # ru_maxrss está en KB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el export CSV de vehículos y documentos: tiempo hasta el primer "
+        "byte, tiempo total, bytes, pico de memoria Python y pico de RSS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--generar',
+            type=int,
+            default=0,
+            help='Crea N documentos sintéticos (dentro de una transacción que '
+                 'se revierte al final) antes de medir.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options['generar']:
+                    self._generar(options['generar'])
+                self._medir('vehiculos', views.vehiculo_export_csv)
+                self._medir('documentos', views.documento_export_csv)
+                if options['generar']:
+                    raise _Rollback
+        except _Rollback:
+            self.stdout.write("Datos sintéticos revertidos.")
+
+    def _generar(self, total):
+        tipo = TipoDocumento.objects.create(nombre="Benchmark")
+        # bulk_create no llama a save(): la empresa se asigna aquí
+        empresa_id = tipo.empresa_id
+        por_vehiculo = 5
+        vehiculos = Vehiculo.objects.bulk_create(
+            [
+                Vehiculo(placa=f"BX{i:07d}"[:10], marca="Marca", modelo="Modelo", empresa_id=empresa_id)
+                for i in range(max(1, total // por_vehiculo))
+            ],
+            batch_size=1000,
+        )
+        hoy = date.today()
+        docs = (
+            DocumentoVehiculo(
+                vehiculo=vehiculos[i % len(vehiculos)],
+                empresa_id=empresa_id,
+                tipo=tipo,
+                fecha_vencimiento=hoy + timedelta(days=(i % 120) - 60),
+            )
+            for i in range(total)
+        )
+        lote = []
+        for doc in docs:
+            lote.append(doc)
+            if len(lote) >= 5000:
+                DocumentoVehiculo.objects.bulk_create(lote)
+                lote = []
+        if lote:
+            DocumentoVehiculo.objects.bulk_create(lote)
+        self.stdout.write(f"Generados {len(vehiculos)} vehículos y {total} documentos.")
+
+    def _medir(self, nombre, vista):
+        request = RequestFactory().get('/')
+        request.user = User(is_superuser=True)
+
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        response = vista(request)
+
+        ttfb = None
+        total_bytes = 0
+        for chunk in response.streaming_content:
+            if ttfb is None:
+                ttfb = time.perf_counter() - inicio
+            total_bytes += len(chunk)
+
+        duracion = time.perf_counter() - inicio
+        _, pico_python = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        rss = _rss_pico_mb()
+        self.stdout.write(
+            f"{nombre}: ttfb={ttfb * 1000:.1f} ms total={duracion:.2f} s "
+            f"bytes={total_bytes} pico_python={pico_python / 1024 / 1024:.1f} MB "
+            f"rss_pico={'n/d' if rss is None else f'{rss:.1f} MB'}"
+        )
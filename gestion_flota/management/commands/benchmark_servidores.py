@@ -0,0 +1,189 @@
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
+import requests
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion_flota.empresas import usar_empresa
+from gestion_flota.models import Vehiculo
+
+# Mismos argumentos que render_start.sh para cada modo
+SERVIDORES = {
+    'wsgi': ['flota.wsgi:application'],
+    'asgi': ['flota.asgi:application', '-k', 'uvicorn_worker.UvicornWorker'],
+}
+
+
+def _percentil(valores, p):
+    if len(valores) < 2:
+        return valores[0] if valores else 0.0
+    return statistics.quantiles(valores, n=100, method='inclusive')[p - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga WSGI vs ASGI: levanta gunicorn en cada modo con el "
+        "mismo número de workers, pide las páginas con N clientes "
+        "concurrentes y compara peticiones por segundo y latencias p50/p99."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modos', default='wsgi,asgi', help='Modos a medir, separados por coma.')
+        parser.add_argument('--workers', type=int, default=2, help='Workers de gunicorn en cada modo.')
+        parser.add_argument('--concurrencia', type=int, default=16, help='Clientes concurrentes.')
+        parser.add_argument('--duracion', type=float, default=10.0, help='Segundos de medición por modo.')
+        parser.add_argument('--calentamiento', type=float, default=2.0, help='Segundos de carga previa sin medir.')
+        parser.add_argument('--puerto', type=int, default=8765)
+        parser.add_argument(
+            '--usuario',
+            default=None,
+            help='Usuario con el que se piden las páginas (por defecto, el primer superusuario).',
+        )
+        parser.add_argument(
+            '--rutas',
+            default=None,
+            help='Rutas a pedir, separadas por coma (por defecto: dashboard, '
+                 'documentos y el detalle de un vehículo).',
+        )
+
+    def handle(self, *args, **options):
+        modos = [m.strip() for m in options['modos'].split(',') if m.strip()]
+        desconocidos = [m for m in modos if m not in SERVIDORES]
+        if desconocidos:
+            raise CommandError(f"Modos desconocidos: {', '.join(desconocidos)}.")
+
+        cookies = {settings.SESSION_COOKIE_NAME: self._sesion(options['usuario'])}
+        rutas = self._rutas(options['rutas'])
+        self.stdout.write(
+            f"Rutas: {', '.join(rutas)} | workers={options['workers']} "
+            f"concurrencia={options['concurrencia']} duración={options['duracion']:.0f} s"
+        )
+
+        for modo in modos:
+            servidor = self._levantar(modo, options['workers'], options['puerto'])
+            try:
+                base = f"http://127.0.0.1:{options['puerto']}"
+                self._cargar(base, rutas, cookies, options['concurrencia'], options['calentamiento'])
+                resultados, segundos = self._cargar(
+                    base, rutas, cookies, options['concurrencia'], options['duracion'],
+                )
+            finally:
+                servidor.terminate()
+                servidor.wait(timeout=30)
+            self._informar(modo, resultados, segundos)
+
+    def _sesion(self, username):
+        """
+        Crea una sesión de login para el usuario (como Client.force_login)
+        y devuelve su clave para la cookie.
+        """
+        usuarios = User.objects.filter(is_active=True)
+        usuario = (
+            usuarios.filter(username=username).first() if username
+            else usuarios.filter(is_superuser=True).order_by('id').first()
+        )
+        if usuario is None:
+            raise CommandError("No se encontró el usuario para la prueba.")
+
+        sesion = import_module(settings.SESSION_ENGINE).SessionStore()
+        sesion[SESSION_KEY] = str(usuario.pk)
+        sesion[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        sesion[HASH_SESSION_KEY] = usuario.get_session_auth_hash()
+        sesion.create()
+        return sesion.session_key
+
+    def _rutas(self, rutas):
+        if rutas:
+            return [r.strip() for r in rutas.split(',') if r.strip()]
+        with usar_empresa(None):
+            vehiculo_id = Vehiculo.objects.order_by('id').values_list('id', flat=True).first()
+        rutas = ['/', '/documentos/']
+        if vehiculo_id is not None:
+            rutas.append(f'/vehiculos/{vehiculo_id}/')
+        return rutas
+
+    def _levantar(self, modo, workers, puerto):
+        comando = [
+            sys.executable, '-m', 'gunicorn', *SERVIDORES[modo],
+            '--workers', str(workers),
+            '--bind', f'127.0.0.1:{puerto}',
+            '--timeout', '600',
+            '--log-level', 'warning',
+        ]
+        servidor = subprocess.Popen(comando, cwd=settings.BASE_DIR, env=os.environ.copy())
+
+        limite = time.monotonic() + 30
+        while time.monotonic() < limite:
+            if servidor.poll() is not None:
+                raise CommandError(f"gunicorn ({modo}) terminó al arrancar (código {servidor.returncode}).")
+            try:
+                socket.create_connection(('127.0.0.1', puerto), timeout=0.5).close()
+                return servidor
+            except OSError:
+                time.sleep(0.2)
+        servidor.terminate()
+        raise CommandError(f"gunicorn ({modo}) no respondió en el puerto {puerto}.")
+
+    def _cargar(self, base, rutas, cookies, concurrencia, duracion):
+        """
+        Pide las rutas en rueda desde 'concurrencia' hilos durante
+        'duracion' segundos. Devuelve ({ruta: [(segundos, ok)]}, segundos).
+        """
+        resultados = defaultdict(list)
+        candado = threading.Lock()
+        fin = time.monotonic() + duracion
+
+        def cliente(numero):
+            sesion = requests.Session()
+            sesion.cookies.update(cookies)
+            propios = []
+            i = numero
+            while time.monotonic() < fin:
+                ruta = rutas[i % len(rutas)]
+                i += 1
+                inicio = time.perf_counter()
+                try:
+                    respuesta = sesion.get(base + ruta, allow_redirects=False, timeout=60)
+                    ok = respuesta.status_code == 200
+                except requests.RequestException:
+                    ok = False
+                propios.append((ruta, time.perf_counter() - inicio, ok))
+            with candado:
+                for ruta, segundos, ok in propios:
+                    resultados[ruta].append((segundos, ok))
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrencia) as hilos:
+            list(hilos.map(cliente, range(concurrencia)))
+        return resultados, time.perf_counter() - inicio
+
+    def _informar(self, modo, resultados, segundos):
+        todas = [s for medidas in resultados.values() for s, ok in medidas if ok]
+        errores = sum(1 for medidas in resultados.values() for _, ok in medidas if not ok)
+        if not todas:
+            self.stdout.write(self.style.ERROR(f"{modo}: ninguna respuesta 200 ({errores} errores)."))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{modo}: {len(todas) / segundos:.1f} req/s | "
+            f"p50={_percentil(todas, 50) * 1000:.1f} ms p99={_percentil(todas, 99) * 1000:.1f} ms | "
+            f"{len(todas)} ok, {errores} errores"
+        ))
+        for ruta, medidas in sorted(resultados.items()):
+            tiempos = [s for s, ok in medidas if ok]
+            if tiempos:
+                self.stdout.write(
+                    f"  {ruta}: {len(tiempos)} ok | p50={_percentil(tiempos, 50) * 1000:.1f} ms "
+                    f"p99={_percentil(tiempos, 99) * 1000:.1f} ms"
+                )
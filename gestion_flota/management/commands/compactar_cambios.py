@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from gestion_flota.cambios import compactar_cambios
+
+
+class Command(BaseCommand):
+    help = (
+        "Compacta el registro de cambios: deja el último evento de cada "
+        "vehículo/documento y descarta los borrados viejos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retencion-borrados',
+            type=int,
+            default=None,
+            help='Días que se conservan los borrados (por defecto '
+                 'CAMBIOS_RETENCION_BORRADOS_DIAS).',
+        )
+
+    def handle(self, *args, **options):
+        compactacion = compactar_cambios(options['retencion_borrados'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{compactacion.reemplazados} eventos reemplazados y "
+            f"{compactacion.borrados_descartados} borrados descartados; "
+            f"quedan {compactacion.restantes} (piso {compactacion.piso})."
+        ))
@@ -1,12 +1,13 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
-from gestion_flota.services import enviar_alerta_documentos
+from gestion_flota.services import enviar_alerta_documentos, enviar_alertas_incrementales
 
 
 class Command(BaseCommand):
     help = (
-        "Envía por correo un resumen de los documentos de flota "
-        "que están vencidos o próximos a vencer."
+        "Envía por correo a cada responsable las alertas de documentos de flota "
+        "que cruzaron un umbral (vencido, <= 7 días, <= 30 días...) desde la "
+        "última ejecución. Con --completo envía el resumen total."
     )
 
     def add_arguments(self, parser):
@@ -14,18 +15,60 @@ class Command(BaseCommand):
             '--dias',
             type=int,
             default=30,
-            help='Número de días hacia adelante para considerar "próximos a vencer".'
+            help='Con --completo: días hacia adelante para considerar "próximos a vencer".'
+        )
+        parser.add_argument(
+            '--umbrales',
+            default=None,
+            help='Umbrales en días separados por coma, ej. "30,7" (por defecto ALERTAS_UMBRALES).'
+        )
+        parser.add_argument(
+            '--completo',
+            action='store_true',
+            help='Envía todos los documentos vencidos / próximos, no solo los cambios.'
+        )
+        parser.add_argument(
+            '--concurrencia',
+            type=int,
+            default=None,
+            help='Hilos de envío en paralelo (por defecto ALERTAS_CONCURRENCIA).'
         )
 
     def handle(self, *args, **options):
-        dias = options['dias']
-        total = enviar_alerta_documentos(dias=dias)
+        if options['completo']:
+            resultado = enviar_alerta_documentos(
+                dias=options['dias'],
+                concurrencia=options['concurrencia'],
+            )
+        else:
+            umbrales = None
+            if options['umbrales']:
+                try:
+                    umbrales = [int(u) for u in options['umbrales'].split(',') if u.strip()]
+                except ValueError:
+                    raise CommandError("--umbrales debe ser una lista de enteros, ej. 30,7")
+            resultado = enviar_alertas_incrementales(
+                umbrales=umbrales,
+                concurrencia=options['concurrencia'],
+            )
 
-        if total:
+        if resultado.mensajes or resultado.fallidos:
             self.stdout.write(
                 self.style.SUCCESS(
-                    f"Se envió una alerta con {total} documento(s) en riesgo."
+                    f"Se enviaron {resultado.mensajes} mensaje(s) a "
+                    f"{resultado.destinatarios} destinatario(s) con "
+                    f"{resultado.documentos} documento(s) en riesgo "
+                    f"en {resultado.segundos:.2f} s "
+                    f"({resultado.mensajes_por_segundo:.1f} mensajes/s)."
                 )
             )
+            if resultado.fallidos:
+                self.stdout.write(self.style.WARNING(
+                    f"{resultado.fallidos} mensaje(s) fallaron tras los reintentos; "
+                    "quedaron en CorreoFallido (manage.py reenviar_correos_fallidos)."
+                ))
         else:
-            self.stdout.write("No hay documentos vencidos ni próximos a vencer. No se envió correo.")
+            self.stdout.write(
+                "No hay alertas nuevas de documentos. No se envió correo. "
+                f"({resultado.segundos:.2f} s)"
+            )
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from gestion_flota.models import DIAS_ALERTA, DocumentoVehiculo, Vehiculo
+from gestion_flota.services import obtener_documentos_para_alerta
+
+
+def consultas_calientes():
+    """
+    Devuelve [(nombre, queryset)] con las consultas de las rutas más usadas,
+    construidas igual que en las vistas y servicios.
+    """
+    proximos, vencidos = obtener_documentos_para_alerta(dias=DIAS_ALERTA)
+    docs = DocumentoVehiculo.objects.select_related('vehiculo', 'tipo')
+    vehiculos = Vehiculo.objects.filter(activo=True)
+
+    return [
+        ('dashboard: vehículos activos', vehiculos.values('id')),
+        ('dashboard: próximos', DocumentoVehiculo.objects.filter(estado='proximo')
+         .order_by('fecha_vencimiento', 'id')[:10]),
+        ('dashboard: vencidos', DocumentoVehiculo.objects.filter(estado='vencido')
+         .order_by('-fecha_vencimiento', '-id')[:10]),
+        ('dashboard: conteos por estado', DocumentoVehiculo.objects.values('estado')),
+        ('documento_list: todos (página)', docs.order_by('fecha_vencimiento', 'id')[:51]),
+        ('documento_list: vencidos (página)',
+         docs.por_estado('vencidos').order_by('fecha_vencimiento', 'id')[:51]),
+        ('documento_list: próximos (página)',
+         docs.por_estado('proximos').order_by('fecha_vencimiento', 'id')[:51]),
+        ('documento_list: vigentes (página)',
+         docs.por_estado('vigentes').order_by('fecha_vencimiento', 'id')[:51]),
+        ('documento_export_csv: vencidos',
+         docs.por_estado('vencidos').order_by('fecha_vencimiento')),
+        ('alertas: próximos', proximos),
+        ('alertas: vencidos', vencidos),
+        ('vehiculo_list: página',
+         vehiculos.con_estado_documentos().order_by('placa', 'id')[:25]),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Imprime el plan de ejecución (EXPLAIN) de las consultas más usadas "
+        "de la flota, para detectar regresiones de índices."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='En PostgreSQL usa EXPLAIN ANALYZE (ejecuta la consulta).',
+        )
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        explain_opts = {}
+        if options['analyze'] and vendor == 'postgresql':
+            explain_opts = {'analyze': True, 'buffers': True}
+
+        self.stdout.write(f"Backend: {vendor}\n")
+
+        for nombre, qs in consultas_calientes():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"== {nombre}"))
+            self.stdout.write(qs.explain(**explain_opts))
+            self.stdout.write("")
@@ -0,0 +1,78 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from gestion_flota.imagenes import borrar_derivados, generar_derivados
+from gestion_flota.models import Vehiculo
+
+
+def _generar(vehiculo_id, nombre_foto):
+    # Corre en otro proceso: solo Pillow y storage, sin base de datos
+    try:
+        return vehiculo_id, generar_derivados(nombre_foto), None
+    except Exception as exc:
+        return vehiculo_id, None, str(exc)
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera las miniaturas WebP/JPEG de las fotos de vehículos que aún no "
+        "las tienen, repartiendo el trabajo entre varios procesos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--todas',
+            action='store_true',
+            help='Regenera también las fotos que ya tienen miniaturas.',
+        )
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Procesos en paralelo (por defecto, uno por CPU).',
+        )
+
+    def handle(self, *args, **options):
+        vehiculos = Vehiculo.objects.exclude(foto='').exclude(foto__isnull=True)
+        if not options['todas']:
+            vehiculos = vehiculos.filter(miniaturas={})
+        pendientes = {}
+        anteriores = {}
+        for vehiculo_id, foto, miniaturas in vehiculos.values_list('id', 'foto', 'miniaturas'):
+            pendientes[vehiculo_id] = foto
+            anteriores[vehiculo_id] = miniaturas
+        if not pendientes:
+            self.stdout.write("No hay fotos pendientes.")
+            return
+
+        # Los procesos hijos no deben heredar las conexiones abiertas
+        connections.close_all()
+
+        inicio = time.perf_counter()
+        listas = errores = 0
+        with ProcessPoolExecutor(
+            max_workers=max(1, options['procesos']),
+            initializer=django.setup,
+        ) as pool:
+            futuros = [pool.submit(_generar, pk, nombre) for pk, nombre in pendientes.items()]
+            for futuro in as_completed(futuros):
+                vehiculo_id, miniaturas, error = futuro.result()
+                if error:
+                    errores += 1
+                    self.stdout.write(self.style.ERROR(
+                        f"Vehículo {vehiculo_id} ({pendientes[vehiculo_id]}): {error}"
+                    ))
+                    continue
+                borrar_derivados(anteriores[vehiculo_id], miniaturas)
+                Vehiculo.objects.filter(pk=vehiculo_id).update(miniaturas=miniaturas)
+                listas += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{listas} fotos con miniaturas, {errores} con error, "
+            f"en {time.perf_counter() - inicio:.1f} s."
+        ))
@@ -0,0 +1,68 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion_flota.empresas import usar_empresa
+from gestion_flota.importacion import IMPORTADORES, importar_archivo
+from gestion_flota.models import Empresa
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa vehículos o documentos desde un CSV o XLSX, por lotes "
+        "(bulk_create/bulk_update), y deja las filas rechazadas en un CSV."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=sorted(IMPORTADORES))
+        parser.add_argument('archivo', help='Ruta del CSV (UTF-8) o XLSX.')
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=None,
+            help='Filas por lote y por transacción (por defecto IMPORTACION_LOTE).'
+        )
+        parser.add_argument(
+            '--errores',
+            default=None,
+            help='CSV de filas rechazadas (por defecto <archivo>.errores.csv).'
+        )
+        parser.add_argument(
+            '--empresa',
+            default=None,
+            help='Slug de la empresa destino (obligatorio si hay más de una).'
+        )
+
+    def handle(self, *args, **options):
+        ruta_errores = options['errores'] or f"{options['archivo']}.errores.csv"
+
+        empresa = None
+        if options['empresa']:
+            empresa = Empresa.objects.filter(slug=options['empresa']).first()
+            if empresa is None:
+                raise CommandError(f"No existe la empresa {options['empresa']!r}.")
+
+        try:
+            with open(options['archivo'], 'rb') as archivo, \
+                    open(ruta_errores, 'w', encoding='utf-8', newline='') as errores, \
+                    usar_empresa(empresa):
+                resultado = importar_archivo(
+                    options['tipo'],
+                    archivo,
+                    options['archivo'],
+                    errores_destino=errores,
+                    lote=options['lote'],
+                )
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado.filas} filas en {resultado.segundos:.2f} s "
+            f"({resultado.filas_por_segundo:.0f} filas/s): "
+            f"{resultado.creados} creados, {resultado.actualizados} actualizados, "
+            f"{resultado.errores} con error."
+        ))
+        if resultado.errores:
+            self.stdout.write(f"Filas rechazadas en {ruta_errores}")
+        else:
+            os.remove(ruta_errores)
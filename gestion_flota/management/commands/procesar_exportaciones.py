@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from gestion_flota.exportaciones import procesar_exportaciones_pendientes
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de exportaciones: genera en segundo plano los archivos CSV/XLSX "
+        "solicitados desde las vistas de exportación."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Procesa la cola hasta vaciarla y termina.',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=5,
+            help='Segundos entre revisiones de la cola (modo continuo).',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            for job in procesar_exportaciones_pendientes():
+                if job.estado == 'listo':
+                    self.stdout.write(self.style.SUCCESS(
+                        f"Exportación {job.pk}: {job.filas} filas, "
+                        f"{job.bytes} bytes en {job.duracion:.2f} s"
+                    ))
+                elif job.estado == 'error':
+                    self.stdout.write(self.style.ERROR(
+                        f"Exportación {job.pk} falló: {job.error}"
+                    ))
+
+            if options['una_vez']:
+                break
+            time.sleep(options['intervalo'])
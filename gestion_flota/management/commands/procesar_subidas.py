@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from gestion_flota.subidas import (
+    limpiar_subidas_vencidas,
+    procesar_miniaturas_pendientes,
+    procesar_subidas_pendientes,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de subidas directas: valida los archivos que el navegador subió "
+        "al almacenamiento, los asocia a su documento o vehículo y genera las "
+        "miniaturas de las fotos que cambiaron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Procesa la cola hasta vaciarla y termina.',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=5,
+            help='Segundos entre revisiones de la cola (modo continuo).',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            for subida in procesar_subidas_pendientes():
+                if subida.estado == 'lista':
+                    self.stdout.write(self.style.SUCCESS(
+                        f"Subida {subida.pk} ({subida.nombre_original}) lista."
+                    ))
+                else:
+                    self.stdout.write(self.style.ERROR(
+                        f"Subida {subida.pk} falló: {subida.error}"
+                    ))
+
+            for vehiculo in procesar_miniaturas_pendientes():
+                self.stdout.write(f"Miniaturas de {vehiculo.placa} generadas.")
+
+            borradas = limpiar_subidas_vencidas()
+            if borradas:
+                self.stdout.write(f"{borradas} subidas vencidas eliminadas.")
+
+            if options['una_vez']:
+                break
+            time.sleep(options['intervalo'])
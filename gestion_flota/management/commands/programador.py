@@ -0,0 +1,73 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from gestion_flota.programador import cargar_tareas, ejecutar_tarea, identificador_proceso, turnos_pendientes
+
+
+class Command(BaseCommand):
+    help = (
+        "Programador de tareas de larga duración: ejecuta las tareas de "
+        "FLOTA_TAREAS (alertas, cachés, exportaciones) según su expresión cron, "
+        "dentro de un mismo proceso ya cargado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ejecutar',
+            metavar='TAREA',
+            help='Ejecuta una tarea ahora (respetando el bloqueo) y termina.',
+        )
+        parser.add_argument(
+            '--listar',
+            action='store_true',
+            help='Muestra las tareas configuradas y termina.',
+        )
+
+    def handle(self, *args, **options):
+        tareas = cargar_tareas()
+        propietario = identificador_proceso()
+
+        if options['listar']:
+            for tarea in tareas:
+                destino = tarea.comando or tarea.funcion
+                self.stdout.write(f"{tarea.nombre}: '{tarea.cron}' -> {destino} {' '.join(tarea.args)}")
+            return
+
+        if options['ejecutar']:
+            por_nombre = {t.nombre: t for t in tareas}
+            if options['ejecutar'] not in por_nombre:
+                raise CommandError(f"No existe la tarea {options['ejecutar']!r}.")
+            self._ejecutar(por_nombre[options['ejecutar']], timezone.now(), propietario)
+            return
+
+        self.stdout.write(f"Programador iniciado ({propietario}) con {len(tareas)} tarea(s).")
+        ultimo_minuto = None
+        while True:
+            ahora = timezone.localtime().replace(second=0, microsecond=0)
+            if ultimo_minuto is None:
+                ultimo_minuto = ahora - timedelta(minutes=1)
+            if ahora > ultimo_minuto:
+                # Todos los minutos desde la última vuelta: una tarea larga
+                # pudo cubrir el minuto de otra (ej. las alertas de las 7:00)
+                for tarea, minuto in turnos_pendientes(tareas, ultimo_minuto, ahora):
+                    self._ejecutar(tarea, minuto, propietario)
+                ultimo_minuto = ahora
+
+            # Dormir hasta el inicio del siguiente minuto
+            time.sleep(max(1, 60 - timezone.localtime().second))
+
+    def _ejecutar(self, tarea, programada_para, propietario):
+        ejecucion = ejecutar_tarea(tarea, programada_para=programada_para, propietario=propietario)
+        if ejecucion is None:
+            self.stdout.write(f"{tarea.nombre}: la ejecuta otro nodo, se omite.")
+        elif ejecucion.exitosa:
+            self.stdout.write(self.style.SUCCESS(
+                f"{tarea.nombre}: OK en {ejecucion.duracion:.2f} s"
+            ))
+        else:
+            self.stdout.write(self.style.ERROR(
+                f"{tarea.nombre}: falló en {ejecucion.duracion:.2f} s (ver EjecucionTarea {ejecucion.pk})"
+            ))
@@ -0,0 +1,83 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from gestion_flota.contenidos import (
+    borrar_huerfanos,
+    buscar_huerfanos,
+    indexar_documentos_existentes,
+    marcar_huerfanos,
+    verificar_contenidos,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Recolección de archivos de documentos: lista (o borra con --borrar) "
+        "los blobs y PDFs que ya no usa ningún documento."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--borrar',
+            action='store_true',
+            help='Borra los huérfanos encontrados (sin esto solo los lista).',
+        )
+        parser.add_argument(
+            '--gracia',
+            type=float,
+            default=24,
+            help='Horas que un blob debe llevar sin documentos (desde que '
+                 'una corrida lo marcó) o un archivo suelto sin modificarse '
+                 'para borrarlo. Por defecto 24.',
+        )
+        parser.add_argument(
+            '--indexar',
+            action='store_true',
+            help='Antes de recolectar, registra por hash los PDFs subidos '
+                 'antes del índice de contenido (deduplica los repetidos).',
+        )
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Recalcula el SHA-256 de cada blob e informa los que faltan '
+                 'o no coinciden.',
+        )
+
+    def handle(self, *args, **options):
+        if options['indexar']:
+            indexados, deduplicados, errores = indexar_documentos_existentes()
+            self.stdout.write(
+                f"Indexados {indexados} documentos ({deduplicados} apuntan ahora "
+                f"a un blob existente, {errores} no se pudieron leer)."
+            )
+
+        if options['verificar']:
+            problemas = verificar_contenidos()
+            for contenido, problema in problemas:
+                self.stdout.write(self.style.ERROR(f"{contenido.nombre}: {problema}"))
+            self.stdout.write(f"Verificación: {len(problemas)} blobs con problemas.")
+
+        marcados, desmarcados = marcar_huerfanos()
+        if marcados or desmarcados:
+            self.stdout.write(
+                f"{marcados} blobs quedaron sin documentos; {desmarcados} volvieron a usarse."
+            )
+
+        gracia = timezone.now() - timedelta(hours=options['gracia'])
+        contenidos, sueltos = buscar_huerfanos(gracia)
+        for contenido in contenidos:
+            self.stdout.write(f"  blob sin documentos: {contenido.nombre}")
+        for nombre in sueltos:
+            self.stdout.write(f"  archivo sin documento: {nombre}")
+        total = len(contenidos) + len(sueltos)
+
+        if not options['borrar']:
+            self.stdout.write(f"{total} huérfanos (use --borrar para eliminarlos).")
+            return
+
+        liberados = borrar_huerfanos(contenidos, sueltos)
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} huérfanos eliminados, {liberados / (1024 * 1024):.1f} MB liberados."
+        ))
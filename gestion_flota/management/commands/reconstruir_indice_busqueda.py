@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from gestion_flota.busqueda import reconstruir_indice_busqueda
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye el índice FTS5 de búsqueda de vehículos (SQLite) tras "
+        "cargas masivas que no disparan signals."
+    )
+
+    def handle(self, *args, **options):
+        total = reconstruir_indice_busqueda()
+        if total is None:
+            self.stdout.write("Este backend no usa el índice FTS5; nada que hacer.")
+            return
+        self.stdout.write(self.style.SUCCESS(f"Indexados {total} vehículos."))
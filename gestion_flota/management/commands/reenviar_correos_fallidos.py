@@ -0,0 +1,53 @@
+from django.core.mail import EmailMessage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from gestion_flota.despacho import Despachador
+from gestion_flota.models import CorreoFallido
+
+
+class Command(BaseCommand):
+    help = "Reintenta los correos de la cola de fallidos (dead-letter)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrencia',
+            type=int,
+            default=None,
+            help='Hilos de envío en paralelo (por defecto ALERTAS_CONCURRENCIA).'
+        )
+
+    def handle(self, *args, **options):
+        pendientes = list(CorreoFallido.objects.filter(reenviado_en__isnull=True))
+        if not pendientes:
+            self.stdout.write("No hay correos fallidos pendientes.")
+            return
+
+        mensajes = []
+        for fallido in pendientes:
+            mensaje = EmailMessage(
+                subject=fallido.asunto,
+                body=fallido.cuerpo,
+                to=[d.strip() for d in fallido.destinatarios.split(',') if d.strip()],
+            )
+            mensaje.fallido = fallido
+            mensajes.append(mensaje)
+
+        def marcar_reenviado(mensaje):
+            mensaje.fallido.reenviado_en = timezone.now()
+            mensaje.fallido.save(update_fields=['reenviado_en'])
+
+        def actualizar_error(mensaje, error, intentos):
+            mensaje.fallido.error = str(error)[:2000]
+            mensaje.fallido.intentos += intentos
+            mensaje.fallido.save(update_fields=['error', 'intentos'])
+
+        resultado = Despachador(concurrencia=options['concurrencia']).enviar(
+            mensajes,
+            al_enviar=marcar_reenviado,
+            al_fallar=actualizar_error,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Reenviados {resultado.enviados}, siguen fallando {len(resultado.fallidos)} "
+            f"({resultado.mensajes_por_segundo:.1f} mensajes/s)."
+        ))
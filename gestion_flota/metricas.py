@@ -0,0 +1,237 @@
+import hmac
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Q, Sum
+from django.http import HttpResponse
+
+from .empresas import usar_empresa
+from .instrumentacion import LIMITES_LATENCIA, instantaneas_procesos, publicar_agregados
+from .models import CorreoFallido, DocumentoVehiculo, EjecucionAlertas, Empresa, ESTADOS_POR_FILTRO
+from .services import asegurar_estados_al_dia
+
+# =========================
+# Métricas para Prometheus (/metrics)
+# =========================
+#
+# Formato de texto de Prometheus, sin dependencias. Salen de:
+# - los agregados de instrumentacion.py: histograma de duración, consultas
+#   y tiempo SQL por vista (nombre de URL), y aciertos y fallos de las
+#   cachés de la aplicación. Son contadores de cada proceso y salen con la
+#   etiqueta 'proceso' (host:pid), sin sumarlos: un scrape lo atiende
+#   cualquier worker y, si se sumaran, el total bajaría cada vez que
+#   responde uno que no ve a los demás, y Prometheus lo tomaría por un
+#   reinicio. Con la caché compartida salen todos los procesos; con la
+#   local, solo el que responde. Los totales se arman en PromQL
+#   (sum without (proceso) ...);
+# - la base: documentos por estado y empresa (una consulta agrupada que
+#   cubre el índice doc_emp_estado_venc_id_idx) y las corridas de
+#   enviar_alertas_documentos (EjecucionAlertas), que corren en otro proceso.
+# Lo de la base se cachea METRICAS_BASE_TIMEOUT segundos, así varios
+# scrapers no multiplican las consultas.
+#
+# Con FLOTA_METRICAS_TOKEN se pide 'Authorization: Bearer <token>'; sin él,
+# solo la ve el staff con sesión.
+
+METRICAS_BASE_TIMEOUT = 15
+
+_CLAVE_BASE = 'flota:metricas:base'
+
+_TIPO_CONTENIDO = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _autorizado(request):
+    token = settings.METRICAS_TOKEN
+    if token:
+        cabecera = request.META.get('HTTP_AUTHORIZATION', '')
+        return hmac.compare_digest(cabecera.encode(), f'Bearer {token}'.encode())
+    return request.user.is_active and request.user.is_staff
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class _Exposicion:
+    """
+    Arma el texto: cada métrica con su HELP y TYPE, seguida de sus series.
+    """
+
+    def __init__(self):
+        self.lineas = []
+
+    def metrica(self, nombre, tipo, ayuda, series):
+        self.lineas.append(f'# HELP {nombre} {ayuda}')
+        self.lineas.append(f'# TYPE {nombre} {tipo}')
+        for sufijo, etiquetas, valor in series:
+            texto = ','.join(f'{clave}="{_escapar(v)}"' for clave, v in etiquetas.items())
+            self.lineas.append(f'{nombre}{sufijo}{{{texto}}} {valor}' if texto else f'{nombre}{sufijo} {valor}')
+
+    def texto(self):
+        return '\n'.join(self.lineas) + '\n'
+
+
+def _limite(valor):
+    return '+Inf' if valor is None else repr(float(valor))
+
+
+# =========================
+# Requests y cachés
+# =========================
+
+def _procesos():
+    """
+    [(proceso, instantánea)] en orden. Este proceso publica antes lo que
+    expone, así otro worker que atienda el siguiente scrape lee al menos
+    los mismos valores y los contadores no bajan.
+    """
+    return sorted(instantaneas_procesos(publicar_agregados(forzar=True)).items())
+
+
+def _metricas_requests(exposicion, procesos):
+    vistas = [
+        (proceso, vista, datos)
+        for proceso, instantanea in procesos
+        for vista, datos in sorted(instantanea['vistas'].items())
+    ]
+    series = []
+    for proceso, vista, datos in vistas:
+        etiquetas = {'proceso': proceso, 'vista': vista}
+        acumulado = 0
+        for limite, cantidad in zip((*LIMITES_LATENCIA, None), datos['histograma']):
+            acumulado += cantidad
+            series.append(('_bucket', {**etiquetas, 'le': _limite(limite)}, acumulado))
+        series.append(('_sum', etiquetas, round(datos['segundos'], 6)))
+        series.append(('_count', etiquetas, datos['requests']))
+    exposicion.metrica(
+        'flota_request_duracion_segundos', 'histogram',
+        'Duración de los requests por proceso y vista (nombre de URL).', series,
+    )
+    exposicion.metrica(
+        'flota_consultas_sql_total', 'counter',
+        'Consultas SQL ejecutadas por los requests de cada proceso y vista.',
+        [('', {'proceso': proceso, 'vista': vista}, datos['consultas']) for proceso, vista, datos in vistas],
+    )
+    exposicion.metrica(
+        'flota_sql_segundos_total', 'counter',
+        'Tiempo en consultas SQL de los requests de cada proceso y vista.',
+        [
+            ('', {'proceso': proceso, 'vista': vista}, round(datos['segundos_sql'], 6))
+            for proceso, vista, datos in vistas
+        ],
+    )
+
+
+def _metricas_caches(exposicion, procesos):
+    caches = [
+        (proceso, nombre, aciertos, fallos)
+        for proceso, instantanea in procesos
+        for nombre, (aciertos, fallos) in sorted(instantanea['caches'].items())
+    ]
+    exposicion.metrica(
+        'flota_cache_aciertos_total', 'counter', 'Lecturas de caché que encontraron el valor.',
+        [('', {'proceso': proceso, 'cache': nombre}, aciertos) for proceso, nombre, aciertos, _ in caches],
+    )
+    exposicion.metrica(
+        'flota_cache_fallos_total', 'counter', 'Lecturas de caché que tuvieron que recalcular.',
+        [('', {'proceso': proceso, 'cache': nombre}, fallos) for proceso, nombre, _, fallos in caches],
+    )
+    exposicion.metrica(
+        'flota_cache_ratio_aciertos', 'gauge', 'Aciertos sobre lecturas desde que arrancó el proceso.',
+        [
+            ('', {'proceso': proceso, 'cache': nombre}, round(aciertos / (aciertos + fallos), 4))
+            for proceso, nombre, aciertos, fallos in caches if aciertos + fallos
+        ],
+    )
+
+
+# =========================
+# Base de datos
+# =========================
+
+def _datos_base():
+    datos = cache.get(_CLAVE_BASE)
+    if datos is not None:
+        return datos
+
+    filtro_por_estado = {estado: filtro for filtro, estado in ESTADOS_POR_FILTRO.items()}
+    with usar_empresa(None):
+        asegurar_estados_al_dia()
+        slugs = dict(Empresa.objects.values_list('id', 'slug'))
+        documentos = [
+            (slugs.get(fila['empresa_id'], str(fila['empresa_id'])), filtro_por_estado[fila['estado']], fila['total'])
+            for fila in DocumentoVehiculo.objects.order_by()
+            .values('empresa_id', 'estado')
+            .annotate(total=Count('id'))
+            if fila['estado'] in filtro_por_estado
+        ]
+
+    corridas = EjecucionAlertas.objects.filter(completada=True)
+    datos = {
+        'documentos': documentos,
+        'alertas': corridas.aggregate(
+            corridas=Count('id'),
+            mensajes=Sum('mensajes'),
+            segundos=Sum('segundos'),
+            ultima=Max('terminado_en'),
+        ),
+        'ultima_alerta': corridas.order_by('-terminado_en').values('segundos', 'mensajes').first(),
+        'correos_fallidos': CorreoFallido.objects.aggregate(
+            pendientes=Count('id', filter=Q(reenviado_en__isnull=True)),
+        )['pendientes'],
+    }
+    cache.set(_CLAVE_BASE, datos, METRICAS_BASE_TIMEOUT)
+    return datos
+
+
+def _metricas_base(exposicion, datos):
+    exposicion.metrica(
+        'flota_documentos', 'gauge', 'Documentos por estado (vencidos, proximos, vigentes) y empresa.',
+        [('', {'empresa': empresa, 'estado': estado}, total) for empresa, estado, total in datos['documentos']],
+    )
+
+    alertas = datos['alertas']
+    exposicion.metrica(
+        'flota_alertas_corridas_total', 'counter', 'Corridas completadas de enviar_alertas_documentos.',
+        [('', {}, alertas['corridas'])],
+    )
+    exposicion.metrica(
+        'flota_alertas_mensajes_total', 'counter', 'Mensajes enviados por enviar_alertas_documentos.',
+        [('', {}, alertas['mensajes'] or 0)],
+    )
+    exposicion.metrica(
+        'flota_alertas_segundos_total', 'counter', 'Duración acumulada de las corridas de alertas.',
+        [('', {}, round(alertas['segundos'] or 0, 3))],
+    )
+    ultima = datos['ultima_alerta']
+    if ultima is not None:
+        exposicion.metrica(
+            'flota_alertas_ultima_duracion_segundos', 'gauge', 'Duración de la última corrida de alertas.',
+            [('', {}, round(ultima['segundos'], 3))],
+        )
+        exposicion.metrica(
+            'flota_alertas_ultima_mensajes', 'gauge', 'Mensajes enviados en la última corrida de alertas.',
+            [('', {}, ultima['mensajes'])],
+        )
+        exposicion.metrica(
+            'flota_alertas_ultima_timestamp_segundos', 'gauge', 'Fin de la última corrida de alertas (epoch).',
+            [('', {}, int(alertas['ultima'].timestamp()))],
+        )
+    exposicion.metrica(
+        'flota_correos_fallidos', 'gauge', 'Correos en la cola CorreoFallido sin reenviar.',
+        [('', {}, datos['correos_fallidos'])],
+    )
+
+
+def metricas(request):
+    if not _autorizado(request):
+        respuesta = HttpResponse('No autorizado.', status=401, content_type='text/plain; charset=utf-8')
+        respuesta['WWW-Authenticate'] = 'Bearer realm="flota"'
+        return respuesta
+
+    exposicion = _Exposicion()
+    procesos = _procesos()
+    _metricas_requests(exposicion, procesos)
+    _metricas_caches(exposicion, procesos)
+    _metricas_base(exposicion, _datos_base())
+    return HttpResponse(exposicion.texto(), content_type=_TIPO_CONTENIDO)
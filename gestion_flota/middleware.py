@@ -0,0 +1,114 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from .empresas import activar_empresa, resolver_empresa
+from .instrumentacion import (
+    iniciar_medicion,
+    medicion_actual,
+    publicar_agregados,
+    registrar_request,
+    terminar_medicion,
+)
+
+
+class InstrumentacionMiddleware:
+    """
+    Mide cada request (consultas, SQL, plantillas, storage, correo) y lo
+    suma a los agregados del proceso (ver instrumentacion.py). Va primero
+    en MIDDLEWARE para que el total incluya a los demás.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        medicion = iniciar_medicion()
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            terminar_medicion()
+        registrar_request(request, response, time.perf_counter() - inicio, medicion)
+        publicar_agregados()
+        return response
+
+    async def __acall__(self, request):
+        medicion = iniciar_medicion()
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            terminar_medicion()
+        registrar_request(request, response, time.perf_counter() - inicio, medicion)
+        await sync_to_async(publicar_agregados)()
+        return response
+
+
+class ConexionBDMiddleware:
+    """
+    Publica cuánto tardó el request en adquirir la conexión a la base en
+    request.adquisicion_bd y en la cabecera Server-Timing (visible en las
+    herramientas de desarrollo del navegador). No la abre: la mide
+    InstrumentacionMiddleware cuando la primera consulta la pide, así
+    /metrics y las páginas servidas desde la caché no se conectan.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        return self._marcar(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._marcar(request, await self.get_response(request))
+
+    @staticmethod
+    def _marcar(request, response):
+        medicion = medicion_actual()
+        request.adquisicion_bd = medicion.tiempo_conexion if medicion else 0.0
+        response['Server-Timing'] = f'db-conexion;dur={request.adquisicion_bd * 1000:.2f}'
+        return response
+
+
+class EmpresaMiddleware:
+    """
+    Fija la empresa del usuario para el resto del request (ver empresas.py).
+    Va después de AuthenticationMiddleware. Funciona bajo WSGI y ASGI: en
+    ASGI no obliga a Django a pasar las vistas async a un hilo.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        request.empresa_id = resolver_empresa(request)
+        activar_empresa(request.empresa_id)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # request.user es perezoso y consulta la base: se resuelve en un hilo
+        request.empresa_id = await sync_to_async(resolver_empresa)(request)
+        activar_empresa(request.empresa_id)
+        return await self.get_response(request)
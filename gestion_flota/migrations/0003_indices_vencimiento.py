@@ -0,0 +1,66 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:28
+
+import django.core.validators
+import django.db.models.deletion
+import gestion_flota.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_flota', '0002_vehiculo_responsable_email_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='documentovehiculo',
+            options={'ordering': ['fecha_vencimiento'], 'verbose_name': 'Documento de vehículo', 'verbose_name_plural': 'Documentos de vehículos'},
+        ),
+        migrations.AlterModelOptions(
+            name='tipodocumento',
+            options={'ordering': ['nombre'], 'verbose_name': 'Tipo de documento', 'verbose_name_plural': 'Tipos de documento'},
+        ),
+        migrations.AlterModelOptions(
+            name='vehiculo',
+            options={'ordering': ['placa'], 'verbose_name': 'Vehículo', 'verbose_name_plural': 'Vehículos'},
+        ),
+        migrations.AlterField(
+            model_name='documentovehiculo',
+            name='archivo',
+            field=models.FileField(blank=True, help_text='Archivo PDF del documento. Se almacena en Cloudinary.', null=True, upload_to=gestion_flota.models.documento_vehiculo_path, validators=[django.core.validators.FileExtensionValidator(['pdf'])]),
+        ),
+        migrations.AlterField(
+            model_name='vehiculo',
+            name='creado_por',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='vehiculos_creados', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='vehiculo',
+            name='foto',
+            field=models.ImageField(blank=True, help_text='Foto del vehículo. Se almacena en Cloudinary.', null=True, upload_to=gestion_flota.models.vehiculo_foto_path),
+        ),
+        migrations.AlterField(
+            model_name='vehiculo',
+            name='tipo',
+            field=models.CharField(blank=True, help_text='Ej: camioneta, camión, moto, automóvil, etc.', max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='documentovehiculo',
+            index=models.Index(fields=['fecha_vencimiento', 'vehiculo', 'tipo'], name='doc_venc_vehiculo_tipo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documentovehiculo',
+            index=models.Index(fields=['fecha_vencimiento', 'id'], name='doc_venc_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documentovehiculo',
+            index=models.Index(fields=['vehiculo', 'fecha_vencimiento'], name='doc_vehiculo_venc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehiculo',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['placa', 'id'], name='vehiculo_activo_placa_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_flota', '0004_exportacionjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EjecucionAlertas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('iniciado_en', models.DateTimeField(auto_now_add=True)),
+                ('terminado_en', models.DateTimeField(blank=True, null=True)),
+                ('fecha_corte', models.DateField()),
+                ('completada', models.BooleanField(default=False)),
+                ('documentos', models.PositiveIntegerField(default=0)),
+                ('mensajes', models.PositiveIntegerField(default=0)),
+                ('destinatarios', models.PositiveIntegerField(default=0)),
+                ('segundos', models.FloatField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Ejecución de alertas',
+                'verbose_name_plural': 'Ejecuciones de alertas',
+                'ordering': ['-iniciado_en'],
+            },
+        ),
+        migrations.AddField(
+            model_name='documentovehiculo',
+            name='actualizado_en',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.CreateModel(
+            name='AlertaDocumento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('umbral', models.CharField(max_length=20)),
+                ('fecha_vencimiento', models.DateField()),
+                ('destinatario', models.EmailField(blank=True, max_length=254)),
+                ('detectado_en', models.DateTimeField(auto_now_add=True)),
+                ('notificado_en', models.DateTimeField(blank=True, null=True)),
+                ('documento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alertas', to='gestion_flota.documentovehiculo')),
+            ],
+            options={
+                'verbose_name': 'Alerta de documento',
+                'verbose_name_plural': 'Alertas de documentos',
+                'indexes': [models.Index(fields=['notificado_en'], name='alerta_notificado_idx')],
+                'constraints': [models.UniqueConstraint(fields=('documento', 'umbral', 'fecha_vencimiento'), name='alerta_documento_umbral_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_flota', '0005_alertas_incrementales'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorreoFallido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('destinatarios', models.TextField()),
+                ('asunto', models.CharField(max_length=255)),
+                ('cuerpo', models.TextField()),
+                ('error', models.TextField(blank=True)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('alertas', models.JSONField(blank=True, default=list)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('reenviado_en', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Correo fallido',
+                'verbose_name_plural': 'Correos fallidos',
+                'ordering': ['-creado_en'],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_flota', '0006_correofallido'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BloqueoTarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, unique=True)),
+                ('propietario', models.CharField(max_length=255)),
+                ('expira_en', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Bloqueo de tarea',
+                'verbose_name_plural': 'Bloqueos de tareas',
+            },
+        ),
+        migrations.CreateModel(
+            name='EjecucionTarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100)),
+                ('programada_para', models.DateTimeField()),
+                ('propietario', models.CharField(max_length=255)),
+                ('iniciado_en', models.DateTimeField(auto_now_add=True)),
+                ('terminado_en', models.DateTimeField(blank=True, null=True)),
+                ('duracion', models.FloatField(blank=True, help_text='Segundos', null=True)),
+                ('exitosa', models.BooleanField(null=True)),
+                ('salida', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Ejecución de tarea',
+                'verbose_name_plural': 'Ejecuciones de tareas',
+                'ordering': ['-iniciado_en'],
+                'constraints': [models.UniqueConstraint(fields=('nombre', 'programada_para'), name='ejecucion_tarea_turno_unico')],
+            },
+        ),
+    ]
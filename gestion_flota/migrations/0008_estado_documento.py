@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:38
+
+from datetime import date, timedelta
+
+from django.db import migrations, models
+
+
+def calcular_estados(apps, schema_editor):
+    # Todos los tipos arrancan con la ventana por defecto de 30 días
+    DocumentoVehiculo = apps.get_model('gestion_flota', 'DocumentoVehiculo')
+    hoy = date.today()
+    limite = hoy + timedelta(days=30)
+    DocumentoVehiculo.objects.filter(fecha_vencimiento__lt=hoy).update(estado='vencido')
+    DocumentoVehiculo.objects.filter(
+        fecha_vencimiento__gte=hoy,
+        fecha_vencimiento__lte=limite,
+    ).update(estado='proximo')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_flota', '0007_programador_tareas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentovehiculo',
+            name='estado',
+            field=models.CharField(choices=[('vigente', 'Vigente'), ('proximo', 'Próximo a vencer'), ('vencido', 'Vencido')], default='vigente', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='tipodocumento',
+            name='dias_alerta',
+            field=models.PositiveIntegerField(default=30, help_text="Días antes del vencimiento en que el documento pasa a 'próximo a vencer'."),
+        ),
+        migrations.AddIndex(
+            model_name='documentovehiculo',
+            index=models.Index(fields=['estado', 'fecha_vencimiento', 'id'], name='doc_estado_venc_id_idx'),
+        ),
+        migrations.RunPython(calcular_estados, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+COLUMNAS = ('placa', 'marca', 'modelo', 'tipo')
+
+
+def crear_indices_busqueda(apps, schema_editor):
+    conexion = schema_editor.connection
+    if conexion.vendor == 'postgresql':
+        # Trigramas sobre UPPER(col::text): la misma expresión que genera icontains
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for columna in COLUMNAS:
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS vehiculo_{columna}_trgm_idx "
+                f"ON gestion_flota_vehiculo USING gin (UPPER({columna}::text) gin_trgm_ops)"
+            )
+    elif conexion.vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS gestion_flota_vehiculo_fts "
+            "USING fts5(placa, marca, modelo, tipo, tokenize='trigram')"
+        )
+        schema_editor.execute(
+            "INSERT INTO gestion_flota_vehiculo_fts (rowid, placa, marca, modelo, tipo) "
+            "SELECT id, placa, marca, modelo, tipo FROM gestion_flota_vehiculo"
+        )
+
+
+def borrar_indices_busqueda(apps, schema_editor):
+    conexion = schema_editor.connection
+    if conexion.vendor == 'postgresql':
+        for columna in COLUMNAS:
+            schema_editor.execute(f"DROP INDEX IF EXISTS vehiculo_{columna}_trgm_idx")
+    elif conexion.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS gestion_flota_vehiculo_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_flota', '0008_estado_documento'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices_busqueda, borrar_indices_busqueda),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:49
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_flota', '0010_importacion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentovehiculo',
+            name='archivo_pendiente',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='vehiculo',
+            name='foto_pendiente',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.CreateModel(
+            name='SubidaArchivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('destino', models.CharField(choices=[('documento', 'PDF de documento'), ('vehiculo', 'Foto de vehículo')], max_length=20)),
+                ('nombre_original', models.CharField(max_length=255)),
+                ('clave', models.CharField(max_length=255)),
+                ('tamano', models.PositiveBigIntegerField(help_text='Bytes declarados al firmar')),
+                ('estado', models.CharField(choices=[('esperando', 'Esperando el archivo'), ('subida', 'Subida, por procesar'), ('procesando', 'Procesando'), ('lista', 'Lista'), ('error', 'Error')], default='esperando', max_length=20)),
+                ('error', models.TextField(blank=True)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('expira_en', models.DateTimeField()),
+                ('terminado_en', models.DateTimeField(blank=True, null=True)),
+                ('creado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='subidas', to=settings.AUTH_USER_MODEL)),
+                ('documento', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='subidas', to='gestion_flota.documentovehiculo')),
+                ('vehiculo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='subidas', to='gestion_flota.vehiculo')),
+            ],
+            options={
+                'verbose_name': 'Subida de archivo',
+                'verbose_name_plural': 'Subidas de archivos',
+                'ordering': ['-creado_en'],
+                'indexes': [models.Index(fields=['estado', 'creado_en'], name='subida_estado_creado_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_flota', '0012_miniaturas_vehiculo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivoContenido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('tamano', models.BigIntegerField()),
+                ('nombre', models.CharField(max_length=255)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Contenido de archivo',
+                'verbose_name_plural': 'Contenidos de archivos',
+            },
+        ),
+        migrations.AddField(
+            model_name='documentovehiculo',
+            name='contenido',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='documentos', to='gestion_flota.archivocontenido'),
+        ),
+    ]
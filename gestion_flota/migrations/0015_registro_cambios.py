@@ -0,0 +1,87 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:58
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+CAMPOS = {
+    'vehiculo': (
+        'placa', 'marca', 'modelo', 'anio', 'tipo', 'activo',
+        'responsable_nombre', 'responsable_email', 'foto',
+        'creado_en', 'actualizado_en',
+    ),
+    'documento': (
+        'vehiculo_id', 'tipo_id', 'fecha_expedicion', 'fecha_vencimiento',
+        'estado', 'archivo', 'creado_en', 'actualizado_en',
+    ),
+}
+
+
+def registrar_existentes(apps, schema_editor):
+    """
+    Un evento 'crear' por cada vehículo y documento existente, para que un
+    cliente que empieza en la secuencia 0 reciba la flota completa.
+    """
+    CambioFlota = apps.get_model('gestion_flota', 'CambioFlota')
+    modelos = {
+        'vehiculo': apps.get_model('gestion_flota', 'Vehiculo'),
+        'documento': apps.get_model('gestion_flota', 'DocumentoVehiculo'),
+    }
+    for nombre, modelo in modelos.items():
+        lote = []
+        for objeto in modelo.objects.order_by('pk').iterator(chunk_size=1000):
+            datos = {'id': objeto.pk}
+            for campo in CAMPOS[nombre]:
+                valor = getattr(objeto, campo)
+                if campo in ('foto', 'archivo'):
+                    valor = valor.url if valor else None
+                datos[campo] = valor
+            lote.append(CambioFlota(modelo=nombre, objeto_id=objeto.pk, operacion='crear', datos=datos))
+            if len(lote) >= 1000:
+                CambioFlota.objects.bulk_create(lote)
+                lote = []
+        CambioFlota.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_flota', '0014_actualizado_en_api'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompactacionCambios',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ejecutada_en', models.DateTimeField(auto_now_add=True)),
+                ('piso', models.BigIntegerField(default=0)),
+                ('reemplazados', models.PositiveIntegerField(default=0)),
+                ('borrados_descartados', models.PositiveIntegerField(default=0)),
+                ('restantes', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Compactación de cambios',
+                'verbose_name_plural': 'Compactaciones de cambios',
+                'ordering': ['-ejecutada_en'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CambioFlota',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('modelo', models.CharField(max_length=10)),
+                ('objeto_id', models.PositiveIntegerField()),
+                ('operacion', models.CharField(choices=[('crear', 'Creación'), ('actualizar', 'Actualización'), ('borrar', 'Borrado')], max_length=10)),
+                ('datos', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Cambio de flota',
+                'verbose_name_plural': 'Cambios de flota',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['modelo', 'objeto_id', 'id'], name='cambio_objeto_idx')],
+            },
+        ),
+        migrations.RunPython(registrar_existentes, migrations.RunPython.noop),
+    ]
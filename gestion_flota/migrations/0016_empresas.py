@@ -0,0 +1,106 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def asignar_empresa_principal(apps, schema_editor):
+    """
+    Los datos existentes y todos los usuarios pasan a una empresa
+    'Principal' (la instalación era de una sola empresa).
+    """
+    Empresa = apps.get_model('gestion_flota', 'Empresa')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+
+    empresa, _ = Empresa.objects.get_or_create(slug='principal', defaults={'nombre': 'Principal'})
+    empresa.usuarios.add(*User.objects.values_list('id', flat=True))
+
+    for nombre in ('Vehiculo', 'TipoDocumento', 'ExportacionJob', 'Importacion', 'CambioFlota'):
+        apps.get_model('gestion_flota', nombre).objects.filter(empresa__isnull=True).update(empresa=empresa)
+
+    # El documento hereda la empresa de su vehículo
+    DocumentoVehiculo = apps.get_model('gestion_flota', 'DocumentoVehiculo')
+    DocumentoVehiculo.objects.filter(empresa__isnull=True).update(empresa=empresa)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_flota', '0015_registro_cambios'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Empresa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100)),
+                ('slug', models.SlugField(unique=True)),
+                ('activa', models.BooleanField(default=True)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Empresa',
+                'verbose_name_plural': 'Empresas',
+                'ordering': ['nombre'],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='documentovehiculo',
+            name='doc_venc_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='documentovehiculo',
+            name='doc_estado_venc_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='documentovehiculo',
+            name='doc_actualizado_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='vehiculo',
+            name='vehiculo_activo_placa_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='vehiculo',
+            name='vehiculo_actualizado_idx',
+        ),
+        migrations.AddField(
+            model_name='empresa',
+            name='usuarios',
+            field=models.ManyToManyField(blank=True, related_name='empresas', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='cambioflota',
+            name='empresa',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='cambios', to='gestion_flota.empresa'),
+        ),
+        migrations.AddField(
+            model_name='documentovehiculo',
+            name='empresa',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='documentos', to='gestion_flota.empresa'),
+        ),
+        migrations.AddField(
+            model_name='exportacionjob',
+            name='empresa',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='exportaciones', to='gestion_flota.empresa'),
+        ),
+        migrations.AddField(
+            model_name='importacion',
+            name='empresa',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='importaciones', to='gestion_flota.empresa'),
+        ),
+        migrations.AddField(
+            model_name='tipodocumento',
+            name='empresa',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='tipos_documento', to='gestion_flota.empresa'),
+        ),
+        migrations.AddField(
+            model_name='vehiculo',
+            name='empresa',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='vehiculos', to='gestion_flota.empresa'),
+        ),
+        migrations.RunPython(asignar_empresa_principal, migrations.RunPython.noop),
+    ]
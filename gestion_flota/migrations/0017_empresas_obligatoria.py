@@ -0,0 +1,65 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Empresa obligatoria e índices por empresa, en una migración aparte de la
+    carga de datos de 0016 (PostgreSQL no altera tablas con triggers
+    pendientes en la misma transacción).
+    """
+
+    dependencies = [
+        ('gestion_flota', '0016_empresas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cambioflota',
+            name='empresa',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cambios', to='gestion_flota.empresa'),
+        ),
+        migrations.AlterField(
+            model_name='documentovehiculo',
+            name='empresa',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='documentos', to='gestion_flota.empresa'),
+        ),
+        migrations.AlterField(
+            model_name='tipodocumento',
+            name='empresa',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='tipos_documento', to='gestion_flota.empresa'),
+        ),
+        migrations.AlterField(
+            model_name='vehiculo',
+            name='empresa',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='vehiculos', to='gestion_flota.empresa'),
+        ),
+        migrations.AddIndex(
+            model_name='cambioflota',
+            index=models.Index(fields=['empresa', 'id'], name='cambio_emp_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documentovehiculo',
+            index=models.Index(fields=['empresa', 'fecha_vencimiento', 'id'], name='doc_emp_venc_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documentovehiculo',
+            index=models.Index(fields=['empresa', 'estado', 'fecha_vencimiento', 'id'], name='doc_emp_estado_venc_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documentovehiculo',
+            index=models.Index(fields=['empresa', 'actualizado_en'], name='doc_emp_actualizado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tipodocumento',
+            index=models.Index(fields=['empresa', 'nombre'], name='tipo_emp_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehiculo',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['empresa', 'placa', 'id'], name='vehiculo_emp_activo_placa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehiculo',
+            index=models.Index(fields=['empresa', 'actualizado_en'], name='vehiculo_emp_actualizado_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_flota', '0017_empresas_obligatoria'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportacionjob',
+            name='intentos',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='exportacionjob',
+            name='reclamado_en',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.db import migrations
+
+
+def _normalizar(placa):
+    # Misma regla que busqueda.normalizar_placa (las migraciones no importan
+    # código de la app, que puede cambiar)
+    return ''.join((placa or '').split()).upper()
+
+
+def normalizar_placas(apps, schema_editor):
+    """
+    Placas existentes en mayúsculas y sin espacios, como las guarda ahora
+    Vehiculo.save(). Si la placa normalizada ya la tiene otro vehículo
+    ("abc 123" y "ABC123"), se deja como está para no romper la unicidad:
+    ese duplicado hay que resolverlo a mano.
+    """
+    Vehiculo = apps.get_model('gestion_flota', 'Vehiculo')
+    placas = dict(Vehiculo.objects.values_list('placa', 'id'))
+    cambios = []
+    for placa, vehiculo_id in list(placas.items()):
+        normalizada = _normalizar(placa)
+        if normalizada == placa or normalizada in placas:
+            continue
+        placas[normalizada] = vehiculo_id
+        cambios.append((vehiculo_id, normalizada))
+
+    tiene_fts = (
+        schema_editor.connection.vendor == 'sqlite'
+        and 'gestion_flota_vehiculo_fts' in schema_editor.connection.introspection.table_names()
+    )
+    for vehiculo_id, normalizada in cambios:
+        Vehiculo.objects.filter(pk=vehiculo_id).update(placa=normalizada)
+        if tiene_fts:
+            # Espejo FTS5 de la búsqueda (lo mantienen las signals, que aquí no corren)
+            schema_editor.execute(
+                "UPDATE gestion_flota_vehiculo_fts SET placa = %s WHERE rowid = %s",
+                [normalizada, vehiculo_id],
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_flota', '0018_exportacion_reclamo'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalizar_placas, migrations.RunPython.noop),
+    ]
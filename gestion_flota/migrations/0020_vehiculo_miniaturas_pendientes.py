@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_flota', '0019_normalizar_placas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehiculo',
+            name='miniaturas_pendientes',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_flota', '0020_vehiculo_miniaturas_pendientes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecuenciaCambios',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultima', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Secuencia de cambios',
+                'verbose_name_plural': 'Secuencia de cambios',
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='cambioflota',
+            name='cambio_emp_id_idx',
+        ),
+        migrations.AddField(
+            model_name='cambioflota',
+            name='secuencia',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='cambioflota',
+            index=models.Index(fields=['empresa', 'secuencia'], name='cambio_emp_sec_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cambioflota',
+            index=models.Index(condition=models.Q(('secuencia__isnull', True)), fields=['id'], name='cambio_sin_secuencia_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+from django.db.models import F, Max
+
+
+def publicar_existentes(apps, schema_editor):
+    """
+    Los eventos existentes conservan su id como secuencia (las marcas de
+    agua que ya tienen los clientes siguen valiendo); los nuevos se numeran
+    a partir del último.
+    """
+    CambioFlota = apps.get_model('gestion_flota', 'CambioFlota')
+    SecuenciaCambios = apps.get_model('gestion_flota', 'SecuenciaCambios')
+    CambioFlota.objects.filter(secuencia__isnull=True).update(secuencia=F('id'))
+    ultima = CambioFlota.objects.aggregate(ultima=Max('secuencia'))['ultima'] or 0
+    SecuenciaCambios.objects.update_or_create(pk=1, defaults={'ultima': ultima})
+
+
+class Migration(migrations.Migration):
+    """
+    Carga de datos aparte de 0021 (PostgreSQL no altera tablas con
+    triggers pendientes en la misma transacción).
+    """
+
+    dependencies = [
+        ('gestion_flota', '0021_cambio_secuencia'),
+    ]
+
+    operations = [
+        migrations.RunPython(publicar_existentes, migrations.RunPython.noop),
+    ]
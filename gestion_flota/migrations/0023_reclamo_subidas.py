@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_flota', '0022_publicar_cambios_existentes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subidaarchivo',
+            name='intentos',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='subidaarchivo',
+            name='reclamado_en',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='vehiculo',
+            name='miniaturas_reclamadas_en',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
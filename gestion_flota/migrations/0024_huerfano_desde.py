@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_flota', '0023_reclamo_subidas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivocontenido',
+            name='huerfano_desde',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
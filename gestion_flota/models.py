@@ -1,11 +1,19 @@
 import os
+import uuid
 from datetime import date
 
 from django.db import models
+from django.db.models import Case, CharField, Count, Q, Value, When
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import FileExtensionValidator
 from django.utils.text import slugify
 
+from .busqueda import filtro_busqueda, normalizar_placa
+from .contenidos import asignar_contenido
+from .empresas import EmpresaManager, empresa_para_guardar, usar_empresa
+from .imagenes import miniaturas_vigentes, srcset
+
 
 # =========================
 # Helpers para rutas (upload_to)
@@ -41,11 +49,127 @@ def documento_vehiculo_path(instance, filename):
     return f"documentos_vehiculos/{placa}/{tipo_slug}/{fecha_str}{ext}"
 
 
+# =========================
+# QuerySets
+# =========================
+
+# Días hacia adelante en los que un documento se considera "próximo a vencer"
+# (valor por defecto; cada TipoDocumento puede definir el suyo)
+DIAS_ALERTA = 30
+
+ESTADO_DOCUMENTO_CHOICES = [
+    ('vigente', 'Vigente'),
+    ('proximo', 'Próximo a vencer'),
+    ('vencido', 'Vencido'),
+]
+
+# Filtro de los listados ('vencidos', 'proximos', 'vigentes') -> estado guardado
+ESTADOS_POR_FILTRO = {
+    'vencidos': 'vencido',
+    'proximos': 'proximo',
+    'vigentes': 'vigente',
+}
+
+
+def estado_por_fecha(fecha_vencimiento, hoy=None, dias_alerta=DIAS_ALERTA):
+    """
+    Devuelve 'vigente', 'proximo' o 'vencido' para una fecha de vencimiento.
+    """
+    hoy = hoy or date.today()
+    if fecha_vencimiento < hoy:
+        return 'vencido'
+    if (fecha_vencimiento - hoy).days <= dias_alerta:
+        return 'proximo'
+    return 'vigente'
+
+
+class VehiculoQuerySet(models.QuerySet):
+
+    def buscar(self, q):
+        """
+        Filtra por placa, marca, modelo o tipo (búsqueda libre del listado),
+        apoyándose en el índice de texto del backend (ver busqueda.py).
+        """
+        if not q or not q.strip():
+            return self
+        return self.filter(filtro_busqueda(q))
+
+    def con_estado_documentos(self):
+        """
+        Anota cada vehículo con 'estado_docs' calculado en SQL a partir de
+        conteos condicionales sobre el estado guardado de sus documentos,
+        en una sola consulta:
+        - 'sin_documentos'
+        - 'con_vencidos'
+        - 'con_proximos'
+        - 'al_dia'
+        """
+        return self.annotate(
+            total_docs=Count('documentos'),
+            docs_vencidos=Count(
+                'documentos',
+                filter=Q(documentos__estado='vencido'),
+            ),
+            docs_proximos=Count(
+                'documentos',
+                filter=Q(documentos__estado='proximo'),
+            ),
+        ).annotate(
+            estado_docs=Case(
+                When(total_docs=0, then=Value('sin_documentos')),
+                When(docs_vencidos__gt=0, then=Value('con_vencidos')),
+                When(docs_proximos__gt=0, then=Value('con_proximos')),
+                default=Value('al_dia'),
+                output_field=CharField(),
+            ),
+        )
+
+
+class DocumentoVehiculoQuerySet(models.QuerySet):
+
+    def por_estado(self, estado):
+        """
+        Filtra por el estado usado en listados y exportaciones:
+        'vencidos', 'proximos', 'vigentes' (cualquier otro valor: todos).
+        Usa la columna 'estado' (indexada), que mantiene el rollover diario.
+        """
+        if estado in ESTADOS_POR_FILTRO:
+            return self.filter(estado=ESTADOS_POR_FILTRO[estado])
+        return self
+
+
 # =========================
 # Modelos
 # =========================
 
+class Empresa(models.Model):
+    """
+    Empresa cliente. Sus vehículos, documentos y tipos de documento solo se
+    ven con ella como empresa actual (ver empresas.py).
+    """
+    nombre = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=50, unique=True)
+    activa = models.BooleanField(default=True)
+    usuarios = models.ManyToManyField(User, related_name='empresas', blank=True)
+    creado_en = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Empresa"
+        verbose_name_plural = "Empresas"
+        ordering = ['nombre']
+
+    def __str__(self):
+        return self.nombre
+
+
 class Vehiculo(models.Model):
+    empresa = models.ForeignKey(
+        Empresa,
+        on_delete=models.PROTECT,
+        related_name='vehiculos',
+        editable=False,
+    )
+    # Única en todo el sistema: una placa identifica un vehículo físico
     placa = models.CharField(max_length=10, unique=True)
     marca = models.CharField(max_length=50)
     modelo = models.CharField(max_length=50)
@@ -61,6 +185,14 @@ class Vehiculo(models.Model):
         blank=True,
         help_text="Foto del vehículo. Se almacena en Cloudinary.",
     )
+    # La foto llegó por subida directa y espera su procesamiento (subidas.py)
+    foto_pendiente = models.BooleanField(default=False, editable=False)
+    # Nombres de las miniaturas WebP/JPEG de la foto (ver imagenes.py)
+    miniaturas = models.JSONField(default=dict, blank=True, editable=False)
+    # La foto cambió y el worker procesar_subidas debe regenerar las miniaturas
+    miniaturas_pendientes = models.BooleanField(default=False, editable=False)
+    # Cuándo un worker tomó las miniaturas pendientes (ver subidas.py)
+    miniaturas_reclamadas_en = models.DateTimeField(null=True, blank=True, editable=False)
     activo = models.BooleanField(default=True)
 
     # Responsable del vehículo
@@ -75,15 +207,74 @@ class Vehiculo(models.Model):
         related_name="vehiculos_creados",
     )
     creado_en = models.DateTimeField(auto_now_add=True)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    objects = EmpresaManager.from_queryset(VehiculoQuerySet)()
 
     class Meta:
         verbose_name = "Vehículo"
         verbose_name_plural = "Vehículos"
         ordering = ["placa"]
+        # Los índices empiezan por empresa: cada consulta filtrada por la
+        # empresa actual recorre solo las filas de esa empresa.
+        indexes = [
+            # Listado de vehículos activos ordenado por placa (índice parcial
+            # donde el backend lo soporta: PostgreSQL y SQLite)
+            models.Index(
+                fields=['empresa', 'placa', 'id'],
+                condition=Q(activo=True),
+                name='vehiculo_emp_activo_placa_idx',
+            ),
+            # Sincronización incremental de la API (?actualizado_desde=)
+            models.Index(
+                fields=['empresa', 'actualizado_en'],
+                name='vehiculo_emp_actualizado_idx',
+            ),
+        ]
+
+    def clean(self):
+        # Antes de validar la unicidad: "abc 123" y "ABC123" son la misma placa
+        self.placa = normalizar_placa(self.placa)
+
+    def validate_unique(self, exclude=None):
+        # La placa es única entre todas las empresas, no solo en la actual
+        with usar_empresa(None):
+            super().validate_unique(exclude)
+
+    def save(self, *args, **kwargs):
+        # Mayúsculas y sin espacios venga de donde venga (formularios, admin,
+        # importador, shell): el autocompletado busca por rango de placa
+        self.placa = normalizar_placa(self.placa)
+        if not self.empresa_id:
+            self.empresa_id = empresa_para_guardar()
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.placa} - {self.marca} {self.modelo}"
 
+    @property
+    def miniaturas_foto(self):
+        return miniaturas_vigentes(self)
+
+    @property
+    def foto_srcset_webp(self):
+        return srcset(self, 'webp')
+
+    @property
+    def foto_srcset_jpeg(self):
+        return srcset(self, 'jpeg')
+
+    @property
+    def foto_miniatura_url(self):
+        """
+        Miniatura JPEG más pequeña (src de respaldo de <picture>), o la foto
+        original si todavía no tiene miniaturas.
+        """
+        jpeg = self.miniaturas_foto.get('jpeg')
+        if not jpeg:
+            return self.foto.url if self.foto else ''
+        return self.foto.storage.url(jpeg[min(jpeg, key=int)])
+
     @property
     def estado_documentos(self):
         """
@@ -92,7 +283,14 @@ class Vehiculo(models.Model):
         - 'con_vencidos'
         - 'con_proximos'
         - 'al_dia'
+
+        Si el vehículo viene de VehiculoQuerySet.con_estado_documentos()
+        se usa el valor calculado en SQL; si no, se calcula en Python.
         """
+        estado_sql = getattr(self, 'estado_docs', None)
+        if estado_sql is not None:
+            return estado_sql
+
         docs = list(self.documentos.all())
         if not docs:
             return 'sin_documentos'
@@ -107,19 +305,47 @@ class Vehiculo(models.Model):
 
 
 class TipoDocumento(models.Model):
+    empresa = models.ForeignKey(
+        Empresa,
+        on_delete=models.PROTECT,
+        related_name='tipos_documento',
+        editable=False,
+    )
     nombre = models.CharField(max_length=50)  # SOAT, Tecnomecánica, Seguro, etc.
     descripcion = models.TextField(blank=True)
+    dias_alerta = models.PositiveIntegerField(
+        default=DIAS_ALERTA,
+        help_text="Días antes del vencimiento en que el documento pasa a 'próximo a vencer'.",
+    )
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    objects = EmpresaManager()
 
     class Meta:
         verbose_name = "Tipo de documento"
         verbose_name_plural = "Tipos de documento"
         ordering = ["nombre"]
+        indexes = [
+            models.Index(fields=['empresa', 'nombre'], name='tipo_emp_nombre_idx'),
+        ]
 
     def __str__(self):
         return self.nombre
 
+    def save(self, *args, **kwargs):
+        if not self.empresa_id:
+            self.empresa_id = empresa_para_guardar()
+        super().save(*args, **kwargs)
+
 
 class DocumentoVehiculo(models.Model):
+    # Copia de vehiculo.empresa (se fija al guardar) para los índices por empresa
+    empresa = models.ForeignKey(
+        Empresa,
+        on_delete=models.PROTECT,
+        related_name='documentos',
+        editable=False,
+    )
     vehiculo = models.ForeignKey(
         Vehiculo,
         on_delete=models.CASCADE,
@@ -139,28 +365,524 @@ class DocumentoVehiculo(models.Model):
         validators=[FileExtensionValidator(['pdf'])],
         help_text="Archivo PDF del documento. Se almacena en Cloudinary.",
     )
+    # El PDF llegó por subida directa y espera su procesamiento (subidas.py)
+    archivo_pendiente = models.BooleanField(default=False, editable=False)
+    # Blob deduplicado por SHA-256 al que apunta 'archivo' (contenidos.py)
+    contenido = models.ForeignKey(
+        'ArchivoContenido',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='documentos',
+    )
+
+    # Estado materializado: se calcula al guardar y lo mueve el rollover
+    # diario (services.actualizar_estados_documentos).
+    estado = models.CharField(
+        max_length=10,
+        choices=ESTADO_DOCUMENTO_CHOICES,
+        default='vigente',
+        editable=False,
+    )
 
     creado_en = models.DateTimeField(auto_now_add=True)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    objects = EmpresaManager.from_queryset(DocumentoVehiculoQuerySet)()
 
     class Meta:
         ordering = ['fecha_vencimiento']
         verbose_name = "Documento de vehículo"
         verbose_name_plural = "Documentos de vehículos"
+        indexes = [
+            # Rangos de vencimiento (dashboard, listado, export, alertas);
+            # cubre también los conteos por estado sin leer la tabla.
+            models.Index(
+                fields=['fecha_vencimiento', 'vehiculo', 'tipo'],
+                name='doc_venc_vehiculo_tipo_idx',
+            ),
+            # Paginación por cursor sobre (fecha_vencimiento, id)
+            models.Index(
+                fields=['empresa', 'fecha_vencimiento', 'id'],
+                name='doc_emp_venc_id_idx',
+            ),
+            # Estado de documentos por vehículo (VehiculoQuerySet.con_estado_documentos)
+            models.Index(
+                fields=['vehiculo', 'fecha_vencimiento'],
+                name='doc_vehiculo_venc_idx',
+            ),
+            # Listados filtrados por estado, paginados por (fecha_vencimiento, id)
+            models.Index(
+                fields=['empresa', 'estado', 'fecha_vencimiento', 'id'],
+                name='doc_emp_estado_venc_id_idx',
+            ),
+            # Sincronización incremental de la API (?actualizado_desde=)
+            models.Index(
+                fields=['empresa', 'actualizado_en'],
+                name='doc_emp_actualizado_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.tipo} - {self.vehiculo.placa}"
 
-    @property
-    def estado(self):
+    def calcular_estado(self, hoy=None):
         """
-        Devuelve: 'vigente', 'proximo', 'vencido'
+        Devuelve: 'vigente', 'proximo', 'vencido' según la ventana de alerta
+        del tipo de documento.
         """
-        hoy = date.today()
-        if self.fecha_vencimiento < hoy:
-            return 'vencido'
+        return estado_por_fecha(self.fecha_vencimiento, hoy=hoy, dias_alerta=self.tipo.dias_alerta)
+
+    def save(self, *args, **kwargs):
+        self.estado = self.calcular_estado()
+        campos = {'estado'}
+
+        if not self.empresa_id:
+            self.empresa_id = self.vehiculo.empresa_id
+            campos.add('empresa')
+
+        # PDF recién subido: se guarda por contenido (o se reutiliza el blob)
+        if self.archivo and not self.archivo._committed:
+            asignar_contenido(self, self.archivo.file, self.archivo.name)
+            campos.add('contenido')
+        elif not self.archivo:
+            self.contenido = None
+            campos.add('contenido')
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *campos}
+        super().save(*args, **kwargs)
+
+
+class ArchivoContenido(models.Model):
+    """
+    Blob de un PDF de documento, identificado por su SHA-256. Varios
+    documentos pueden apuntar al mismo blob (ver contenidos.py).
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    tamano = models.BigIntegerField()
+    nombre = models.CharField(max_length=255)
+    creado_en = models.DateTimeField(auto_now_add=True)
+    # Desde cuándo la recolección lo ve sin documentos (None: en uso)
+    huerfano_desde = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Contenido de archivo"
+        verbose_name_plural = "Contenidos de archivos"
+
+    def __str__(self):
+        return f"{self.sha256[:12]}… ({self.tamano} bytes)"
+
+
+class AlertaDocumento(models.Model):
+    """
+    Registro (ledger) de los umbrales de alerta que cruzó cada documento.
+    Una fila por (documento, umbral, fecha_vencimiento): renovar el documento
+    (nueva fecha) permite volver a alertar. notificado_en vacío = pendiente.
+    """
+    documento = models.ForeignKey(
+        DocumentoVehiculo,
+        on_delete=models.CASCADE,
+        related_name='alertas',
+    )
+    # 'vencido' o los días del umbral ('7', '30', ...)
+    umbral = models.CharField(max_length=20)
+    fecha_vencimiento = models.DateField()
+    destinatario = models.EmailField(blank=True)
+    detectado_en = models.DateTimeField(auto_now_add=True)
+    notificado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Alerta de documento"
+        verbose_name_plural = "Alertas de documentos"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['documento', 'umbral', 'fecha_vencimiento'],
+                name='alerta_documento_umbral_unica',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['notificado_en'], name='alerta_notificado_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.documento_id} {self.umbral} ({self.fecha_vencimiento})"
+
+
+class EjecucionAlertas(models.Model):
+    """
+    Una corrida de enviar_alertas_documentos. La última completada es la
+    marca de agua (watermark) desde la que se calcula la siguiente.
+    """
+    iniciado_en = models.DateTimeField(auto_now_add=True)
+    terminado_en = models.DateTimeField(null=True, blank=True)
+    fecha_corte = models.DateField()
+    completada = models.BooleanField(default=False)
+
+    documentos = models.PositiveIntegerField(default=0)
+    mensajes = models.PositiveIntegerField(default=0)
+    destinatarios = models.PositiveIntegerField(default=0)
+    segundos = models.FloatField(default=0)
+
+    class Meta:
+        verbose_name = "Ejecución de alertas"
+        verbose_name_plural = "Ejecuciones de alertas"
+        ordering = ['-iniciado_en']
+
+    def __str__(self):
+        return f"Alertas {self.fecha_corte} ({'ok' if self.completada else 'incompleta'})"
+
+
+class CorreoFallido(models.Model):
+    """
+    Cola de mensajes que no se pudieron enviar tras agotar los reintentos
+    (dead-letter). Se reenvían con manage.py reenviar_correos_fallidos.
+    """
+    destinatarios = models.TextField()
+    asunto = models.CharField(max_length=255)
+    cuerpo = models.TextField()
+    error = models.TextField(blank=True)
+    intentos = models.PositiveIntegerField(default=0)
+    # ids de AlertaDocumento incluidos en el mensaje (si viene de alertas)
+    alertas = models.JSONField(default=list, blank=True)
+    creado_en = models.DateTimeField(auto_now_add=True)
+    reenviado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Correo fallido"
+        verbose_name_plural = "Correos fallidos"
+        ordering = ['-creado_en']
+
+    def __str__(self):
+        return f"{self.destinatarios}: {self.asunto}"
+
+
+class BloqueoTarea(models.Model):
+    """
+    Bloqueo por nombre de tarea programada: garantiza que una sola instancia
+    del programador ejecute la tarea aunque haya varios nodos.
+    """
+    nombre = models.CharField(max_length=100, unique=True)
+    propietario = models.CharField(max_length=255)
+    expira_en = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Bloqueo de tarea"
+        verbose_name_plural = "Bloqueos de tareas"
+
+    def __str__(self):
+        return f"{self.nombre} ({self.propietario})"
+
 
-        delta_alerta = 30
-        if (self.fecha_vencimiento - hoy).days <= delta_alerta:
-            return 'proximo'
+class EjecucionTarea(models.Model):
+    """
+    Historial de ejecuciones del programador (manage.py programador).
+    """
+    nombre = models.CharField(max_length=100)
+    programada_para = models.DateTimeField()
+    propietario = models.CharField(max_length=255)
+    iniciado_en = models.DateTimeField(auto_now_add=True)
+    terminado_en = models.DateTimeField(null=True, blank=True)
+    duracion = models.FloatField(null=True, blank=True, help_text="Segundos")
+    exitosa = models.BooleanField(null=True)
+    salida = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = "Ejecución de tarea"
+        verbose_name_plural = "Ejecuciones de tareas"
+        ordering = ['-iniciado_en']
+        constraints = [
+            # Un turno programado se ejecuta una sola vez entre todos los nodos
+            models.UniqueConstraint(
+                fields=['nombre', 'programada_para'],
+                name='ejecucion_tarea_turno_unico',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre} @ {self.programada_para}"
+
+
+class ExportacionJob(models.Model):
+    """
+    Exportación grande generada en segundo plano (ver exportaciones.py).
+    """
+    TIPO_CHOICES = [
+        ('vehiculos', 'Vehículos'),
+        ('documentos', 'Documentos'),
+    ]
+    FORMATO_CHOICES = [
+        ('csv', 'CSV (gzip)'),
+        ('xlsx', 'Excel (XLSX)'),
+    ]
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('listo', 'Listo'),
+        ('error', 'Error'),
+    ]
+
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    formato = models.CharField(max_length=10, choices=FORMATO_CHOICES, default='csv')
+    # Valor del filtro usado ('q' para vehículos, 'estado' para documentos)
+    filtro = models.CharField(max_length=100, blank=True)
+    # Hash de (empresa, tipo, formato, filtro, día) para reutilizar exportaciones idénticas
+    huella = models.CharField(max_length=64, db_index=True)
+    # Empresa cuyos datos se exportan (el worker la fija como empresa actual)
+    empresa = models.ForeignKey(
+        Empresa,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='exportaciones',
+    )
+
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
+    archivo = models.CharField(max_length=255, blank=True)
+    filas = models.PositiveIntegerField(null=True, blank=True)
+    bytes = models.PositiveBigIntegerField(null=True, blank=True)
+    duracion = models.FloatField(null=True, blank=True, help_text="Segundos")
+    error = models.TextField(blank=True)
+
+    creado_por = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="exportaciones",
+    )
+    creado_en = models.DateTimeField(auto_now_add=True)
+    iniciado_en = models.DateTimeField(null=True, blank=True)
+    terminado_en = models.DateTimeField(null=True, blank=True)
+    # Último latido del worker que la procesa: un trabajo 'procesando' sin
+    # latido reciente quedó huérfano (worker caído) y se vuelve a encolar
+    reclamado_en = models.DateTimeField(null=True, blank=True)
+    intentos = models.PositiveSmallIntegerField(default=0)
+
+    # Cada empresa ve solo sus exportaciones (estado y descarga)
+    objects = EmpresaManager()
+
+    class Meta:
+        verbose_name = "Exportación"
+        verbose_name_plural = "Exportaciones"
+        ordering = ['-creado_en']
+        indexes = [
+            models.Index(fields=['estado', 'creado_en'], name='export_estado_creado_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} {self.formato} ({self.estado})"
+
+    @property
+    def nombre_descarga(self):
+        nombre_filtro = slugify(self.filtro) or "todos"
+        extension = 'csv.gz' if self.formato == 'csv' else 'xlsx'
+        return f"{self.tipo}_flota_{nombre_filtro}.{extension}"
+
+
+class Importacion(models.Model):
+    """
+    Resultado de una carga masiva (ver importacion.py). El detalle de las
+    filas rechazadas queda en un CSV aparte (archivo_errores).
+    """
+    TIPO_CHOICES = [
+        ('vehiculos', 'Vehículos'),
+        ('documentos', 'Documentos'),
+    ]
+
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    nombre_archivo = models.CharField(max_length=255)
+    filas = models.PositiveIntegerField(default=0)
+    creados = models.PositiveIntegerField(default=0)
+    actualizados = models.PositiveIntegerField(default=0)
+    errores = models.PositiveIntegerField(default=0)
+    duracion = models.FloatField(default=0, help_text="Segundos")
+    # Ruta relativa dentro del almacenamiento de exportaciones
+    archivo_errores = models.CharField(max_length=255, blank=True)
+    empresa = models.ForeignKey(
+        Empresa,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='importaciones',
+    )
+
+    creado_por = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="importaciones",
+    )
+    creado_en = models.DateTimeField(auto_now_add=True)
+
+    objects = EmpresaManager()
+
+    class Meta:
+        verbose_name = "Importación"
+        verbose_name_plural = "Importaciones"
+        ordering = ['-creado_en']
+
+    def __str__(self):
+        return f"{self.get_tipo_display()}: {self.nombre_archivo}"
 
-        return 'vigente'
+    @property
+    def filas_por_segundo(self):
+        if not self.duracion:
+            return 0.0
+        return self.filas / self.duracion
+
+
+class SubidaArchivo(models.Model):
+    """
+    Archivo subido directamente al almacenamiento (sin pasar por el worker
+    web) y pendiente de asociarse a un documento o vehículo. Ver subidas.py.
+    """
+    DESTINO_CHOICES = [
+        ('documento', 'PDF de documento'),
+        ('vehiculo', 'Foto de vehículo'),
+    ]
+    ESTADO_CHOICES = [
+        ('esperando', 'Esperando el archivo'),
+        ('subida', 'Subida, por procesar'),
+        ('procesando', 'Procesando'),
+        ('lista', 'Lista'),
+        ('error', 'Error'),
+    ]
+
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    destino = models.CharField(max_length=20, choices=DESTINO_CHOICES)
+    nombre_original = models.CharField(max_length=255)
+    # Ruta dentro del almacenamiento temporal de subidas
+    clave = models.CharField(max_length=255)
+    tamano = models.PositiveBigIntegerField(help_text="Bytes declarados al firmar")
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='esperando')
+    error = models.TextField(blank=True)
+
+    documento = models.ForeignKey(
+        DocumentoVehiculo,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='subidas',
+    )
+    vehiculo = models.ForeignKey(
+        Vehiculo,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='subidas',
+    )
+
+    creado_por = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="subidas",
+    )
+    creado_en = models.DateTimeField(auto_now_add=True)
+    expira_en = models.DateTimeField()
+    # Cuándo la tomó un worker; una 'procesando' sin terminar pasado
+    # SUBIDAS_RECLAMO_TIMEOUT se da por abandonada
+    reclamado_en = models.DateTimeField(null=True, blank=True)
+    intentos = models.PositiveIntegerField(default=0)
+    terminado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Subida de archivo"
+        verbose_name_plural = "Subidas de archivos"
+        ordering = ['-creado_en']
+        indexes = [
+            models.Index(fields=['estado', 'creado_en'], name='subida_estado_creado_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_destino_display()}: {self.nombre_original} ({self.estado})"
+
+
+OPERACION_CAMBIO_CHOICES = [
+    ('crear', 'Creación'),
+    ('actualizar', 'Actualización'),
+    ('borrar', 'Borrado'),
+]
+
+
+class CambioFlota(models.Model):
+    """
+    Registro de cambios (solo inserciones) de vehículos y documentos para la
+    sincronización incremental: 'secuencia' es la marca de agua de los
+    clientes. Se asigna al publicar el evento, en orden de confirmación
+    (ver cambios.publicar_cambios); el id sigue el orden de inserción.
+    """
+    id = models.BigAutoField(primary_key=True)
+    secuencia = models.BigIntegerField(null=True, blank=True, editable=False)
+    modelo = models.CharField(max_length=10)  # 'vehiculo' o 'documento'
+    empresa = models.ForeignKey(
+        Empresa,
+        on_delete=models.CASCADE,
+        related_name='cambios',
+    )
+    objeto_id = models.PositiveIntegerField()
+    operacion = models.CharField(max_length=10, choices=OPERACION_CAMBIO_CHOICES)
+    # Campos del objeto tras el cambio; vacío en los borrados
+    datos = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    creado_en = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Cambio de flota"
+        verbose_name_plural = "Cambios de flota"
+        ordering = ['id']
+        indexes = [
+            # Compactación: último evento de cada objeto
+            models.Index(fields=['modelo', 'objeto_id', 'id'], name='cambio_objeto_idx'),
+            # Feed de cada empresa a partir de una secuencia
+            models.Index(fields=['empresa', 'secuencia'], name='cambio_emp_sec_idx'),
+            # Eventos por publicar
+            models.Index(
+                fields=['id'],
+                name='cambio_sin_secuencia_idx',
+                condition=Q(secuencia__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"#{self.secuencia or '-'} {self.operacion} {self.modelo} {self.objeto_id}"
+
+
+class SecuenciaCambios(models.Model):
+    """
+    Fila única con la última secuencia publicada. Publicar bloquea esta fila,
+    así las publicaciones se numeran una tras otra.
+    """
+    ultima = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Secuencia de cambios"
+        verbose_name_plural = "Secuencia de cambios"
+
+    def __str__(self):
+        return f"Secuencia {self.ultima}"
+
+
+class CompactacionCambios(models.Model):
+    """
+    Una corrida de compactar_cambios. 'piso' es la secuencia más alta de un
+    borrado descartado: un cliente que sincronizó antes de ese punto pudo
+    perder borrados y debe resincronizar desde cero.
+    """
+    ejecutada_en = models.DateTimeField(auto_now_add=True)
+    piso = models.BigIntegerField(default=0)
+    reemplazados = models.PositiveIntegerField(default=0)
+    borrados_descartados = models.PositiveIntegerField(default=0)
+    restantes = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Compactación de cambios"
+        verbose_name_plural = "Compactaciones de cambios"
+        ordering = ['-ejecutada_en']
+
+    def __str__(self):
+        return f"Compactación {self.ejecutada_en:%Y-%m-%d %H:%M} (piso {self.piso})"
@@ -0,0 +1,182 @@
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+# =========================
+# Paginación por cursor (keyset)
+# =========================
+#
+# En lugar de OFFSET, cada página se pide "a partir de" la última fila vista,
+# usando una tupla de columnas ordenadas cuya última columna es única (id).
+# Así el costo de una página depende del tamaño de página, no de su posición.
+
+def codificar_cursor(valores, direccion):
+    """
+    Convierte los valores de la fila frontera en un token opaco para la URL.
+    direccion: 'sig' (siguiente) o 'ant' (anterior).
+    """
+    datos = {
+        'v': [v.isoformat() if hasattr(v, 'isoformat') else v for v in valores],
+        'd': direccion,
+    }
+    crudo = json.dumps(datos, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip('=')
+
+
+def _campo(modelo, ruta):
+    """
+    Campo del modelo al que apunta 'ruta' ('placa', 'vehiculo__placa'...).
+    """
+    *relaciones, nombre = ruta.split('__')
+    for relacion in relaciones:
+        modelo = modelo._meta.get_field(relacion).related_model
+    return modelo._meta.get_field(nombre)
+
+
+def decodificar_cursor(token, campos, modelo):
+    """
+    Devuelve (valores, direccion) o None si el token no es válido. Cada
+    valor se convierte con to_python() del campo de orden: un cursor
+    alterado o viejo no llega a la consulta.
+    """
+    if not token:
+        return None
+    try:
+        relleno = '=' * (-len(token) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(token + relleno))
+        valores = datos['v']
+        direccion = datos['d']
+    except (ValueError, TypeError, KeyError):
+        return None
+
+    if direccion not in ('sig', 'ant') or not isinstance(valores, list):
+        return None
+    if len(valores) != len(campos):
+        return None
+    try:
+        valores = [_campo(modelo, campo).to_python(valor) for campo, valor in zip(campos, valores)]
+    except (ValidationError, FieldDoesNotExist, ValueError, TypeError, AttributeError):
+        return None
+    # Las columnas de orden no tienen NULL: la comparación de tuplas no los admite
+    if any(valor is None for valor in valores):
+        return None
+    return valores, direccion
+
+
+def _filtro_despues_de(campos, valores, descendente=False):
+    """
+    Construye (c1 > v1) OR (c1 = v1 AND c2 > v2) OR ...
+    (o con '<' si descendente) para comparar tuplas en cualquier backend.
+    """
+    op = 'lt' if descendente else 'gt'
+    filtro = Q()
+    iguales = {}
+    for campo, valor in zip(campos, valores):
+        filtro |= Q(**iguales, **{f'{campo}__{op}': valor})
+        iguales[campo] = valor
+    return filtro
+
+
+class PaginaCursor:
+    """
+    Página resultante de paginar_por_cursor().
+    """
+
+    def __init__(self, object_list, cursor_siguiente, cursor_anterior):
+        self.object_list = object_list
+        self.cursor_siguiente = cursor_siguiente
+        self.cursor_anterior = cursor_anterior
+
+    @property
+    def has_next(self):
+        return self.cursor_siguiente is not None
+
+    @property
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _consulta_pagina(queryset, campos, cursor, por_pagina, estricto):
+    """
+    QuerySet de la página (por_pagina + 1 filas, para saber si hay más sin
+    hacer COUNT), si hubo cursor válido y la dirección. Un cursor no válido
+    da la primera página, o ValueError si 'estricto'.
+    """
+    decodificado = decodificar_cursor(cursor, campos, queryset.model)
+    if cursor and decodificado is None and estricto:
+        raise ValueError("Cursor de paginación no válido.")
+    direccion = 'sig'
+
+    if decodificado:
+        valores, direccion = decodificado
+        descendente = direccion == 'ant'
+        queryset = queryset.filter(_filtro_despues_de(campos, valores, descendente))
+
+    if direccion == 'ant':
+        orden = [f'-{c}' for c in campos]
+    else:
+        orden = campos
+
+    return queryset.order_by(*orden)[:por_pagina + 1], bool(decodificado), direccion
+
+
+def _armar_pagina(filas, campos, por_pagina, con_cursor, direccion):
+    hay_mas = len(filas) > por_pagina
+    filas = filas[:por_pagina]
+
+    if direccion == 'ant':
+        filas.reverse()
+
+    def _valores(obj):
+        return [getattr(obj, c) for c in campos]
+
+    cursor_siguiente = cursor_anterior = None
+    if filas:
+        if direccion == 'sig':
+            if hay_mas:
+                cursor_siguiente = codificar_cursor(_valores(filas[-1]), 'sig')
+            if con_cursor:
+                cursor_anterior = codificar_cursor(_valores(filas[0]), 'ant')
+        else:
+            # Venimos de una página posterior: siempre hay siguiente
+            cursor_siguiente = codificar_cursor(_valores(filas[-1]), 'sig')
+            if hay_mas:
+                cursor_anterior = codificar_cursor(_valores(filas[0]), 'ant')
+
+    return PaginaCursor(filas, cursor_siguiente, cursor_anterior)
+
+
+def paginar_por_cursor(queryset, campos, cursor=None, por_pagina=50, estricto=False):
+    """
+    Pagina un QuerySet ordenado por 'campos' (ascendente; el último debe ser
+    único, normalmente 'id') a partir del token 'cursor'. Las vistas HTML
+    vuelven a la primera página con un cursor no válido; la API pasa
+    estricto=True para responder 400.
+
+    Lee por_pagina + 1 filas para saber si hay más páginas sin hacer COUNT.
+    """
+    campos = list(campos)
+    consulta, con_cursor, direccion = _consulta_pagina(queryset, campos, cursor, por_pagina, estricto)
+    return _armar_pagina(list(consulta), campos, por_pagina, con_cursor, direccion)
+
+
+async def apaginar_por_cursor(queryset, campos, cursor=None, por_pagina=50, estricto=False):
+    """
+    Versión para vistas async de paginar_por_cursor() (ORM async).
+    """
+    campos = list(campos)
+    consulta, con_cursor, direccion = _consulta_pagina(queryset, campos, cursor, por_pagina, estricto)
+    filas = [obj async for obj in consulta]
+    return _armar_pagina(filas, campos, por_pagina, con_cursor, direccion)
@@ -1,13 +1,68 @@
 from django.contrib.auth.models import Group
+from django.core.cache import cache
+
+from .cache_compartida import cache_compartida
+from .instrumentacion import contar_cache
 
 # Nombres de los grupos/roles que usaremos
 ROLE_ADMIN = "Flota Admin"
 ROLE_OPERADOR = "Flota Operador"
 ROLE_LECTURA = "Flota Lectura"  # opcional, para marcar usuarios de solo lectura
 
+ROLES_FLOTA = (ROLE_ADMIN, ROLE_OPERADOR, ROLE_LECTURA)
+
+# Los roles se cachean entre requests solo con caché compartida: signals.py
+# invalida al cambiar los grupos y la revocación llega a todos los procesos
+ROLES_CACHE_TIMEOUT = 60 * 15
+
+
+def _clave_roles(user_id):
+    return f"flota:roles:{user_id}"
+
+
+def _consultar_roles(user):
+    return frozenset(user.groups.filter(name__in=ROLES_FLOTA).values_list('name', flat=True))
+
+
+def roles_usuario(user) -> frozenset:
+    """
+    Grupos de flota del usuario, resueltos con una sola consulta.
+    Se memorizan en el objeto user (dura lo que dura el request) y, si la
+    caché es compartida, en la caché. Con la caché local de cada proceso se
+    consultan en cada request: un rol quitado en un worker seguiría vigente
+    en los demás hasta que venciera la clave.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+
+    roles = getattr(user, '_flota_roles', None)
+    if roles is not None:
+        return roles
+
+    if not cache_compartida():
+        roles = _consultar_roles(user)
+    else:
+        clave = _clave_roles(user.pk)
+        roles = cache.get(clave)
+        contar_cache('roles', roles is not None)
+        if roles is None:
+            roles = _consultar_roles(user)
+            cache.set(clave, roles, ROLES_CACHE_TIMEOUT)
+
+    user._flota_roles = roles
+    return roles
+
+
+def invalidar_roles(*user_ids):
+    cache.delete_many([_clave_roles(user_id) for user_id in user_ids])
+
+
+def invalidar_roles_grupo(group: Group):
+    invalidar_roles(*group.user_set.values_list('id', flat=True))
+
 
 def _in_group(user, group_name: str) -> bool:
-    return user.is_authenticated and user.groups.filter(name=group_name).exists()
+    return group_name in roles_usuario(user)
 
 
 def user_is_admin(user) -> bool:
@@ -0,0 +1,253 @@
+import io
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import BloqueoTarea, EjecucionTarea
+
+logger = logging.getLogger(__name__)
+
+
+# =========================
+# Expresiones cron
+# =========================
+
+class ExpresionCron:
+    """
+    Expresión cron de 5 campos: minuto hora día-del-mes mes día-de-la-semana.
+    Soporta '*', números, rangos 'a-b', pasos '*/n' o 'a-b/n' y listas 'a,b'.
+    Día de la semana: 0-6 con 0 = domingo (7 también es domingo).
+    """
+
+    RANGOS = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expresion):
+        partes = expresion.split()
+        if len(partes) != 5:
+            raise ValueError(f"Expresión cron inválida: {expresion!r}")
+        self.expresion = expresion
+        self.campos = [
+            self._parsear(parte, minimo, maximo)
+            for parte, (minimo, maximo) in zip(partes, self.RANGOS)
+        ]
+        if 7 in self.campos[4]:
+            self.campos[4] = (self.campos[4] - {7}) | {0}
+        # Semántica cron: si día del mes y día de semana están restringidos,
+        # basta con que coincida uno de los dos.
+        self._dom_libre = partes[2] == '*'
+        self._dow_libre = partes[4] == '*'
+
+    @staticmethod
+    def _parsear(parte, minimo, maximo):
+        valores = set()
+        for item in parte.split(','):
+            rango, _, paso = item.partition('/')
+            paso = int(paso) if paso else 1
+            if rango == '*':
+                inicio, fin = minimo, maximo
+            elif '-' in rango:
+                inicio, fin = (int(v) for v in rango.split('-'))
+            else:
+                inicio = fin = int(rango)
+            if inicio < minimo or fin > maximo or inicio > fin or paso < 1:
+                raise ValueError(f"Campo cron fuera de rango: {item!r}")
+            valores.update(range(inicio, fin + 1, paso))
+        return valores
+
+    def coincide(self, momento):
+        minutos, horas, dias, meses, dias_semana = self.campos
+        if momento.minute not in minutos or momento.hour not in horas:
+            return False
+        if momento.month not in meses:
+            return False
+
+        # isoweekday: lunes=1 ... domingo=7 -> cron: domingo=0
+        dia_semana = momento.isoweekday() % 7
+        coincide_dom = momento.day in dias
+        coincide_dow = dia_semana in dias_semana
+        if self._dom_libre or self._dow_libre:
+            return coincide_dom and coincide_dow
+        return coincide_dom or coincide_dow
+
+    def __str__(self):
+        return self.expresion
+
+
+# =========================
+# Tareas
+# =========================
+
+class Tarea:
+    """
+    Tarea programada definida en settings.FLOTA_TAREAS:
+    {'cron': '0 7 * * *', 'comando': 'nombre', 'args': [...]}  o
+    {'cron': '...', 'funcion': 'modulo.funcion'}
+    """
+
+    def __init__(self, nombre, config):
+        self.nombre = nombre
+        self.cron = ExpresionCron(config['cron'])
+        self.comando = config.get('comando')
+        self.funcion = config.get('funcion')
+        self.args = list(config.get('args', []))
+        # Tiempo máximo que se conserva el bloqueo si el proceso muere
+        self.bloqueo_segundos = config.get('bloqueo_segundos', 60 * 60)
+        if not (self.comando or self.funcion):
+            raise ValueError(f"La tarea {nombre!r} necesita 'comando' o 'funcion'.")
+
+    def ejecutar(self):
+        """
+        Ejecuta la tarea en este mismo proceso (Django ya está cargado).
+        Devuelve la salida capturada.
+        """
+        salida = io.StringIO()
+        if self.comando:
+            call_command(self.comando, *self.args, stdout=salida, stderr=salida)
+        else:
+            resultado = import_string(self.funcion)(*self.args)
+            if resultado is not None:
+                salida.write(str(resultado))
+        return salida.getvalue()
+
+
+# Minutos hacia atrás que revisa el programador después de una tarea larga
+MAX_MINUTOS_RECUPERADOS = 60 * 24
+
+
+def cargar_tareas():
+    return [
+        Tarea(nombre, config)
+        for nombre, config in getattr(settings, 'FLOTA_TAREAS', {}).items()
+    ]
+
+
+def turnos_pendientes(tareas, desde, hasta):
+    """
+    Para cada tarea, el último minuto de (desde, hasta] que coincide con su
+    cron. Si una tarea larga hizo que el programador se saltara minutos,
+    las tareas de esos minutos corren igual (una sola vez, aunque hayan
+    coincidido varios). Devuelve [(tarea, minuto)] en el orden de 'tareas'.
+    """
+    minutos = []
+    minuto = hasta
+    limite = max(desde, hasta - timedelta(minutes=MAX_MINUTOS_RECUPERADOS))
+    while minuto > limite:
+        minutos.append(minuto)
+        minuto -= timedelta(minutes=1)
+
+    pendientes = []
+    for tarea in tareas:
+        for minuto in minutos:
+            if tarea.cron.coincide(minuto):
+                pendientes.append((tarea, minuto))
+                break
+    return pendientes
+
+
+def identificador_proceso():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# =========================
+# Bloqueo en base de datos
+# =========================
+
+def adquirir_bloqueo(nombre, propietario, segundos):
+    """
+    Toma el bloqueo 'nombre' si está libre o vencido. Devuelve True si se obtuvo.
+    Funciona entre varios nodos porque se apoya en la base de datos compartida.
+    """
+    ahora = timezone.now()
+    expira = ahora + timedelta(seconds=segundos)
+
+    tomado = BloqueoTarea.objects.filter(nombre=nombre, expira_en__lte=ahora).update(
+        propietario=propietario,
+        expira_en=expira,
+    )
+    if tomado:
+        return True
+
+    try:
+        with transaction.atomic():
+            BloqueoTarea.objects.create(nombre=nombre, propietario=propietario, expira_en=expira)
+        return True
+    except IntegrityError:
+        return False
+
+
+def liberar_bloqueo(nombre, propietario):
+    BloqueoTarea.objects.filter(nombre=nombre, propietario=propietario).update(
+        expira_en=timezone.now(),
+    )
+
+
+def ejecutar_tarea(tarea, programada_para=None, propietario=None):
+    """
+    Ejecuta una tarea si este nodo obtiene su bloqueo y nadie la corrió ya
+    para ese mismo minuto programado. Registra el resultado en EjecucionTarea.
+    Devuelve la EjecucionTarea o None si otro nodo la tiene.
+    """
+    propietario = propietario or identificador_proceso()
+    programada_para = programada_para or timezone.now().replace(second=0, microsecond=0)
+
+    # El programador vive mucho más que CONN_MAX_AGE: como al empezar y
+    # terminar un request, se descartan las conexiones vencidas o caídas
+    close_old_connections()
+    if not adquirir_bloqueo(tarea.nombre, propietario, tarea.bloqueo_segundos):
+        return None
+
+    try:
+        try:
+            with transaction.atomic():
+                ejecucion = EjecucionTarea.objects.create(
+                    nombre=tarea.nombre,
+                    programada_para=programada_para,
+                    propietario=propietario,
+                )
+        except IntegrityError:
+            # Otro nodo ya ejecutó este turno
+            return None
+
+        inicio = time.perf_counter()
+        try:
+            ejecucion.salida = tarea.ejecutar()[-10000:]
+            ejecucion.exitosa = True
+        except Exception:
+            logger.exception("Falló la tarea programada %s", tarea.nombre)
+            ejecucion.salida = traceback.format_exc()[-10000:]
+            ejecucion.exitosa = False
+        finally:
+            # La tarea pudo dejar la conexión con errores o pasada de edad
+            close_old_connections()
+
+        ejecucion.duracion = time.perf_counter() - inicio
+        ejecucion.terminado_en = timezone.now()
+        ejecucion.save(update_fields=['salida', 'exitosa', 'duracion', 'terminado_en'])
+        return ejecucion
+    finally:
+        liberar_bloqueo(tarea.nombre, propietario)
+
+
+# =========================
+# Historial
+# =========================
+
+def purgar_ejecuciones(dias=None):
+    """
+    Borra del historial las ejecuciones de hace más de 'dias' (por defecto
+    PROGRAMADOR_RETENCION_DIAS): las tareas de cada minuto agregan unas
+    3.000 filas por día.
+    """
+    dias = settings.PROGRAMADOR_RETENCION_DIAS if dias is None else dias
+    limite = timezone.now() - timedelta(days=dias)
+    borradas, _ = EjecucionTarea.objects.filter(iniciado_en__lt=limite).delete()
+    return f"{borradas} ejecuciones anteriores a {limite:%Y-%m-%d} borradas."
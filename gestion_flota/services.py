@@ -1,9 +1,336 @@
+import time
+from collections import defaultdict
+from dataclasses import dataclass
 from datetime import date, timedelta
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.cache import cache
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q
+from django.utils import timezone
 
-from .models import DocumentoVehiculo
+from .cambios import registrar_cambios
+from .despacho import Despachador
+from .empresas import empresa_actual_id, espacio_cache, usar_empresa
+from .cache_compartida import vida_cache
+from .instrumentacion import contar_cache
+from .models import (
+    AlertaDocumento,
+    CorreoFallido,
+    DocumentoVehiculo,
+    EjecucionAlertas,
+    Empresa,
+    TipoDocumento,
+    Vehiculo,
+)
+
+
+# =========================
+# Estado materializado de documentos (rollover diario)
+# =========================
+
+ESTADOS_CACHE_TIMEOUT = 60 * 60 * 24
+# Vida del candado de la corrida: si el proceso muere sin soltarlo, otro
+# lo reintenta pasado este tiempo
+ROLLOVER_BLOQUEO_TIMEOUT = 60 * 5
+
+# Último día en que este proceso confirmó el rollover (evita ir a la caché)
+_rollover_confirmado = None
+
+
+def _clave_rollover(hoy):
+    return f"flota:rollover_estados:{hoy.isoformat()}"
+
+
+def _clave_bloqueo_rollover(hoy):
+    return f"flota:rollover_estados:{hoy.isoformat()}:bloqueo"
+
+
+def actualizar_estados_documentos(hoy=None, tipos=None):
+    """
+    Mueve DocumentoVehiculo.estado al valor que corresponde a 'hoy' con
+    UPDATEs por conjuntos: cada UPDATE solo toca filas cuyo estado cambia
+    (las que cruzaron un umbral). 'tipos' limita a esos TipoDocumento.
+    Devuelve un dict con las filas movidas a cada estado.
+    Corre sobre todas las empresas, sea cual sea la actual.
+    """
+    with usar_empresa(None):
+        return _actualizar_estados_documentos(hoy, tipos)
+
+
+def _actualizar_estados_documentos(hoy, tipos):
+    hoy = hoy or date.today()
+    # El cambio de estado cuenta como modificación (ETag de la API)
+    ahora = timezone.now()
+    docs = DocumentoVehiculo.objects.all()
+    tipos_qs = TipoDocumento.objects.order_by()
+    if tipos is not None:
+        docs = docs.filter(tipo__in=tipos)
+        tipos_qs = tipos_qs.filter(pk__in=tipos)
+
+    cambios = {
+        'vencido': docs.filter(fecha_vencimiento__lt=hoy)
+        .exclude(estado='vencido')
+        .update(estado='vencido', actualizado_en=ahora),
+        'proximo': 0,
+        'vigente': 0,
+    }
+
+    # La ventana de alerta es por tipo: un par de UPDATEs por ventana distinta
+    tipos_por_ventana = defaultdict(list)
+    for tipo_id, dias in tipos_qs.values_list('id', 'dias_alerta'):
+        tipos_por_ventana[dias].append(tipo_id)
+
+    for dias, tipo_ids in tipos_por_ventana.items():
+        limite = hoy + timedelta(days=dias)
+        del_tipo = docs.filter(tipo_id__in=tipo_ids)
+        cambios['proximo'] += (
+            del_tipo.filter(fecha_vencimiento__gte=hoy, fecha_vencimiento__lte=limite)
+            .exclude(estado='proximo')
+            .update(estado='proximo', actualizado_en=ahora)
+        )
+        cambios['vigente'] += (
+            del_tipo.filter(fecha_vencimiento__gt=limite)
+            .exclude(estado='vigente')
+            .update(estado='vigente', actualizado_en=ahora)
+        )
+
+    # update() no dispara signals: se invalidan aquí los datos derivados y
+    # se registran los cambios (las filas movidas llevan actualizado_en=ahora)
+    if any(cambios.values()):
+        registrar_cambios(
+            DocumentoVehiculo.objects.filter(actualizado_en=ahora).iterator(chunk_size=1000),
+            'actualizar',
+        )
+        invalidar_conteos_documentos(hoy)
+        invalidar_snapshot_dashboard(hoy)
+    return cambios
+
+
+def asegurar_estados_al_dia(hoy=None):
+    """
+    Garantiza que el rollover de 'hoy' ya corrió (por si la tarea programada
+    no lo hizo). Cuesta una lectura de caché por proceso y día; si nadie lo
+    corrió, lo ejecuta aquí (es idempotente).
+
+    La marca del día se guarda solo si la corrida termina bien; mientras
+    corre, un candado aparte evita que otros procesos la repitan. Si falla,
+    se suelta el candado y el siguiente request la reintenta.
+    """
+    global _rollover_confirmado
+    hoy = hoy or date.today()
+    if _rollover_confirmado == hoy:
+        return
+
+    clave = _clave_rollover(hoy)
+    if not cache.get(clave):
+        bloqueo = _clave_bloqueo_rollover(hoy)
+        if not cache.add(bloqueo, True, ROLLOVER_BLOQUEO_TIMEOUT):
+            # Otro proceso lo está corriendo: no se confirma todavía
+            return
+        try:
+            actualizar_estados_documentos(hoy)
+            cache.set(clave, True, ESTADOS_CACHE_TIMEOUT)
+        finally:
+            cache.delete(bloqueo)
+    _rollover_confirmado = hoy
+
+
+async def aasegurar_estados_al_dia(hoy=None):
+    """
+    Versión para vistas async: si este proceso ya confirmó el rollover del
+    día no sale del event loop.
+    """
+    hoy = hoy or date.today()
+    if _rollover_confirmado != hoy:
+        await sync_to_async(asegurar_estados_al_dia)(hoy)
+
+
+# =========================
+# Conteos de documentos por estado
+# =========================
+
+CONTEOS_CACHE_TIMEOUT = 60 * 60 * 24  # un día
+
+
+def _clave_conteos(hoy, empresa_id):
+    return f"{espacio_cache(empresa_id)}:conteos_documentos:{hoy.isoformat()}"
+
+
+def _empresas_afectadas(empresa_id):
+    """
+    Empresas cuyas cachés invalida un cambio: la indicada (todas, si es
+    None) y siempre la vista de todas las empresas.
+    """
+    if empresa_id is None:
+        return [None, *Empresa.objects.values_list('id', flat=True)]
+    return [None, empresa_id]
+
+
+def contar_documentos_por_estado(hoy=None):
+    """
+    Devuelve un dict con 'vencidos', 'proximos', 'vigentes' y 'todos'
+    calculados en una sola consulta con COUNT condicionales sobre el
+    estado guardado.
+    El resultado se cachea por día y empresa; se invalida al guardar o
+    borrar un documento (ver signals.py). Con la caché local de cada
+    proceso vive como mucho CACHE_LOCAL_TIMEOUT (ver cache_compartida.py).
+    """
+    hoy = hoy or date.today()
+    clave = _clave_conteos(hoy, empresa_actual_id())
+
+    conteos = cache.get(clave)
+    contar_cache('conteos', conteos is not None)
+    if conteos is not None:
+        return conteos
+
+    asegurar_estados_al_dia(hoy)
+    conteos = DocumentoVehiculo.objects.aggregate(
+        vencidos=Count('id', filter=Q(estado='vencido')),
+        proximos=Count('id', filter=Q(estado='proximo')),
+        vigentes=Count('id', filter=Q(estado='vigente')),
+        todos=Count('id'),
+    )
+    cache.set(clave, conteos, vida_cache(CONTEOS_CACHE_TIMEOUT))
+    return conteos
+
+
+async def acontar_documentos_por_estado(hoy=None):
+    """
+    Versión async de contar_documentos_por_estado(): la lectura de caché no
+    bloquea el event loop; si falta, se calcula en un hilo.
+    """
+    hoy = hoy or date.today()
+    conteos = await cache.aget(_clave_conteos(hoy, empresa_actual_id()))
+    # Un fallo lo anota la versión sync, que vuelve a leer la caché
+    if conteos is not None:
+        contar_cache('conteos', True)
+    else:
+        conteos = await sync_to_async(contar_documentos_por_estado)(hoy)
+    return conteos
+
+
+def invalidar_conteos_documentos(hoy=None, empresa_id=None):
+    hoy = hoy or date.today()
+    cache.delete_many([_clave_conteos(hoy, e) for e in _empresas_afectadas(empresa_id)])
+
+
+# =========================
+# Snapshot del dashboard
+# =========================
+
+DASHBOARD_TOP_N = 10
+DASHBOARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+_CAMPOS_LISTA_DASHBOARD = {
+    'placa': F('vehiculo__placa'),
+    'responsable': F('vehiculo__responsable_nombre'),
+    'tipo_nombre': F('tipo__nombre'),
+}
+
+
+def _clave_dashboard(hoy, empresa_id):
+    return f"{espacio_cache(empresa_id)}:dashboard:{hoy.isoformat()}"
+
+
+def construir_snapshot_dashboard(hoy=None, top_n=DASHBOARD_TOP_N):
+    """
+    Calcula todo lo que muestra el dashboard como datos planos (cacheables):
+    conteos, los N vencimientos más cercanos de cada lista y el desglose
+    por tipo de documento.
+    """
+    hoy = hoy or date.today()
+    asegurar_estados_al_dia(hoy)
+    docs = DocumentoVehiculo.objects.all()
+
+    proximos = list(
+        docs.filter(estado='proximo')
+        .order_by('fecha_vencimiento', 'id')
+        .values('id', 'fecha_vencimiento', 'vehiculo_id', **_CAMPOS_LISTA_DASHBOARD)[:top_n]
+    )
+    # Los vencidos más recientes primero
+    vencidos = list(
+        docs.filter(estado='vencido')
+        .order_by('-fecha_vencimiento', '-id')
+        .values('id', 'fecha_vencimiento', 'vehiculo_id', **_CAMPOS_LISTA_DASHBOARD)[:top_n]
+    )
+    por_tipo = list(
+        docs.values(nombre=F('tipo__nombre'))
+        .annotate(
+            vencidos=Count('id', filter=Q(estado='vencido')),
+            proximos=Count('id', filter=Q(estado='proximo')),
+            vigentes=Count('id', filter=Q(estado='vigente')),
+            total=Count('id'),
+        )
+        .order_by('nombre')
+    )
+    conteos = contar_documentos_por_estado(hoy=hoy)
+    # Ventana de "próximo a vencer": la de cada tipo (TipoDocumento.dias_alerta)
+    ventana = TipoDocumento.objects.aggregate(dias_min=Min('dias_alerta'), dias_max=Max('dias_alerta'))
+
+    return {
+        'fecha': hoy,
+        'total_vehiculos': Vehiculo.objects.filter(activo=True).count(),
+        'ventana_proximos_min': ventana['dias_min'],
+        'ventana_proximos_max': ventana['dias_max'],
+        'total_proximos': conteos['proximos'],
+        'total_vencidos': conteos['vencidos'],
+        'proximos': proximos,
+        'vencidos': vencidos,
+        'por_tipo': por_tipo,
+    }
+
+
+def obtener_snapshot_dashboard(hoy=None):
+    """
+    Snapshot del dashboard desde la caché (una lectura). La clave incluye la
+    fecha, así que a medianoche se recalcula solo; signals.py lo invalida
+    cuando cambian vehículos, documentos o tipos. Con la caché local de cada
+    proceso vive como mucho CACHE_LOCAL_TIMEOUT (ver cache_compartida.py).
+    """
+    hoy = hoy or date.today()
+    clave = _clave_dashboard(hoy, empresa_actual_id())
+
+    snapshot = cache.get(clave)
+    contar_cache('dashboard', snapshot is not None)
+    if snapshot is None:
+        snapshot = construir_snapshot_dashboard(hoy=hoy)
+        cache.set(clave, snapshot, vida_cache(DASHBOARD_CACHE_TIMEOUT))
+    return snapshot
+
+
+async def aobtener_snapshot_dashboard(hoy=None):
+    """
+    Versión async de obtener_snapshot_dashboard().
+    """
+    hoy = hoy or date.today()
+    snapshot = await cache.aget(_clave_dashboard(hoy, empresa_actual_id()))
+    if snapshot is not None:
+        contar_cache('dashboard', True)
+    else:
+        snapshot = await sync_to_async(obtener_snapshot_dashboard)(hoy)
+    return snapshot
+
+
+def invalidar_snapshot_dashboard(hoy=None, empresa_id=None):
+    hoy = hoy or date.today()
+    cache.delete_many([_clave_dashboard(hoy, e) for e in _empresas_afectadas(empresa_id)])
+
+
+def calentar_caches():
+    """
+    Precalcula los datos cacheados del día de cada empresa activa (tarea
+    programada, pasada la medianoche). Solo beneficia a los workers web si
+    la caché es compartida.
+    """
+    empresas = list(Empresa.objects.filter(activa=True).values_list('id', flat=True))
+    for empresa_id in empresas:
+        with usar_empresa(empresa_id):
+            contar_documentos_por_estado()
+            obtener_snapshot_dashboard()
+    return f"Cachés del día precalculadas ({len(empresas)} empresas)."
 
 
 def obtener_documentos_para_alerta(dias=30):
@@ -15,32 +342,59 @@ def obtener_documentos_para_alerta(dias=30):
     hoy = date.today()
     limite = hoy + timedelta(days=dias)
 
-    proximos = DocumentoVehiculo.objects.filter(
+    docs = DocumentoVehiculo.objects.select_related('vehiculo', 'tipo')
+    proximos = docs.filter(
         fecha_vencimiento__gte=hoy,
         fecha_vencimiento__lte=limite
     )
-    vencidos = DocumentoVehiculo.objects.filter(
+    vencidos = docs.filter(
         fecha_vencimiento__lt=hoy
     )
 
     return proximos, vencidos
 
 
-def enviar_alerta_documentos(dias=30):
+# =========================
+# Alertas por correo
+# =========================
+
+@dataclass
+class ResultadoAlertas:
+    documentos: int = 0
+    mensajes: int = 0
+    destinatarios: int = 0
+    fallidos: int = 0
+    segundos: float = 0.0
+    mensajes_por_segundo: float = 0.0
+
+    def agregar_despacho(self, despacho):
+        self.mensajes = despacho.enviados
+        self.fallidos = len(despacho.fallidos)
+        self.mensajes_por_segundo = despacho.mensajes_por_segundo
+
+
+def agrupar_por_responsable(documentos, destino_por_defecto=None):
     """
-    Construye un correo con el resumen de documentos vencidos / por vencer
-    y lo envía a ALERTAS_EMAIL_DESTINO.
-    Devuelve el número total de documentos incluidos en la alerta.
+    Agrupa documentos por Vehiculo.responsable_email.
+    Los vehículos sin responsable van a 'destino_por_defecto' (si existe).
+    Devuelve {email: [documentos]}.
     """
-    destino = getattr(settings, 'ALERTAS_EMAIL_DESTINO', None)
-    if not destino:
-        return 0
+    grupos = defaultdict(list)
+    for doc in documentos:
+        email = (doc.vehiculo.responsable_email or '').strip().lower()
+        email = email or destino_por_defecto
+        if email:
+            grupos[email].append(doc)
+    return grupos
 
-    proximos, vencidos = obtener_documentos_para_alerta(dias=dias)
 
-    if not proximos and not vencidos:
-        # Nada que reportar
-        return 0
+def construir_digest(documentos, dias, hoy=None):
+    """
+    Cuerpo del correo con los documentos vencidos / por vencer de un responsable.
+    """
+    hoy = hoy or date.today()
+    vencidos = [d for d in documentos if d.fecha_vencimiento < hoy]
+    proximos = [d for d in documentos if d.fecha_vencimiento >= hoy]
 
     lineas = []
 
@@ -59,13 +413,288 @@ def enviar_alerta_documentos(dias=30):
                 f"- {d.vehiculo.placa} | {d.tipo.nombre} | vence el {d.fecha_vencimiento}"
             )
 
-    cuerpo = "\n".join(lineas)
+    return "\n".join(lineas)
+
+
+def registrar_fallido(mensaje, error, intentos):
+    """
+    Guarda en la cola de fallidos (dead-letter) un mensaje que no se pudo
+    enviar tras agotar los reintentos.
+    """
+    return CorreoFallido.objects.create(
+        destinatarios=", ".join(mensaje.to),
+        asunto=mensaje.subject,
+        cuerpo=mensaje.body,
+        error=str(error)[:2000],
+        intentos=intentos,
+        alertas=getattr(mensaje, 'alertas_ids', []),
+    )
+
+
+def despachar_mensajes(mensajes, concurrencia=None, al_enviar=None):
+    """
+    Envía los mensajes con el Despachador (pool de hilos, reintentos con
+    backoff) y manda los fallos definitivos a CorreoFallido.
+    Devuelve el ResultadoDespacho.
+    """
+    return Despachador(concurrencia=concurrencia).enviar(
+        mensajes,
+        al_enviar=al_enviar,
+        al_fallar=registrar_fallido,
+    )
+
+
+def enviar_alerta_documentos(dias=30, concurrencia=None):
+    """
+    Envía un resumen (digest) de documentos vencidos / por vencer a cada
+    responsable de vehículo (Vehiculo.responsable_email). Los documentos de
+    vehículos sin responsable van a ALERTAS_EMAIL_DESTINO.
+
+    Carga documentos, vehículos y tipos en una sola consulta.
+    Devuelve un ResultadoAlertas.
+    """
+    inicio = time.perf_counter()
+    hoy = date.today()
+    limite = hoy + timedelta(days=dias)
+
+    documentos = (
+        DocumentoVehiculo.objects.select_related('vehiculo', 'tipo')
+        .filter(fecha_vencimiento__lte=limite)
+        .order_by('fecha_vencimiento', 'id')
+    )
+    grupos = agrupar_por_responsable(
+        documentos,
+        destino_por_defecto=getattr(settings, 'ALERTAS_EMAIL_DESTINO', None),
+    )
+
+    mensajes = [
+        EmailMessage(
+            subject="Alertas de documentos de flota",
+            body=construir_digest(docs, dias, hoy=hoy),
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[email],
+        )
+        for email, docs in grupos.items()
+    ]
+
+    resultado = ResultadoAlertas(
+        documentos=sum(len(docs) for docs in grupos.values()),
+        destinatarios=len(grupos),
+    )
+    if mensajes:
+        resultado.agregar_despacho(despachar_mensajes(mensajes, concurrencia=concurrencia))
+
+    resultado.segundos = time.perf_counter() - inicio
+    return resultado
+
+
+# =========================
+# Alertas incrementales (ledger)
+# =========================
+
+def umbral_para(fecha_vencimiento, hoy, umbrales):
+    """
+    Devuelve el umbral más severo que cruzó la fecha: 'vencido', el menor
+    número de días de 'umbrales' que la contiene (como texto) o None.
+    """
+    if fecha_vencimiento < hoy:
+        return 'vencido'
+    dias = (fecha_vencimiento - hoy).days
+    for umbral in sorted(umbrales):
+        if dias <= umbral:
+            return str(umbral)
+    return None
+
+
+def _filtro_candidatos(hoy, umbrales, ultima):
+    """
+    Documentos cuyo umbral pudo cambiar desde la última corrida completada:
+    los que cruzaron un umbral por el paso de los días (rangos de fecha,
+    resueltos con el índice de fecha_vencimiento) y los editados desde entonces.
+    """
+    ventana = hoy + timedelta(days=max(umbrales))
+    if ultima is None:
+        return Q(fecha_vencimiento__lte=ventana)
+
+    desde = ultima.fecha_corte
+    filtro = Q(fecha_vencimiento__gte=desde, fecha_vencimiento__lt=hoy)
+    for umbral in umbrales:
+        filtro |= Q(
+            fecha_vencimiento__gt=desde + timedelta(days=umbral),
+            fecha_vencimiento__lte=hoy + timedelta(days=umbral),
+        )
+    filtro |= Q(actualizado_en__gte=ultima.iniciado_en, fecha_vencimiento__lte=ventana)
+    return filtro
+
+
+def detectar_alertas(hoy=None, umbrales=None):
+    """
+    Registra en el ledger (AlertaDocumento) los umbrales cruzados desde la
+    última corrida. Idempotente: las filas ya registradas se ignoran.
+    Devuelve el número de documentos revisados.
+    """
+    hoy = hoy or date.today()
+    umbrales = umbrales or settings.ALERTAS_UMBRALES
+    ultima = (
+        EjecucionAlertas.objects.filter(completada=True)
+        .order_by('-iniciado_en')
+        .first()
+    )
+
+    candidatos = (
+        DocumentoVehiculo.objects.filter(_filtro_candidatos(hoy, umbrales, ultima))
+        .values_list('id', 'fecha_vencimiento', 'vehiculo__responsable_email')
+    )
+
+    nuevas = []
+    revisados = 0
+    for doc_id, fecha, email in candidatos.iterator(chunk_size=2000):
+        revisados += 1
+        umbral = umbral_para(fecha, hoy, umbrales)
+        if umbral is None:
+            continue
+        nuevas.append(AlertaDocumento(
+            documento_id=doc_id,
+            umbral=umbral,
+            fecha_vencimiento=fecha,
+            destinatario=(email or '').strip().lower(),
+        ))
+
+    AlertaDocumento.objects.bulk_create(nuevas, batch_size=1000, ignore_conflicts=True)
+    return revisados
+
+
+def _pendientes_vigentes():
+    """
+    Alertas pendientes de enviar (incluye las de una corrida interrumpida).
+    Descarta las que quedaron obsoletas porque el documento cambió de fecha,
+    y deja solo la más severa por documento.
+    """
+    pendientes = (
+        AlertaDocumento.objects.filter(notificado_en__isnull=True)
+        .select_related('documento__vehiculo', 'documento__tipo')
+        .order_by('documento_id', 'fecha_vencimiento')
+    )
+
+    por_documento = {}
+    descartadas = []
+    for alerta in pendientes:
+        if alerta.fecha_vencimiento != alerta.documento.fecha_vencimiento:
+            descartadas.append(alerta.pk)
+            continue
+        actual = por_documento.get(alerta.documento_id)
+        if actual is None or _severidad(alerta.umbral) > _severidad(actual.umbral):
+            if actual is not None:
+                descartadas.append(actual.pk)
+            por_documento[alerta.documento_id] = alerta
+        else:
+            descartadas.append(alerta.pk)
+
+    if descartadas:
+        # Reemplazadas por una alerta más severa o por una nueva fecha
+        AlertaDocumento.objects.filter(pk__in=descartadas).update(notificado_en=timezone.now())
+    return list(por_documento.values())
+
+
+def _severidad(umbral):
+    return float('inf') if umbral == 'vencido' else -int(umbral)
+
+
+def construir_digest_incremental(alertas):
+    """
+    Cuerpo del correo con las alertas nuevas de un responsable, por umbral.
+    """
+    secciones = defaultdict(list)
+    for alerta in alertas:
+        secciones[alerta.umbral].append(alerta.documento)
+
+    lineas = []
+    for umbral in sorted(secciones, key=_severidad, reverse=True):
+        if umbral == 'vencido':
+            lineas.append("DOCUMENTOS VENCIDOS:")
+            plantilla = "- {placa} | {tipo} | venció el {fecha}"
+        else:
+            lineas.append(f"DOCUMENTOS QUE VENCEN EN {umbral} DÍAS O MENOS:")
+            plantilla = "- {placa} | {tipo} | vence el {fecha}"
+        for d in sorted(secciones[umbral], key=lambda d: d.fecha_vencimiento):
+            lineas.append(plantilla.format(
+                placa=d.vehiculo.placa,
+                tipo=d.tipo.nombre,
+                fecha=d.fecha_vencimiento,
+            ))
+        lineas.append("")
+
+    return "\n".join(lineas).strip()
+
+
+def enviar_alertas_incrementales(umbrales=None, concurrencia=None):
+    """
+    Envía solo lo que cambió desde la última corrida completada:
+    1. detecta los umbrales cruzados y los registra en el ledger;
+    2. envía un digest por responsable con las alertas pendientes;
+    3. marca cada mensaje como notificado apenas se envía; los que fallan
+       de forma definitiva pasan a la cola CorreoFallido.
+
+    Si la corrida se interrumpe a mitad de envío, la siguiente retoma las
+    alertas que quedaron pendientes (como mucho se repiten los mensajes
+    que estaban en vuelo).
+    Devuelve un ResultadoAlertas.
+    """
+    inicio = time.perf_counter()
+    hoy = date.today()
+    ejecucion = EjecucionAlertas.objects.create(fecha_corte=hoy)
+
+    with transaction.atomic():
+        detectar_alertas(hoy=hoy, umbrales=umbrales)
+
+    alertas = _pendientes_vigentes()
+    destino_por_defecto = getattr(settings, 'ALERTAS_EMAIL_DESTINO', None)
+
+    grupos = defaultdict(list)
+    for alerta in alertas:
+        email = alerta.destinatario or destino_por_defecto
+        if email:
+            grupos[email].append(alerta)
+
+    mensajes = []
+    for email, grupo in grupos.items():
+        mensaje = EmailMessage(
+            subject="Alertas de documentos de flota",
+            body=construir_digest_incremental(grupo),
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[email],
+        )
+        mensaje.alertas_ids = [a.pk for a in grupo]
+        mensajes.append(mensaje)
+
+    def marcar_notificadas(mensaje):
+        AlertaDocumento.objects.filter(pk__in=mensaje.alertas_ids).update(
+            notificado_en=timezone.now(),
+        )
+
+    def registrar_y_marcar(mensaje, error, intentos):
+        # El mensaje queda en CorreoFallido para reenviarlo manualmente
+        registrar_fallido(mensaje, error, intentos)
+        marcar_notificadas(mensaje)
 
-    send_mail(
-        subject="Alertas de documentos de flota",
-        message=cuerpo,
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[destino],
+    resultado = ResultadoAlertas(
+        documentos=sum(len(grupo) for grupo in grupos.values()),
+        destinatarios=len(grupos),
     )
+    if mensajes:
+        despacho = Despachador(concurrencia=concurrencia).enviar(
+            mensajes,
+            al_enviar=marcar_notificadas,
+            al_fallar=registrar_y_marcar,
+        )
+        resultado.agregar_despacho(despacho)
 
-    return len(proximos) + len(vencidos)
+    resultado.segundos = time.perf_counter() - inicio
+    ejecucion.terminado_en = timezone.now()
+    ejecucion.completada = True
+    ejecucion.documentos = resultado.documentos
+    ejecucion.mensajes = resultado.mensajes
+    ejecucion.destinatarios = resultado.destinatarios
+    ejecucion.segundos = resultado.segundos
+    ejecucion.save()
+    return resultado
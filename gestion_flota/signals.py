@@ -0,0 +1,147 @@
+from django.contrib.auth.models import Group, User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .busqueda import desindexar_vehiculo, indexar_vehiculo
+from .cambios import registrar_cambio
+from .empresas import invalidar_empresas_usuario
+from .models import DocumentoVehiculo, Empresa, TipoDocumento, Vehiculo
+from .permissions import invalidar_roles, invalidar_roles_grupo
+from .services import (
+    actualizar_estados_documentos,
+    invalidar_conteos_documentos,
+    invalidar_snapshot_dashboard,
+)
+from .subidas import encolar_miniaturas
+
+
+# =========================
+# Invalidación de caché
+# =========================
+
+@receiver(post_save, sender=DocumentoVehiculo)
+@receiver(post_delete, sender=DocumentoVehiculo)
+def documento_cambiado(sender, instance, **kwargs):
+    invalidar_conteos_documentos(empresa_id=instance.empresa_id)
+    invalidar_snapshot_dashboard(empresa_id=instance.empresa_id)
+
+
+@receiver(post_save, sender=Vehiculo)
+@receiver(post_delete, sender=Vehiculo)
+@receiver(post_save, sender=TipoDocumento)
+@receiver(post_delete, sender=TipoDocumento)
+def flota_cambiada(sender, instance, **kwargs):
+    # Placas, responsables, vehículos activos y nombres de tipo salen en el dashboard
+    invalidar_snapshot_dashboard(empresa_id=instance.empresa_id)
+
+
+# =========================
+# Estado materializado de documentos
+# =========================
+
+@receiver(post_save, sender=TipoDocumento)
+def tipo_documento_guardado(sender, instance, created, **kwargs):
+    # Cambiar dias_alerta mueve de estado a los documentos de ese tipo
+    if not created:
+        actualizar_estados_documentos(tipos=[instance.pk])
+
+
+# =========================
+# Índice de búsqueda (FTS5 en SQLite)
+# =========================
+
+@receiver(post_save, sender=Vehiculo)
+def vehiculo_guardado(sender, instance, **kwargs):
+    indexar_vehiculo(instance)
+
+
+@receiver(post_delete, sender=Vehiculo)
+def vehiculo_borrado(sender, instance, **kwargs):
+    desindexar_vehiculo(instance.pk)
+
+
+# =========================
+# Registro de cambios (sincronización incremental)
+# =========================
+
+@receiver(post_save, sender=Vehiculo)
+@receiver(post_save, sender=DocumentoVehiculo)
+def objeto_flota_guardado(sender, instance, created, **kwargs):
+    registrar_cambio(instance, 'crear' if created else 'actualizar')
+
+
+@receiver(post_delete, sender=Vehiculo)
+@receiver(post_delete, sender=DocumentoVehiculo)
+def objeto_flota_borrado(sender, instance, **kwargs):
+    registrar_cambio(instance, 'borrar')
+
+
+# =========================
+# Miniaturas de la foto del vehículo
+# =========================
+
+@receiver(pre_save, sender=Vehiculo)
+def vehiculo_por_guardar(sender, instance, **kwargs):
+    # Una foto recién subida por formulario aún no está en el storage
+    foto = instance.foto
+    instance._regenerar_miniaturas = (
+        (bool(foto) and not foto._committed) or
+        (not foto and bool(instance.miniaturas))
+    )
+
+
+@receiver(post_save, sender=Vehiculo)
+def vehiculo_foto_guardada(sender, instance, **kwargs):
+    if getattr(instance, '_regenerar_miniaturas', False):
+        instance._regenerar_miniaturas = False
+        # Bajar la original y subir los derivados no va en el request
+        encolar_miniaturas(instance)
+
+
+# =========================
+# Empresas del usuario
+# =========================
+
+@receiver(m2m_changed, sender=Empresa.usuarios.through)
+def empresas_usuario_cambiadas(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # user.empresas.add/remove/clear(...)
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidar_empresas_usuario(instance.pk)
+    elif action == 'pre_clear':
+        # empresa.usuarios.clear(): aún se pueden leer los miembros
+        invalidar_empresas_usuario(*instance.usuarios.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        # empresa.usuarios.add/remove(...)
+        invalidar_empresas_usuario(*pk_set)
+
+
+@receiver(post_save, sender=Empresa)
+def empresa_guardada(sender, instance, **kwargs):
+    # Activar o desactivar una empresa cambia las empresas de sus miembros
+    invalidar_empresas_usuario(*instance.usuarios.values_list('pk', flat=True))
+
+
+# =========================
+# Roles
+# =========================
+
+@receiver(m2m_changed, sender=User.groups.through)
+def grupos_usuario_cambiados(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        # user.groups.add/remove/clear(...)
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidar_roles(instance.pk)
+    elif action == 'pre_clear':
+        # group.user_set.clear(): aún se pueden leer los miembros
+        invalidar_roles_grupo(instance)
+    elif action in ('post_add', 'post_remove'):
+        # group.user_set.add/remove(...)
+        invalidar_roles(*pk_set)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def grupo_cambiado(sender, instance, **kwargs):
+    # Renombrar o borrar un grupo cambia los roles de todos sus miembros
+    invalidar_roles_grupo(instance)
@@ -0,0 +1,391 @@
+import logging
+import os
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F, Q
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.module_loading import import_string
+from PIL import Image
+
+from .contenidos import asignar_contenido
+from .exportaciones import lanzar_worker
+from .imagenes import generar_miniaturas
+from .models import SubidaArchivo, Vehiculo
+
+logger = logging.getLogger(__name__)
+
+
+# =========================
+# Subidas directas al almacenamiento
+# =========================
+#
+# 1. El navegador pide una URL firmada (subida_firmar) y sube el archivo
+#    directamente al almacenamiento con ella.
+# 2. El formulario del documento/vehículo solo envía el token de la subida;
+#    el registro queda con el archivo "pendiente".
+# 3. Un worker (procesar_subidas) valida el archivo, lo mueve a su ruta
+#    definitiva (upload_to) y limpia el pendiente.
+#
+# Así el worker web nunca recibe los bytes del archivo. El mismo worker
+# genera las miniaturas de las fotos que cambian por formulario o admin
+# (encolar_miniaturas).
+
+EXTENSIONES = {
+    'documento': ('.pdf',),
+    'vehiculo': ('.jpg', '.jpeg', '.png', '.webp'),
+}
+
+# Campo de archivo y marca de pendiente de cada destino
+CAMPOS = {
+    'documento': ('archivo', 'archivo_pendiente'),
+    'vehiculo': ('foto', 'foto_pendiente'),
+}
+
+
+class DestinoLocal:
+    """
+    Sustituto local de un almacenamiento con URLs firmadas (S3, GCS...): la
+    URL firmada apunta a la vista subida_recibir, que escribe en SUBIDAS_ROOT.
+    Otro backend con la misma interfaz se configura en SUBIDAS_DESTINO.
+    """
+
+    def __init__(self):
+        self.storage = FileSystemStorage(location=settings.SUBIDAS_ROOT)
+
+    def firmar(self, subida, request):
+        expira = int(subida.expira_en.timestamp())
+        consulta = urlencode({'expira': expira, 'firma': firma_local(subida.token, expira)})
+        url = request.build_absolute_uri(reverse('subida_recibir', args=[subida.token]))
+        return {
+            'url': f"{url}?{consulta}",
+            'metodo': 'PUT',
+            'cabeceras': {'Content-Type': 'application/octet-stream'},
+        }
+
+    def guardar(self, clave, bloques, limite):
+        """
+        Escribe los bloques en 'clave' sin pasar de 'limite' bytes (el tamaño
+        firmado). Si el cuerpo trae más, borra lo escrito y lanza ValueError.
+        """
+        ruta = self.storage.path(clave)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        total = 0
+        with open(ruta, 'wb') as destino:
+            for bloque in bloques:
+                total += len(bloque)
+                if total > limite:
+                    break
+                destino.write(bloque)
+        if total > limite:
+            self.borrar(clave)
+            raise ValueError("El archivo supera el tamaño firmado.")
+        return total
+
+    def existe(self, clave):
+        return self.storage.exists(clave)
+
+    def tamano(self, clave):
+        return self.storage.size(clave)
+
+    def abrir(self, clave):
+        return self.storage.open(clave, 'rb')
+
+    def borrar(self, clave):
+        self.storage.delete(clave)
+
+
+def obtener_destino():
+    return import_string(settings.SUBIDAS_DESTINO)()
+
+
+def firma_local(token, expira):
+    return salted_hmac('gestion_flota.subidas', f"{token}:{expira}").hexdigest()
+
+
+def firma_valida(token, expira, firma):
+    try:
+        expira = int(expira)
+    except (TypeError, ValueError):
+        return False
+    if expira < timezone.now().timestamp():
+        return False
+    return constant_time_compare(firma_local(token, expira), firma or '')
+
+
+def crear_subida(destino, nombre, tamano, usuario=None):
+    """
+    Registra una subida 'esperando' el archivo. Lanza ValueError si el tipo
+    o el tamaño no se admiten.
+    """
+    if destino not in EXTENSIONES:
+        raise ValueError("Destino de subida no válido.")
+    nombre = os.path.basename(nombre or '')
+    extension = os.path.splitext(nombre)[1].lower()
+    if extension not in EXTENSIONES[destino]:
+        raise ValueError(f"Extensión no permitida; se admite: {', '.join(EXTENSIONES[destino])}.")
+    if not isinstance(tamano, int) or not 0 < tamano <= settings.SUBIDAS_TAMANO_MAX:
+        raise ValueError(f"El archivo debe pesar como máximo {settings.SUBIDAS_TAMANO_MAX // (1024 * 1024)} MB.")
+
+    subida = SubidaArchivo(
+        destino=destino,
+        nombre_original=nombre[:255],
+        tamano=tamano,
+        creado_por=usuario if usuario and usuario.is_authenticated else None,
+        expira_en=timezone.now() + timedelta(seconds=settings.SUBIDAS_TTL),
+    )
+    subida.clave = f"{destino}/{subida.token}{extension}"
+    subida.save()
+    return subida
+
+
+def tomar_subida(token, usuario, destino):
+    """
+    Devuelve la SubidaArchivo 'token' del usuario si su archivo ya está en el
+    almacenamiento. Lanza ValueError si no.
+    """
+    subida = SubidaArchivo.objects.filter(
+        token=token,
+        destino=destino,
+        estado='esperando',
+        creado_por=usuario,
+    ).first()
+    if subida is None:
+        raise ValueError("La subida no existe o ya se usó.")
+
+    almacenamiento = obtener_destino()
+    if not almacenamiento.existe(subida.clave):
+        raise ValueError("El archivo no llegó al almacenamiento; vuelve a intentarlo.")
+    if almacenamiento.tamano(subida.clave) > min(subida.tamano, settings.SUBIDAS_TAMANO_MAX):
+        raise ValueError("El archivo supera el tamaño firmado.")
+    return subida
+
+
+def asignar_subida(subida, instancia):
+    """
+    Asocia la subida al documento o vehículo ya guardado, lo marca como
+    pendiente y encola su procesamiento.
+    """
+    _, campo_pendiente = CAMPOS[subida.destino]
+    setattr(subida, subida.destino, instancia)
+    subida.estado = 'subida'
+    subida.save(update_fields=[subida.destino, 'estado'])
+
+    setattr(instancia, campo_pendiente, True)
+    instancia.save(update_fields=[campo_pendiente])
+
+    if settings.SUBIDAS_LANZAR_WORKER:
+        transaction.on_commit(lambda: lanzar_worker('procesar_subidas'))
+
+
+# =========================
+# Worker
+# =========================
+
+def _limite_reclamo():
+    """
+    Una subida (o unas miniaturas) tomada antes de esto quedó huérfana: el
+    worker se cayó o lo mataron a mitad de camino.
+    """
+    return timezone.now() - timedelta(seconds=settings.SUBIDAS_RECLAMO_TIMEOUT)
+
+
+def recuperar_subidas_abandonadas():
+    """
+    Vuelve a encolar las subidas 'procesando' cuyo worker no terminó a
+    tiempo; las que ya agotaron SUBIDAS_INTENTOS quedan en 'error', con el
+    pendiente del registro limpio y la copia temporal borrada. Devuelve
+    cuántas subidas recuperó.
+    """
+    abandonadas = SubidaArchivo.objects.filter(
+        Q(reclamado_en__lt=_limite_reclamo()) | Q(reclamado_en__isnull=True),
+        estado='procesando',
+    )
+    agotadas = list(
+        abandonadas.filter(intentos__gte=settings.SUBIDAS_INTENTOS)
+        .select_related('documento', 'vehiculo')
+    )
+    if agotadas:
+        almacenamiento = obtener_destino()
+        for subida in agotadas:
+            instancia = getattr(subida, subida.destino)
+            _, campo_pendiente = CAMPOS[subida.destino]
+            type(instancia)._base_manager.filter(pk=instancia.pk).update(**{campo_pendiente: False})
+            almacenamiento.borrar(subida.clave)
+            subida.estado = 'error'
+            subida.error = "El worker dejó de responder; se agotaron los reintentos."
+            subida.terminado_en = timezone.now()
+            subida.save(update_fields=['estado', 'error', 'terminado_en'])
+
+    reencoladas = abandonadas.update(estado='subida', reclamado_en=None)
+    if agotadas or reencoladas:
+        logger.warning(
+            "Subidas abandonadas: %s reencoladas, %s con error", reencoladas, len(agotadas),
+        )
+    return reencoladas
+
+
+def reclamar_siguiente_subida():
+    """
+    Toma la subida pendiente más antigua marcándola 'procesando' (antes
+    recupera las abandonadas). Devuelve None si la cola está vacía.
+    """
+    recuperar_subidas_abandonadas()
+    for subida_id in (
+        SubidaArchivo.objects.filter(estado='subida')
+        .order_by('creado_en')
+        .values_list('id', flat=True)[:10]
+    ):
+        reclamada = SubidaArchivo.objects.filter(id=subida_id, estado='subida').update(
+            estado='procesando',
+            reclamado_en=timezone.now(),
+            intentos=F('intentos') + 1,
+        )
+        if reclamada:
+            return SubidaArchivo.objects.select_related('documento__tipo', 'vehiculo').get(id=subida_id)
+    return None
+
+
+def _validar_contenido(subida, archivo):
+    if subida.destino == 'documento':
+        if archivo.read(5) != b'%PDF-':
+            raise ValueError("El archivo no es un PDF.")
+    else:
+        try:
+            Image.open(archivo).verify()
+        except Exception:
+            raise ValueError("El archivo no es una imagen válida.")
+    archivo.seek(0)
+
+
+def finalizar_subida(subida):
+    """
+    Valida el archivo subido, lo guarda en el campo del modelo (ruta
+    definitiva según upload_to) y borra la copia temporal.
+    """
+    almacenamiento = obtener_destino()
+    instancia = getattr(subida, subida.destino)
+    campo_archivo, campo_pendiente = CAMPOS[subida.destino]
+
+    try:
+        with almacenamiento.abrir(subida.clave) as archivo:
+            _validar_contenido(subida, archivo)
+            if subida.destino == 'documento':
+                asignar_contenido(instancia, File(archivo), subida.nombre_original)
+            else:
+                getattr(instancia, campo_archivo).save(subida.nombre_original, File(archivo), save=False)
+    except Exception as exc:
+        logger.exception("Falló la subida %s", subida.pk)
+        subida.estado = 'error'
+        subida.error = str(exc)
+    else:
+        subida.estado = 'lista'
+
+    setattr(instancia, campo_pendiente, False)
+    campos = [campo_pendiente, 'actualizado_en']
+    if subida.estado == 'lista':
+        campos.append(campo_archivo)
+        if subida.destino == 'documento':
+            campos.append('contenido')
+    instancia.save(update_fields=campos)
+
+    if subida.estado == 'lista' and subida.destino == 'vehiculo':
+        generar_miniaturas(instancia)
+
+    almacenamiento.borrar(subida.clave)
+    subida.terminado_en = timezone.now()
+    subida.save(update_fields=['estado', 'error', 'terminado_en'])
+    return subida
+
+
+def limpiar_subidas_vencidas():
+    """
+    Borra las subidas que nunca se asociaron a un registro (el usuario no
+    envió el formulario) un día después de vencer su URL.
+    """
+    limite = timezone.now() - timedelta(days=1)
+    almacenamiento = obtener_destino()
+    vencidas = SubidaArchivo.objects.filter(estado='esperando', expira_en__lt=limite)
+    for clave in vencidas.values_list('clave', flat=True):
+        almacenamiento.borrar(clave)
+    return vencidas.delete()[0]
+
+
+# =========================
+# Miniaturas de fotos cambiadas fuera de la subida directa
+# =========================
+
+def encolar_miniaturas(vehiculo):
+    """
+    Marca el vehículo para que el worker regenere sus miniaturas cuando se
+    confirme la transacción. Mientras tanto las plantillas usan la foto
+    original (ver imagenes.miniaturas_vigentes).
+    """
+    # Soltar el reclamo hace que un worker que esté generando las de la foto
+    # anterior no borre la marca al terminar
+    Vehiculo.objects.filter(pk=vehiculo.pk).update(miniaturas_pendientes=True, miniaturas_reclamadas_en=None)
+    vehiculo.miniaturas_pendientes = True
+    if settings.SUBIDAS_LANZAR_WORKER:
+        transaction.on_commit(lambda: lanzar_worker('procesar_subidas'))
+
+
+def reclamar_siguiente_miniatura():
+    """
+    Toma un vehículo con miniaturas pendientes que nadie esté procesando (o
+    cuyo reclamo venció: el worker murió). La marca de pendiente se borra
+    solo al terminar (terminar_miniaturas).
+    """
+    libres = Q(miniaturas_reclamadas_en__isnull=True) | Q(miniaturas_reclamadas_en__lt=_limite_reclamo())
+    for vehiculo_id in (
+        Vehiculo.objects.filter(libres, miniaturas_pendientes=True)
+        .order_by('actualizado_en')
+        .values_list('id', flat=True)[:10]
+    ):
+        ahora = timezone.now()
+        if Vehiculo.objects.filter(libres, id=vehiculo_id, miniaturas_pendientes=True).update(
+            miniaturas_reclamadas_en=ahora,
+        ):
+            vehiculo = Vehiculo.objects.get(id=vehiculo_id)
+            vehiculo.miniaturas_reclamadas_en = ahora
+            return vehiculo
+    return None
+
+
+def terminar_miniaturas(vehiculo):
+    """
+    Borra la marca de pendiente si el reclamo sigue siendo de este worker.
+    Si la foto cambió mientras se generaban, encolar_miniaturas ya soltó el
+    reclamo y el vehículo se procesa otra vez.
+    """
+    return Vehiculo.objects.filter(
+        id=vehiculo.pk,
+        miniaturas_reclamadas_en=vehiculo.miniaturas_reclamadas_en,
+    ).update(miniaturas_pendientes=False, miniaturas_reclamadas_en=None)
+
+
+def procesar_miniaturas_pendientes(limite=None):
+    procesados = []
+    while limite is None or len(procesados) < limite:
+        vehiculo = reclamar_siguiente_miniatura()
+        if vehiculo is None:
+            break
+        generar_miniaturas(vehiculo)
+        terminar_miniaturas(vehiculo)
+        procesados.append(vehiculo)
+    return procesados
+
+
+def procesar_subidas_pendientes(limite=None):
+    procesadas = []
+    while limite is None or len(procesadas) < limite:
+        subida = reclamar_siguiente_subida()
+        if subida is None:
+            break
+        procesadas.append(finalizar_subida(subida))
+    return procesadas
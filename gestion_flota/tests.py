@@ -0,0 +1,1612 @@
+import csv
+import importlib
+import inspect
+import json
+import os
+import shutil
+import smtplib
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+
+from django.apps import apps as django_apps
+from django.contrib.auth.models import Group, User
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail import EmailMessage
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.mail.backends import locmem
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from gestion_flota import services, views
+from gestion_flota.busqueda import autocompletar_placas, buscar_vehiculos
+from gestion_flota.cambios import leer_cambios, publicar_cambios
+from gestion_flota.contenidos import borrar_huerfanos, buscar_huerfanos
+from gestion_flota.despacho import Despachador
+from gestion_flota.empresas import empresas_usuario, usar_empresa
+from gestion_flota.exportaciones import (
+    procesar_exportaciones_pendientes,
+    reclamar_siguiente,
+    solicitar_exportacion,
+)
+from gestion_flota.importacion import importar_archivo
+from gestion_flota.instrumentacion import (
+    Agregados,
+    Medicion,
+    iniciar_medicion,
+    instantaneas_procesos,
+    publicar_agregados,
+    resumen_requests,
+    terminar_medicion,
+)
+from gestion_flota.management.commands.explicar_consultas import consultas_calientes
+from gestion_flota.models import (
+    AlertaDocumento,
+    ArchivoContenido,
+    CambioFlota,
+    CorreoFallido,
+    DocumentoVehiculo,
+    EjecucionAlertas,
+    EjecucionTarea,
+    Empresa,
+    ExportacionJob,
+    SecuenciaCambios,
+    SubidaArchivo,
+    TipoDocumento,
+    Vehiculo,
+)
+from gestion_flota.paginacion import codificar_cursor, paginar_por_cursor
+from gestion_flota.permissions import ROLE_OPERADOR, user_is_operador
+from gestion_flota.programador import Tarea, purgar_ejecuciones, turnos_pendientes
+from gestion_flota.services import (
+    contar_documentos_por_estado,
+    detectar_alertas,
+    enviar_alerta_documentos,
+    enviar_alertas_incrementales,
+    registrar_fallido,
+)
+from gestion_flota.subidas import (
+    obtener_destino,
+    procesar_miniaturas_pendientes,
+    procesar_subidas_pendientes,
+    reclamar_siguiente_miniatura,
+    reclamar_siguiente_subida,
+    terminar_miniaturas,
+)
+from gestion_flota.xlsx import escribir_xlsx
+
+
+def crear_empresa_y_usuario(username='operador'):
+    empresa, _ = Empresa.objects.get_or_create(slug='principal', defaults={'nombre': 'Principal'})
+    usuario = User.objects.create_superuser(username, f'{username}@example.com', 'clave')
+    empresa.usuarios.add(usuario)
+    return empresa, usuario
+
+
+# =========================
+# Estado de documentos anotado en SQL (listado y detalle de vehículos)
+# =========================
+
+# Listado: sesión, usuario, sus empresas (con la caché local de los tests
+# no se guardan entre requests) y una página de vehículos con su estado
+# anotado
+CONSULTAS_LISTADO = 4
+# Detalle: sesión, usuario (dos veces: la vista async lo pide con
+# request.auser()), sus empresas, el vehículo con su estado y sus documentos
+CONSULTAS_DETALLE = 6
+
+
+class ConsultasVehiculosTests(TestCase):
+    """
+    El listado y el detalle cuestan un número fijo de consultas, sin
+    importar cuántos vehículos y documentos tenga la flota.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.empresa, usuario = crear_empresa_y_usuario()
+        with usar_empresa(self.empresa):
+            self.tipos = [
+                TipoDocumento.objects.create(nombre=nombre, empresa=self.empresa)
+                for nombre in ('SOAT', 'Tecnomecánica', 'Seguro')
+            ]
+        self.client.force_login(usuario)
+        self.creados = 0
+
+    def sembrar(self, cantidad):
+        """
+        Agrega 'cantidad' vehículos con documentos vencidos, próximos y
+        vigentes (algunos sin documentos).
+        """
+        hoy = date.today()
+        with usar_empresa(self.empresa):
+            for _ in range(cantidad):
+                numero = self.creados
+                self.creados += 1
+                vehiculo = Vehiculo.objects.create(
+                    placa=f'T{numero:05d}', marca='Marca', modelo='Modelo', empresa=self.empresa,
+                )
+                for posicion, tipo in enumerate(self.tipos[:numero % 4]):
+                    DocumentoVehiculo.objects.create(
+                        vehiculo=vehiculo,
+                        tipo=tipo,
+                        empresa=self.empresa,
+                        fecha_vencimiento=hoy + timedelta(days=(posicion - 1) * 20),
+                    )
+        return vehiculo
+
+    def pedir(self, url, consultas):
+        # Primera visita: llena las cachés (roles, empresas, rollover)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        with self.assertNumQueries(consultas):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_listado_consultas_constantes(self):
+        self.sembrar(5)
+        self.pedir(reverse('vehiculo_list'), CONSULTAS_LISTADO)
+        self.sembrar(45)
+        self.pedir(reverse('vehiculo_list'), CONSULTAS_LISTADO)
+
+    def test_detalle_consultas_constantes(self):
+        vehiculo = self.sembrar(4)
+        url = reverse('vehiculo_detail', args=[vehiculo.pk])
+        self.pedir(url, CONSULTAS_DETALLE)
+        self.sembrar(36)
+        self.pedir(url, CONSULTAS_DETALLE)
+
+
+# =========================
+# Exportaciones: trabajos abandonados por un worker caído
+# =========================
+
+@override_settings(EXPORTACIONES_LANZAR_WORKER=False, EXPORTACIONES_RECLAMO_TIMEOUT=300, EXPORTACIONES_INTENTOS=2)
+class ExportacionesAbandonadasTests(TestCase):
+
+    def setUp(self):
+        self.empresa, _ = crear_empresa_y_usuario()
+
+    def abandonar(self, job):
+        # Como si el worker hubiera muerto hace diez minutos
+        hace_rato = timezone.now() - timedelta(minutes=10)
+        ExportacionJob.objects.filter(pk=job.pk).update(reclamado_en=hace_rato, iniciado_en=hace_rato)
+
+    def test_no_reutiliza_ni_bloquea_un_trabajo_abandonado(self):
+        with usar_empresa(self.empresa):
+            job = solicitar_exportacion('vehiculos')
+            self.assertEqual(solicitar_exportacion('vehiculos'), job)
+
+            self.assertEqual(reclamar_siguiente(), job)
+            self.assertEqual(solicitar_exportacion('vehiculos'), job)
+
+            self.abandonar(job)
+            nuevo = solicitar_exportacion('vehiculos')
+        self.assertNotEqual(nuevo, job)
+
+    def test_reencola_y_luego_falla(self):
+        with usar_empresa(self.empresa):
+            job = solicitar_exportacion('vehiculos')
+
+        self.assertEqual(reclamar_siguiente(), job)
+        self.abandonar(job)
+        self.assertEqual(reclamar_siguiente(), job)
+        job.refresh_from_db()
+        self.assertEqual((job.estado, job.intentos), ('procesando', 2))
+
+        self.abandonar(job)
+        self.assertIsNone(reclamar_siguiente())
+        job.refresh_from_db()
+        self.assertEqual(job.estado, 'error')
+
+
+@override_settings(EXPORTACIONES_LANZAR_WORKER=False)
+class ExportacionesCompartidasTests(TestCase):
+    """
+    Una exportación idéntica pedida por dos usuarios de la misma empresa se
+    genera una vez y ambos pueden ver su estado y descargarla.
+    """
+
+    def setUp(self):
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta, ignore_errors=True)
+        ajustes = override_settings(EXPORTACIONES_ROOT=carpeta)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        cache.clear()
+        self.empresa, _ = Empresa.objects.get_or_create(slug='principal', defaults={'nombre': 'Principal'})
+        self.otra = Empresa.objects.create(slug='otra', nombre='Otra')
+        self.usuarios = {}
+        for nombre, empresa in (('ana', self.empresa), ('beto', self.empresa), ('carla', self.otra)):
+            usuario = User.objects.create_user(nombre, f'{nombre}@example.com', 'clave')
+            empresa.usuarios.add(usuario)
+            self.usuarios[nombre] = usuario
+
+    def pedir_exportacion(self, nombre):
+        self.client.force_login(self.usuarios[nombre])
+        respuesta = self.client.get(reverse('vehiculo_export_csv'), {'diferido': '1'})
+        self.assertEqual(respuesta.status_code, 302)
+        return respuesta['Location']
+
+    def test_dos_usuarios_comparten_el_trabajo(self):
+        estado = self.pedir_exportacion('ana')
+        self.assertEqual(self.pedir_exportacion('beto'), estado)
+        self.assertEqual(ExportacionJob.objects.count(), 1)
+
+        procesar_exportaciones_pendientes()
+        for nombre in ('ana', 'beto'):
+            self.client.force_login(self.usuarios[nombre])
+            datos = self.client.get(estado, HTTP_ACCEPT='application/json').json()
+            self.assertEqual(datos['estado'], 'listo')
+            descarga = self.client.get(datos['descarga'])
+            self.assertEqual(descarga.status_code, 200)
+            b''.join(descarga.streaming_content)
+
+        # De otra empresa: el trabajo ni siquiera existe para ella
+        self.client.force_login(self.usuarios['carla'])
+        self.assertEqual(self.client.get(estado).status_code, 404)
+        self.assertEqual(self.client.get(datos['descarga']).status_code, 404)
+
+
+# =========================
+# Despacho de correos: reintentos, límite de envío y cola de fallidos
+# =========================
+
+class BackendIntermitente(locmem.EmailBackend):
+    """
+    Backend locmem que falla las primeras 'fallos' veces por destinatario
+    (como un SMTP que corta la conexión); fallos=None falla siempre.
+    """
+    fallos = 1
+    error = smtplib.SMTPServerDisconnected
+    intentos = Counter()
+
+    def send_messages(self, messages):
+        for mensaje in messages:
+            destinatario = mensaje.to[0]
+            BackendIntermitente.intentos[destinatario] += 1
+            if self.fallos is None or BackendIntermitente.intentos[destinatario] <= self.fallos:
+                raise self.error("conexión cerrada")
+        return super().send_messages(messages)
+
+
+def _mensajes(cantidad):
+    return [
+        EmailMessage(subject=f"Alerta {n}", body="...", from_email="flota@example.com", to=[f"r{n}@example.com"])
+        for n in range(cantidad)
+    ]
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class DespachadorTests(TestCase):
+    BACKEND_INTERMITENTE = f'{__name__}.BackendIntermitente'
+
+    def setUp(self):
+        BackendIntermitente.intentos = Counter()
+        BackendIntermitente.fallos = 1
+        BackendIntermitente.error = smtplib.SMTPServerDisconnected
+
+    def test_envia_todos_con_el_backend_locmem(self):
+        enviados = []
+        resultado = Despachador(concurrencia=3, max_por_segundo=0).enviar(_mensajes(7), al_enviar=enviados.append)
+        self.assertEqual(resultado.enviados, 7)
+        self.assertEqual(len(mail.outbox), 7)
+        self.assertEqual(len(enviados), 7)
+        self.assertEqual(resultado.fallidos, [])
+
+    def test_reintenta_con_backoff_exponencial(self):
+        BackendIntermitente.fallos = 2
+        despachador = Despachador(
+            concurrencia=1, reintentos=3, backoff=0.5, max_por_segundo=0, backend=self.BACKEND_INTERMITENTE,
+        )
+        with mock.patch('gestion_flota.despacho.time.sleep') as dormir:
+            resultado = despachador.enviar(_mensajes(1))
+        self.assertEqual(resultado.enviados, 1)
+        self.assertEqual(BackendIntermitente.intentos['r0@example.com'], 3)
+        self.assertEqual([llamada.args[0] for llamada in dormir.call_args_list], [0.5, 1.0])
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_error_permanente_no_se_reintenta(self):
+        BackendIntermitente.fallos = None
+        BackendIntermitente.error = smtplib.SMTPRecipientsRefused
+        despachador = Despachador(concurrencia=1, reintentos=3, backoff=0, max_por_segundo=0,
+                                  backend=self.BACKEND_INTERMITENTE)
+        resultado = despachador.enviar(_mensajes(1))
+        self.assertEqual(resultado.enviados, 0)
+        self.assertEqual([intentos for _, _, intentos in resultado.fallidos], [1])
+
+    def test_agotados_los_reintentos_va_a_correo_fallido(self):
+        BackendIntermitente.fallos = None
+        despachador = Despachador(concurrencia=2, reintentos=2, backoff=0, max_por_segundo=0,
+                                  backend=self.BACKEND_INTERMITENTE)
+        resultado = despachador.enviar(_mensajes(2), al_fallar=registrar_fallido)
+        self.assertEqual(resultado.enviados, 0)
+        fallidos = CorreoFallido.objects.order_by('destinatarios')
+        self.assertEqual(
+            [(f.destinatarios, f.intentos) for f in fallidos],
+            [('r0@example.com', 3), ('r1@example.com', 3)],
+        )
+        self.assertIn("conexión cerrada", fallidos[0].error)
+
+    def test_respeta_el_limite_de_mensajes_por_segundo(self):
+        inicio = time.monotonic()
+        resultado = Despachador(concurrencia=4, max_por_segundo=20).enviar(_mensajes(6))
+        # Seis mensajes a 20/s: al menos cinco intervalos de 50 ms entre el primero y el último
+        self.assertGreaterEqual(time.monotonic() - inicio, 0.25)
+        self.assertEqual(resultado.enviados, 6)
+
+
+# =========================
+# Programador: minutos saltados por una tarea larga e historial
+# =========================
+
+class ProgramadorTests(TestCase):
+
+    def test_recupera_los_minutos_cubiertos_por_una_tarea_larga(self):
+        alertas = Tarea('alertas', {'cron': '0 7 * * *', 'funcion': 'builtins.print'})
+        exportaciones = Tarea('exportaciones', {'cron': '* * * * *', 'funcion': 'builtins.print'})
+        semanal = Tarea('semanal', {'cron': '0 7 * * 0', 'funcion': 'builtins.print'})
+        # Miércoles: la vuelta de las 6:58 terminó a las 7:03
+        desde = datetime(2026, 10, 14, 6, 58)
+        hasta = datetime(2026, 10, 14, 7, 3)
+
+        pendientes = turnos_pendientes([alertas, exportaciones, semanal], desde, hasta)
+
+        self.assertEqual(
+            [(tarea.nombre, minuto.strftime('%H:%M')) for tarea, minuto in pendientes],
+            [('alertas', '07:00'), ('exportaciones', '07:03')],
+        )
+        # La vuelta siguiente no repite las 7:00
+        self.assertEqual(
+            [tarea.nombre for tarea, _ in turnos_pendientes([alertas], hasta, hasta + timedelta(minutes=1))],
+            [],
+        )
+
+    def test_purga_el_historial_viejo(self):
+        viejo = EjecucionTarea.objects.create(
+            nombre='exportaciones', programada_para=timezone.now() - timedelta(days=30), propietario='nodo',
+        )
+        EjecucionTarea.objects.filter(pk=viejo.pk).update(iniciado_en=timezone.now() - timedelta(days=30))
+        reciente = EjecucionTarea.objects.create(
+            nombre='exportaciones', programada_para=timezone.now(), propietario='nodo',
+        )
+
+        purgar_ejecuciones(dias=14)
+
+        self.assertEqual(list(EjecucionTarea.objects.values_list('pk', flat=True)), [reciente.pk])
+
+
+# =========================
+# Roles y empresas: una revocación vale de inmediato en todos los procesos
+# =========================
+
+class RolesTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = User.objects.create_user('chofer', 'chofer@example.com', 'clave')
+        self.grupo = Group.objects.create(name=ROLE_OPERADOR)
+        self.usuario.groups.add(self.grupo)
+
+    def revocar_en_otro_proceso(self):
+        # Sin señales: como si el admin lo hubiera quitado desde otro worker
+        User.groups.through.objects.filter(user=self.usuario, group=self.grupo).delete()
+
+    def test_con_cache_local_no_se_guardan_entre_requests(self):
+        self.assertTrue(user_is_operador(User.objects.get(pk=self.usuario.pk)))
+        self.revocar_en_otro_proceso()
+        self.assertFalse(user_is_operador(User.objects.get(pk=self.usuario.pk)))
+
+    def test_con_cache_compartida_se_invalidan_con_senales(self):
+        with mock.patch('gestion_flota.permissions.cache_compartida', return_value=True):
+            self.assertTrue(user_is_operador(User.objects.get(pk=self.usuario.pk)))
+            # Otro request del mismo usuario: los roles salen de la caché
+            with self.assertNumQueries(0):
+                self.assertTrue(user_is_operador(User(pk=self.usuario.pk)))
+            self.usuario.groups.remove(self.grupo)
+            self.assertFalse(user_is_operador(User.objects.get(pk=self.usuario.pk)))
+
+
+class EmpresasUsuarioTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.empresa, self.usuario = crear_empresa_y_usuario()
+
+    def quitar_en_otro_proceso(self):
+        # Sin señales: como si el admin lo hubiera quitado desde otro worker
+        Empresa.usuarios.through.objects.filter(user=self.usuario, empresa=self.empresa).delete()
+
+    def test_con_cache_local_no_se_guardan_entre_requests(self):
+        self.assertEqual(empresas_usuario(User.objects.get(pk=self.usuario.pk)), (self.empresa.pk,))
+        self.quitar_en_otro_proceso()
+        self.assertEqual(empresas_usuario(User.objects.get(pk=self.usuario.pk)), ())
+
+    def test_con_cache_compartida_se_invalidan_con_senales(self):
+        with mock.patch('gestion_flota.empresas.cache_compartida', return_value=True):
+            self.assertEqual(empresas_usuario(User.objects.get(pk=self.usuario.pk)), (self.empresa.pk,))
+            with self.assertNumQueries(0):
+                self.assertEqual(empresas_usuario(User(pk=self.usuario.pk)), (self.empresa.pk,))
+            self.empresa.usuarios.remove(self.usuario)
+            self.assertEqual(empresas_usuario(User.objects.get(pk=self.usuario.pk)), ())
+
+
+# =========================
+# Dashboard: ventana de "próximos a vencer"
+# =========================
+
+class DashboardTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.empresa, usuario = crear_empresa_y_usuario()
+        self.client.force_login(usuario)
+
+    def test_la_ventana_sale_de_los_tipos_de_documento(self):
+        with usar_empresa(self.empresa):
+            tipo = TipoDocumento.objects.create(nombre='SOAT', dias_alerta=30, empresa=self.empresa)
+        self.assertContains(self.client.get(reverse('dashboard')), 'Próximos a vencer (30 días)')
+
+        with usar_empresa(self.empresa):
+            TipoDocumento.objects.create(nombre='Extintor', dias_alerta=7, empresa=self.empresa)
+            tipo.dias_alerta = 60
+            tipo.save()
+        self.assertContains(self.client.get(reverse('dashboard')), 'Próximos a vencer (7–60 días)')
+
+
+# =========================
+# Placas normalizadas (autocompletado por rango)
+# =========================
+
+class PlacasTests(TestCase):
+
+    def setUp(self):
+        self.empresa, _ = crear_empresa_y_usuario()
+
+    def crear(self, placa):
+        with usar_empresa(self.empresa):
+            return Vehiculo.objects.create(placa=placa, marca='Marca', modelo='Modelo')
+
+    def test_se_guardan_normalizadas_venga_de_donde_venga(self):
+        vehiculo = self.crear(' abc 123 ')
+        vehiculo.refresh_from_db()
+        self.assertEqual(vehiculo.placa, 'ABC123')
+        with usar_empresa(self.empresa):
+            self.assertEqual([v['placa'] for v in autocompletar_placas('ab')], ['ABC123'])
+
+    def test_la_unicidad_compara_la_placa_normalizada(self):
+        self.crear('ABC123')
+        with usar_empresa(self.empresa), self.assertRaises(ValidationError):
+            Vehiculo(placa='abc 123', marca='Otra', modelo='Otro', empresa=self.empresa).full_clean()
+
+    def test_migracion_normaliza_las_placas_existentes(self):
+        viejo = self.crear('OLD1')
+        duplicado = self.crear('XYZ9')
+        conflicto = self.crear('XYZ 8')
+        # Placas guardadas antes de normalizar (sin pasar por save())
+        Vehiculo._base_manager.filter(pk=viejo.pk).update(placa='old 1')
+        Vehiculo._base_manager.filter(pk=conflicto.pk).update(placa='xyz9')
+
+        migracion = importlib.import_module('gestion_flota.migrations.0019_normalizar_placas')
+        # SQLite no abre un schema editor dentro de la transacción del test;
+        # la migración solo usa su conexión y execute()
+        schema_editor = SimpleNamespace(
+            connection=connection,
+            execute=lambda sql, params=(): connection.cursor().execute(sql, params),
+        )
+        migracion.normalizar_placas(django_apps, schema_editor)
+
+        placas = dict(Vehiculo._base_manager.values_list('pk', 'placa'))
+        self.assertEqual(placas[viejo.pk], 'OLD1')
+        self.assertEqual(placas[duplicado.pk], 'XYZ9')
+        # Se normalizaría a una placa que ya existe: queda para revisar a mano
+        self.assertEqual(placas[conflicto.pk], 'xyz9')
+
+
+# =========================
+# Subidas directas (DestinoLocal)
+# =========================
+
+PDF = b'%PDF-1.4\n%prueba\n'
+
+
+class SubidasTests(TestCase):
+    """
+    Firma → PUT al receptor local → formulario con el token → worker
+    procesar_subidas.
+    """
+
+    def setUp(self):
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta, ignore_errors=True)
+        ajustes = override_settings(
+            SUBIDAS_ROOT=os.path.join(carpeta, 'subidas'),
+            MEDIA_ROOT=os.path.join(carpeta, 'media'),
+            SUBIDAS_LANZAR_WORKER=False,
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        cache.clear()
+        self.empresa, usuario = crear_empresa_y_usuario()
+        with usar_empresa(self.empresa):
+            self.tipo = TipoDocumento.objects.create(nombre='SOAT', empresa=self.empresa)
+            self.vehiculo = Vehiculo.objects.create(placa='SUB123', marca='Marca', modelo='Modelo')
+        self.client.force_login(usuario)
+
+    def firmar(self, tamano, nombre='soat.pdf'):
+        respuesta = self.client.post(
+            reverse('subida_firmar'),
+            data=json.dumps({'destino': 'documento', 'nombre': nombre, 'tamano': tamano}),
+            content_type='application/json',
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def subir(self, contenido):
+        firma = self.firmar(len(contenido))
+        respuesta = self.client.put(firma['url'], data=contenido, content_type='application/octet-stream')
+        self.assertEqual(respuesta.status_code, 204)
+
+        respuesta = self.client.post(reverse('documento_create', args=[self.vehiculo.pk]), {
+            'tipo': self.tipo.pk,
+            'fecha_vencimiento': (date.today() + timedelta(days=200)).isoformat(),
+            'subida': firma['token'],
+        })
+        self.assertEqual(respuesta.status_code, 302)
+        subida = SubidaArchivo.objects.get(token=firma['token'])
+        self.assertEqual(subida.estado, 'subida')
+        self.assertTrue(subida.documento.archivo_pendiente)
+
+        call_command('procesar_subidas', '--una-vez', stdout=StringIO())
+        subida.refresh_from_db()
+        return subida
+
+    def test_pdf_valido_queda_listo(self):
+        subida = self.subir(PDF)
+        self.assertEqual(subida.estado, 'lista')
+        documento = DocumentoVehiculo._base_manager.get(pk=subida.documento_id)
+        self.assertFalse(documento.archivo_pendiente)
+        with documento.archivo.open('rb') as archivo:
+            self.assertEqual(archivo.read(), PDF)
+        # La copia temporal se borra
+        self.assertFalse(obtener_destino().existe(subida.clave))
+
+    def test_archivo_que_no_es_pdf_queda_en_error(self):
+        with self.assertLogs('gestion_flota.subidas', 'ERROR'):
+            subida = self.subir(b'no soy un pdf')
+        self.assertEqual(subida.estado, 'error')
+        self.assertEqual(subida.error, "El archivo no es un PDF.")
+        documento = DocumentoVehiculo._base_manager.get(pk=subida.documento_id)
+        self.assertFalse(documento.archivo_pendiente)
+        self.assertFalse(documento.archivo)
+
+    def test_cuerpo_mayor_al_firmado_se_rechaza(self):
+        firma = self.firmar(len(PDF))
+        respuesta = self.client.put(firma['url'], data=PDF + b'extra', content_type='application/octet-stream')
+        self.assertEqual(respuesta.status_code, 413)
+        subida = SubidaArchivo.objects.get(token=firma['token'])
+        self.assertFalse(obtener_destino().existe(subida.clave))
+
+    def asignar(self, contenido):
+        firma = self.firmar(len(contenido))
+        self.client.put(firma['url'], data=contenido, content_type='application/octet-stream')
+        self.client.post(reverse('documento_create', args=[self.vehiculo.pk]), {
+            'tipo': self.tipo.pk,
+            'fecha_vencimiento': (date.today() + timedelta(days=200)).isoformat(),
+            'subida': firma['token'],
+        })
+        return SubidaArchivo.objects.get(token=firma['token'])
+
+    def abandonar(self, subida):
+        # Como si el worker hubiera muerto tras reclamarla hace diez minutos
+        SubidaArchivo.objects.filter(pk=subida.pk).update(reclamado_en=timezone.now() - timedelta(minutes=10))
+
+    @override_settings(SUBIDAS_RECLAMO_TIMEOUT=300, SUBIDAS_INTENTOS=2)
+    def test_subida_abandonada_se_reintenta(self):
+        subida = self.asignar(PDF)
+        self.assertEqual(reclamar_siguiente_subida(), subida)
+        # Con el worker vivo nadie más la toma
+        self.assertIsNone(reclamar_siguiente_subida())
+
+        self.abandonar(subida)
+        with self.assertLogs('gestion_flota.subidas', 'WARNING'):
+            procesar_subidas_pendientes()
+        subida.refresh_from_db()
+        self.assertEqual((subida.estado, subida.intentos), ('lista', 2))
+        self.assertFalse(DocumentoVehiculo._base_manager.get(pk=subida.documento_id).archivo_pendiente)
+        self.assertFalse(obtener_destino().existe(subida.clave))
+
+    @override_settings(SUBIDAS_RECLAMO_TIMEOUT=300, SUBIDAS_INTENTOS=2)
+    def test_subida_abandonada_agota_los_intentos(self):
+        subida = self.asignar(PDF)
+        self.assertEqual(reclamar_siguiente_subida(), subida)
+        self.abandonar(subida)
+        with self.assertLogs('gestion_flota.subidas', 'WARNING'):
+            self.assertEqual(reclamar_siguiente_subida(), subida)
+        self.abandonar(subida)
+        with self.assertLogs('gestion_flota.subidas', 'WARNING'):
+            self.assertIsNone(reclamar_siguiente_subida())
+
+        subida.refresh_from_db()
+        self.assertEqual(subida.estado, 'error')
+        self.assertFalse(DocumentoVehiculo._base_manager.get(pk=subida.documento_id).archivo_pendiente)
+        self.assertFalse(obtener_destino().existe(subida.clave))
+
+    def test_guardar_corta_al_pasar_el_limite(self):
+        # El receptor no se fía del Content-Length: corta mientras escribe
+        destino = obtener_destino()
+        bloques = iter([b'a' * 10, b'b' * 10, b'c' * 10])
+        with self.assertRaises(ValueError):
+            destino.guardar('documento/grande.pdf', bloques, 15)
+        self.assertFalse(destino.existe('documento/grande.pdf'))
+        # No sigue leyendo el cuerpo después de pasarse
+        self.assertEqual(next(bloques), b'c' * 10)
+        self.assertEqual(destino.guardar('documento/justo.pdf', iter([b'a' * 15]), 15), 15)
+
+
+# =========================
+# Miniaturas generadas por el worker, no en el request
+# =========================
+
+def imagen_png(ancho=800, alto=600, color='red'):
+    buffer = BytesIO()
+    Image.new('RGB', (ancho, alto), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@mock.patch('gestion_flota.subidas.lanzar_worker')
+class MiniaturasTests(TestCase):
+
+    def setUp(self):
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=carpeta, SUBIDAS_LANZAR_WORKER=True)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        cache.clear()
+        self.empresa, usuario = crear_empresa_y_usuario()
+        self.client.force_login(usuario)
+
+    def crear_con_foto(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post(reverse('vehiculo_create'), {
+                'placa': 'FOT123',
+                'marca': 'Marca',
+                'modelo': 'Modelo',
+                'activo': 'on',
+                'foto': SimpleUploadedFile('foto.png', imagen_png(), content_type='image/png'),
+            })
+        self.assertEqual(respuesta.status_code, 302)
+        return Vehiculo.objects.get(placa='FOT123')
+
+    def test_el_formulario_encola_y_muestra_la_original(self, lanzar_worker):
+        vehiculo = self.crear_con_foto()
+        lanzar_worker.assert_called_once_with('procesar_subidas')
+        self.assertTrue(vehiculo.miniaturas_pendientes)
+        self.assertEqual(vehiculo.miniaturas, {})
+        self.assertEqual(vehiculo.foto_miniatura_url, vehiculo.foto.url)
+
+        call_command('procesar_subidas', '--una-vez', stdout=StringIO())
+        vehiculo.refresh_from_db()
+        self.assertFalse(vehiculo.miniaturas_pendientes)
+        self.assertEqual(vehiculo.miniaturas['origen'], vehiculo.foto.name)
+        self.assertTrue(vehiculo.foto_miniatura_url.endswith('-320.jpg'))
+        self.assertIn('640w', vehiculo.foto_srcset_webp)
+
+    def test_foto_nueva_no_usa_las_miniaturas_de_la_anterior(self, lanzar_worker):
+        vehiculo = self.crear_con_foto()
+        call_command('procesar_subidas', '--una-vez', stdout=StringIO())
+        vehiculo.refresh_from_db()
+
+        vehiculo.foto = SimpleUploadedFile('otra.png', imagen_png(color='blue'), content_type='image/png')
+        vehiculo.save()
+        vehiculo.refresh_from_db()
+        self.assertTrue(vehiculo.miniaturas_pendientes)
+        self.assertEqual(vehiculo.foto_miniatura_url, vehiculo.foto.url)
+        self.assertEqual(vehiculo.foto_srcset_webp, '')
+        self.assertEqual(vehiculo.miniaturas_foto, {})
+
+        call_command('procesar_subidas', '--una-vez', stdout=StringIO())
+        vehiculo.refresh_from_db()
+        self.assertEqual(vehiculo.miniaturas['origen'], vehiculo.foto.name)
+
+    @override_settings(SUBIDAS_RECLAMO_TIMEOUT=300)
+    def test_un_worker_caido_no_pierde_las_miniaturas(self, lanzar_worker):
+        vehiculo = self.crear_con_foto()
+        # El worker la toma y muere antes de generarlas
+        self.assertEqual(reclamar_siguiente_miniatura(), vehiculo)
+        vehiculo.refresh_from_db()
+        self.assertTrue(vehiculo.miniaturas_pendientes)
+        self.assertIsNone(reclamar_siguiente_miniatura())
+
+        Vehiculo.objects.filter(pk=vehiculo.pk).update(
+            miniaturas_reclamadas_en=timezone.now() - timedelta(minutes=10),
+        )
+        self.assertEqual(procesar_miniaturas_pendientes(), [vehiculo])
+        vehiculo.refresh_from_db()
+        self.assertFalse(vehiculo.miniaturas_pendientes)
+        self.assertEqual(vehiculo.miniaturas['origen'], vehiculo.foto.name)
+
+    def test_foto_cambiada_mientras_se_generan(self, lanzar_worker):
+        vehiculo = self.crear_con_foto()
+        reclamado = reclamar_siguiente_miniatura()
+        vehiculo.foto = SimpleUploadedFile('otra.png', imagen_png(color='blue'), content_type='image/png')
+        vehiculo.save()
+
+        self.assertEqual(terminar_miniaturas(reclamado), 0)
+        vehiculo.refresh_from_db()
+        self.assertTrue(vehiculo.miniaturas_pendientes)
+        self.assertEqual(procesar_miniaturas_pendientes(), [vehiculo])
+
+
+# =========================
+# Registro de cambios: secuencia en orden de confirmación
+# =========================
+
+class CambiosTests(TestCase):
+
+    def setUp(self):
+        self.empresa, _ = crear_empresa_y_usuario()
+
+    def crear(self, placa):
+        with usar_empresa(self.empresa):
+            return Vehiculo.objects.create(placa=placa, marca='Marca', modelo='Modelo')
+
+    def leer(self, desde):
+        with usar_empresa(self.empresa):
+            filas, _ = leer_cambios(desde, 100)
+        return filas
+
+    def test_evento_confirmado_tarde_no_se_pierde(self):
+        primero = self.crear('AAA111')
+        self.crear('BBB222')
+        # El evento de 'primero' se insertó antes pero se confirma después
+        # (una importación larga): mientras tanto el cliente no lo ve
+        tardio = CambioFlota.objects.get(objeto_id=primero.pk, modelo='vehiculo')
+        tardio_id = tardio.id
+        tardio.delete()
+
+        filas = self.leer(0)
+        self.assertEqual([fila[2] for fila in filas], [Vehiculo.objects.get(placa='BBB222').pk])
+        ultimo = filas[-1][0]
+
+        tardio.id, tardio.secuencia = tardio_id, None
+        tardio.save()
+        filas = self.leer(ultimo)
+        self.assertEqual([(fila[2], fila[3]) for fila in filas], [(primero.pk, 'crear')])
+        self.assertGreater(filas[0][0], ultimo)
+        self.assertLess(tardio_id, CambioFlota.objects.get(secuencia=ultimo).id)
+
+    def test_publicar_numera_una_sola_vez(self):
+        self.crear('CCC333')
+        self.assertEqual(publicar_cambios(), 1)
+        self.assertEqual(publicar_cambios(), 0)
+        cambio = CambioFlota.objects.get()
+        self.assertEqual(SecuenciaCambios.objects.get(pk=1).ultima, cambio.secuencia)
+        self.assertEqual(self.leer(cambio.secuencia), [])
+
+
+# =========================
+# Adquisición de la conexión medida sin forzarla
+# =========================
+
+class ConexionBDTests(TestCase):
+
+    def test_request_sin_consultas_no_pide_conexion(self):
+        with mock.patch.object(connections[DEFAULT_DB_ALIAS], 'ensure_connection') as ensure_connection:
+            respuesta = self.client.get(reverse('login'))
+        self.assertEqual(respuesta.status_code, 200)
+        ensure_connection.assert_not_called()
+        self.assertIn('db-conexion;dur=0.00', respuesta['Server-Timing'])
+
+    def test_mide_la_conexion_que_abre_la_primera_consulta(self):
+        alias = 'flota_prueba_conexion'
+        conexion = connections.create_connection(DEFAULT_DB_ALIAS)
+        conexion.alias = alias
+        conexion.settings_dict = {**conexion.settings_dict, 'NAME': ':memory:'}
+        self.addCleanup(conexion.close)
+
+        medicion = iniciar_medicion()
+        try:
+            with conexion.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        finally:
+            terminar_medicion()
+        self.assertGreater(medicion.tiempo_conexion, 0)
+
+
+# =========================
+# Agregados de instrumentación por proceso
+# =========================
+
+class InstrumentacionProcesosTests(TestCase):
+
+    def publicar_como(self, proceso):
+        with mock.patch('gestion_flota.instrumentacion._proceso', return_value=proceso):
+            publicar_agregados(forzar=True)
+
+    def test_cada_proceso_ocupa_su_ranura(self):
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta, ignore_errors=True)
+        compartida = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': carpeta}}
+        with override_settings(CACHES=compartida), mock.patch('gestion_flota.instrumentacion._ranura', None):
+            self.publicar_como('web:1')
+            self.publicar_como('web:2')
+            # El mismo proceso renueva su ranura en vez de ocupar otra
+            self.publicar_como('web:2')
+            self.assertIsNone(cache.get('flota:instrumentacion:ranura:2'))
+            with mock.patch('gestion_flota.instrumentacion._proceso', return_value='web:3'):
+                procesos = instantaneas_procesos()
+                resumen = resumen_requests()
+
+        self.assertEqual(sorted(procesos), ['web:1', 'web:2', 'web:3'])
+        self.assertEqual(resumen['procesos'], 3)
+        self.assertTrue(resumen['cache_compartida'])
+        self.assertNotIn('aviso', resumen)
+
+    def test_cache_local_avisa_que_solo_ve_este_proceso(self):
+        _, usuario = crear_empresa_y_usuario()
+        self.client.force_login(usuario)
+        self.publicar_como('web:1')
+
+        datos = self.client.get(reverse('diagnostico_requests')).json()
+        self.assertEqual(datos['procesos'], 1)
+        self.assertFalse(datos['cache_compartida'])
+        self.assertIn('REDIS_URL', datos['aviso'])
+
+
+# =========================
+# /metrics: contadores por proceso
+# =========================
+
+def agregados_con(vista, requests):
+    agregados = Agregados()
+    for _ in range(requests):
+        agregados.registrar(vista, 0.01, Medicion(consultas=2))
+    agregados.registrar_cache('conteos', True)
+    return agregados
+
+
+@override_settings(METRICAS_TOKEN='secreto')
+class MetricasProcesosTests(TestCase):
+
+    def raspar(self, proceso, agregados):
+        with mock.patch('gestion_flota.instrumentacion._proceso', return_value=proceso), \
+                mock.patch('gestion_flota.instrumentacion.agregados', agregados):
+            respuesta = self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.content.decode().splitlines()
+
+    def test_cada_proceso_con_su_etiqueta_sin_sumar(self):
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta, ignore_errors=True)
+        compartida = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': carpeta}}
+        with override_settings(CACHES=compartida), mock.patch('gestion_flota.instrumentacion._ranura', None):
+            self.raspar('web:1', agregados_con('vehiculo_list', 2))
+            lineas = self.raspar('web:2', agregados_con('vehiculo_list', 5))
+
+        self.assertIn('flota_request_duracion_segundos_count{proceso="web:1",vista="vehiculo_list"} 2', lineas)
+        self.assertIn('flota_request_duracion_segundos_count{proceso="web:2",vista="vehiculo_list"} 5', lineas)
+        self.assertIn('flota_consultas_sql_total{proceso="web:2",vista="vehiculo_list"} 10', lineas)
+        self.assertIn('flota_cache_aciertos_total{proceso="web:1",cache="conteos"} 1', lineas)
+
+    def test_cache_local_solo_expone_este_proceso(self):
+        self.raspar('web:1', agregados_con('vehiculo_list', 2))
+        lineas = self.raspar('web:2', agregados_con('vehiculo_list', 5))
+
+        series = [linea for linea in lineas if linea.startswith('flota_request_duracion_segundos_count')]
+        self.assertEqual(series, ['flota_request_duracion_segundos_count{proceso="web:2",vista="vehiculo_list"} 5'])
+
+
+# =========================
+# Paginación por cursor
+# =========================
+
+class PaginacionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.empresa, usuario = crear_empresa_y_usuario()
+        self.client.force_login(usuario)
+        with usar_empresa(self.empresa):
+            self.tipo = TipoDocumento.objects.create(nombre='SOAT')
+            self.vehiculos = [
+                Vehiculo.objects.create(placa=f'PAG{numero:03d}', marca='Marca', modelo='Modelo')
+                for numero in range(7)
+            ]
+            vence = date.today() + timedelta(days=100)
+            # Cinco documentos empatados en la fecha de vencimiento
+            self.documentos = [
+                DocumentoVehiculo.objects.create(
+                    vehiculo=vehiculo, tipo=self.tipo,
+                    fecha_vencimiento=vence if numero < 5 else vence + timedelta(days=numero),
+                )
+                for numero, vehiculo in enumerate(self.vehiculos)
+            ]
+
+    def recorrer(self, queryset, campos):
+        """
+        Ids de todas las páginas hacia adelante y luego hacia atrás.
+        """
+        adelante, paginas = [], []
+        pagina = paginar_por_cursor(queryset, campos, por_pagina=2)
+        while True:
+            paginas.append([obj.pk for obj in pagina])
+            adelante.extend(paginas[-1])
+            if not pagina.has_next:
+                break
+            pagina = paginar_por_cursor(queryset, campos, cursor=pagina.cursor_siguiente, por_pagina=2)
+
+        atras = [[obj.pk for obj in pagina]]
+        while pagina.has_previous:
+            pagina = paginar_por_cursor(queryset, campos, cursor=pagina.cursor_anterior, por_pagina=2)
+            atras.append([obj.pk for obj in pagina])
+        return adelante, paginas, list(reversed(atras))
+
+    def test_adelante_y_atras(self):
+        with usar_empresa(self.empresa):
+            adelante, paginas, atras = self.recorrer(Vehiculo.objects.all(), ('placa', 'id'))
+        self.assertEqual(adelante, [v.pk for v in self.vehiculos])
+        self.assertEqual(len(paginas), 4)
+        self.assertEqual(atras, paginas)
+
+    def test_empates_en_la_columna_de_orden(self):
+        with usar_empresa(self.empresa):
+            adelante, paginas, atras = self.recorrer(DocumentoVehiculo.objects.all(), ('fecha_vencimiento', 'id'))
+        self.assertEqual(adelante, [d.pk for d in self.documentos])
+        self.assertEqual(atras, paginas)
+
+    def test_cursor_no_valido(self):
+        no_validos = {
+            # (placa, id)
+            ('vehiculo_list', 'api_vehiculos', self.vehiculos[0]): [['A', 'x'], [None, 1], ['A']],
+            # (fecha_vencimiento, id)
+            ('documento_list', 'api_documentos', self.documentos[0]): [['notadate', 1], [None, 1], ['2030-01-01', 'x']],
+        }
+        for (vista, vista_api, primero), valores in no_validos.items():
+            for cursor in [codificar_cursor(v, 'sig') for v in valores] + ['no-es-base64']:
+                with self.subTest(vista=vista, cursor=cursor):
+                    # Vistas HTML: primera página
+                    respuesta = self.client.get(reverse(vista), {'cursor': cursor})
+                    self.assertEqual(respuesta.status_code, 200)
+                    self.assertEqual(respuesta.context['page_obj'].object_list[0].pk, primero.pk)
+                    # API: 400
+                    respuesta = self.client.get(reverse(vista_api), {'cursor': cursor})
+                    self.assertEqual(respuesta.status_code, 400)
+                    self.assertIn('error', respuesta.json())
+
+
+# =========================
+# Índices de las consultas calientes
+# =========================
+
+@skipUnless(connection.vendor == 'sqlite', "Los planes esperados son los de SQLite")
+class PlanesConsultasTests(TestCase):
+    """
+    explicar_consultas: ninguna consulta caliente recorre la tabla de
+    documentos sin índice, y los filtros por ventana de vencimiento usan el
+    índice compuesto.
+    """
+
+    def planes(self):
+        salida = StringIO()
+        # Como el comando desde la consola: sin empresa fijada
+        with usar_empresa(None):
+            call_command('explicar_consultas', stdout=salida)
+        planes, actual = {}, None
+        for linea in salida.getvalue().splitlines():
+            if linea.startswith('== '):
+                actual = linea[3:]
+                planes[actual] = ''
+            elif actual:
+                planes[actual] += linea + '\n'
+        return planes
+
+    def test_sin_recorridos_completos_de_documentos(self):
+        planes = self.planes()
+        self.assertEqual(len(planes), len(consultas_calientes()))
+        for nombre, plan in planes.items():
+            with self.subTest(consulta=nombre):
+                self.assertNotRegex(plan, r'(?m)SCAN gestion_flota_documentovehiculo$')
+
+    def test_ventanas_de_vencimiento_usan_el_indice(self):
+        planes = self.planes()
+        for nombre in ('alertas: próximos', 'alertas: vencidos'):
+            self.assertIn('USING INDEX doc_venc_vehiculo_tipo_idx (fecha_vencimiento', planes[nombre])
+        self.assertIn('USING INDEX doc_vehiculo_venc_idx (vehiculo_id=?)', planes['vehiculo_list: página'])
+
+
+# =========================
+# Conteos de documentos por estado (caché invalidada)
+# =========================
+
+class ConteosDocumentosTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.empresa, _ = crear_empresa_y_usuario()
+        with usar_empresa(self.empresa):
+            self.tipo = TipoDocumento.objects.create(nombre='SOAT')
+            self.vehiculo = Vehiculo.objects.create(placa='CNT001', marca='Marca', modelo='Modelo')
+
+    def contar(self):
+        with usar_empresa(self.empresa):
+            return contar_documentos_por_estado()
+
+    def test_se_cachea_y_se_invalida_al_guardar_y_borrar(self):
+        self.assertEqual(self.contar()['todos'], 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.contar()['todos'], 0)
+
+        with usar_empresa(self.empresa):
+            documento = DocumentoVehiculo.objects.create(
+                vehiculo=self.vehiculo, tipo=self.tipo, fecha_vencimiento=date.today() - timedelta(days=1),
+            )
+        self.assertEqual(self.contar(), {'vencidos': 1, 'proximos': 0, 'vigentes': 0, 'todos': 1})
+
+        documento.fecha_vencimiento = date.today() + timedelta(days=365)
+        documento.save()
+        self.assertEqual(self.contar(), {'vencidos': 0, 'proximos': 0, 'vigentes': 1, 'todos': 1})
+
+        documento.delete()
+        self.assertEqual(self.contar()['todos'], 0)
+
+    def test_la_importacion_masiva_invalida(self):
+        self.assertEqual(self.contar()['todos'], 0)
+        archivo = BytesIO(
+            f"placa,tipo,fecha_vencimiento\nCNT001,SOAT,{date.today() + timedelta(days=5):%Y-%m-%d}\n".encode()
+        )
+        with usar_empresa(self.empresa):
+            resultado = importar_archivo('documentos', archivo, 'documentos.csv')
+        self.assertEqual(resultado.creados, 1)
+        self.assertEqual(self.contar(), {'vencidos': 0, 'proximos': 1, 'vigentes': 0, 'todos': 1})
+
+
+# =========================
+# Export CSV en streaming
+# =========================
+
+class ExportacionCSVTests(TestCase):
+    """
+    Los exports CSV salen en streaming, respetan el filtro y leen las filas
+    con un número fijo de consultas.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.empresa, usuario = crear_empresa_y_usuario()
+        with usar_empresa(self.empresa):
+            self.tipo = TipoDocumento.objects.create(nombre='SOAT', empresa=self.empresa)
+        self.client.force_login(usuario)
+
+    def sembrar(self, desde, cantidad, dias):
+        with usar_empresa(self.empresa):
+            for numero in range(desde, desde + cantidad):
+                vehiculo = Vehiculo.objects.create(
+                    placa=f'EXP{numero:03d}', marca='Marca', modelo='Modelo', empresa=self.empresa,
+                    responsable_nombre='Ana',
+                )
+                DocumentoVehiculo.objects.create(
+                    vehiculo=vehiculo, tipo=self.tipo, empresa=self.empresa,
+                    fecha_vencimiento=date.today() + timedelta(days=dias),
+                )
+
+    def descargar(self, url, params):
+        respuesta = self.client.get(url, params)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.streaming)
+        self.assertEqual(respuesta['Content-Type'], 'text/csv')
+        filas = b''.join(respuesta.streaming_content).decode().splitlines()
+        return respuesta, [fila.split(',') for fila in filas]
+
+    def test_documentos_filtrados_por_estado(self):
+        self.sembrar(0, 2, -3)
+        self.sembrar(2, 1, 200)
+        respuesta, filas = self.descargar(reverse('documento_export_csv'), {'estado': 'vencidos'})
+        self.assertIn('documentos_flota_vencidos.csv', respuesta['Content-Disposition'])
+        self.assertEqual(filas[0][0], 'Placa')
+        self.assertEqual([fila[0] for fila in filas[1:]], ['EXP000', 'EXP001'])
+        self.assertEqual({fila[4] for fila in filas[1:]}, {'vencido'})
+
+    def test_vehiculos_con_busqueda(self):
+        self.sembrar(0, 3, 200)
+        _, filas = self.descargar(reverse('vehiculo_export_csv'), {'q': 'EXP001'})
+        self.assertEqual(len(filas), 2)
+        self.assertEqual(filas[1][:3], ['EXP001', 'Marca', 'Modelo'])
+        self.assertEqual(filas[1][6], 'Ana')
+
+    def test_consultas_constantes(self):
+        url = reverse('documento_export_csv')
+        self.sembrar(0, 2, 10)
+        self.descargar(url, {})
+        with CaptureQueriesContext(connection) as pocas:
+            self.descargar(url, {})
+        self.sembrar(2, 20, 10)
+        with CaptureQueriesContext(connection) as muchas:
+            _, filas = self.descargar(url, {})
+        self.assertEqual(len(filas), 23)
+        self.assertEqual(len(muchas), len(pocas))
+
+
+# =========================
+# Alertas: un digest por responsable
+# =========================
+
+class BackendContado(locmem.EmailBackend):
+    """
+    Backend locmem que cuenta las conexiones abiertas.
+    """
+    aperturas = 0
+
+    def open(self):
+        BackendContado.aperturas += 1
+        return super().open()
+
+
+@override_settings(
+    EMAIL_BACKEND=f'{__name__}.BackendContado',
+    ALERTAS_EMAIL_DESTINO='flota@example.com',
+    ALERTAS_MAX_POR_SEGUNDO=0,
+)
+class DigestAlertasTests(TestCase):
+
+    def setUp(self):
+        BackendContado.aperturas = 0
+        self.empresa, _ = crear_empresa_y_usuario()
+        hoy = date.today()
+        with usar_empresa(self.empresa):
+            tipo = TipoDocumento.objects.create(nombre='SOAT', empresa=self.empresa)
+            for placa, email, dias in (
+                ('DIG001', 'Ana@Example.com', -2),
+                ('DIG002', 'ana@example.com', 10),
+                ('DIG003', 'beto@example.com', 5),
+                ('DIG004', '', -1),
+                ('DIG005', 'carla@example.com', 200),
+            ):
+                vehiculo = Vehiculo.objects.create(
+                    placa=placa, marca='Marca', modelo='Modelo', empresa=self.empresa,
+                    responsable_email=email,
+                )
+                DocumentoVehiculo.objects.create(
+                    vehiculo=vehiculo, tipo=tipo, empresa=self.empresa,
+                    fecha_vencimiento=hoy + timedelta(days=dias),
+                )
+
+    def test_un_mensaje_por_responsable_en_una_conexion(self):
+        with usar_empresa(self.empresa), self.assertNumQueries(1):
+            resultado = enviar_alerta_documentos(dias=30, concurrencia=1)
+
+        self.assertEqual((resultado.documentos, resultado.destinatarios, resultado.mensajes), (4, 3, 3))
+        self.assertEqual(BackendContado.aperturas, 1)
+
+        cuerpos = {mensaje.to[0]: mensaje.body for mensaje in mail.outbox}
+        self.assertEqual(set(cuerpos), {'ana@example.com', 'beto@example.com', 'flota@example.com'})
+        self.assertIn('DOCUMENTOS VENCIDOS:\n- DIG001', cuerpos['ana@example.com'])
+        self.assertIn('DIG002', cuerpos['ana@example.com'])
+        self.assertNotIn('DIG001', cuerpos['beto@example.com'])
+        self.assertIn('DIG004', cuerpos['flota@example.com'])
+        self.assertFalse(any('DIG005' in cuerpo for cuerpo in cuerpos.values()))
+
+
+# =========================
+# Alertas incrementales (ledger)
+# =========================
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    ALERTAS_EMAIL_DESTINO='flota@example.com',
+    ALERTAS_MAX_POR_SEGUNDO=0,
+    ALERTAS_UMBRALES=[30, 7],
+)
+class AlertasIncrementalesTests(TestCase):
+
+    def setUp(self):
+        self.empresa, _ = crear_empresa_y_usuario()
+        hoy = date.today()
+        self.documentos = {}
+        with usar_empresa(self.empresa):
+            tipo = TipoDocumento.objects.create(nombre='SOAT', empresa=self.empresa)
+            for placa, email, dias in (
+                ('LED001', 'ana@example.com', -2),
+                ('LED002', 'beto@example.com', 5),
+                ('LED003', 'carla@example.com', 20),
+                ('LED004', 'dario@example.com', 200),
+            ):
+                vehiculo = Vehiculo.objects.create(
+                    placa=placa, marca='Marca', modelo='Modelo', empresa=self.empresa,
+                    responsable_email=email,
+                )
+                self.documentos[placa] = DocumentoVehiculo.objects.create(
+                    vehiculo=vehiculo, tipo=tipo, empresa=self.empresa,
+                    fecha_vencimiento=hoy + timedelta(days=dias),
+                )
+
+    def enviar(self):
+        mail.outbox = []
+        with usar_empresa(None):
+            enviar_alertas_incrementales(concurrencia=1)
+        return sorted(mensaje.to[0] for mensaje in mail.outbox)
+
+    def test_la_segunda_corrida_no_repite(self):
+        self.assertEqual(self.enviar(), ['ana@example.com', 'beto@example.com', 'carla@example.com'])
+        self.assertEqual(self.enviar(), [])
+        self.assertFalse(AlertaDocumento.objects.filter(notificado_en__isnull=True).exists())
+
+    def test_una_corrida_interrumpida_retoma_solo_lo_no_enviado(self):
+        self.enviar()
+        # Como si el proceso hubiera muerto tras enviar a ana y antes de
+        # enviar a beto y carla
+        AlertaDocumento.objects.exclude(destinatario='ana@example.com').update(notificado_en=None)
+        EjecucionAlertas.objects.update(completada=False, terminado_en=None)
+
+        self.assertEqual(self.enviar(), ['beto@example.com', 'carla@example.com'])
+        self.assertEqual(self.enviar(), [])
+
+    def test_un_documento_renovado_no_se_alerta(self):
+        with usar_empresa(None):
+            detectar_alertas()
+        # Renovado entre la detección y el envío
+        documento = self.documentos['LED002']
+        documento.fecha_vencimiento = date.today() + timedelta(days=365)
+        documento.save()
+
+        self.assertEqual(self.enviar(), ['ana@example.com', 'carla@example.com'])
+        # Renovado después de avisado: tampoco vuelve a salir
+        documento = self.documentos['LED001']
+        documento.fecha_vencimiento = date.today() + timedelta(days=365)
+        documento.save()
+        self.assertEqual(self.enviar(), [])
+
+
+# =========================
+# Rollover diario de estados
+# =========================
+
+class RolloverEstadosTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        confirmado = mock.patch.object(services, '_rollover_confirmado', None)
+        confirmado.start()
+        self.addCleanup(confirmado.stop)
+        self.empresa, _ = crear_empresa_y_usuario()
+        self.hoy = date.today()
+        with usar_empresa(self.empresa):
+            tipo = TipoDocumento.objects.create(nombre='SOAT', empresa=self.empresa, dias_alerta=10)
+            vehiculo = Vehiculo.objects.create(placa='ROL001', marca='Marca', modelo='Modelo', empresa=self.empresa)
+            self.documento = DocumentoVehiculo.objects.create(
+                vehiculo=vehiculo, tipo=tipo, empresa=self.empresa,
+                fecha_vencimiento=self.hoy + timedelta(days=20),
+            )
+
+    def estado_el(self, dias):
+        services.asegurar_estados_al_dia(self.hoy + timedelta(days=dias))
+        self.documento.refresh_from_db()
+        return self.documento.estado
+
+    def test_avanza_con_la_fecha(self):
+        self.assertEqual(self.estado_el(0), 'vigente')
+        self.assertEqual(self.estado_el(15), 'proximo')
+        self.assertEqual(self.estado_el(21), 'vencido')
+
+    def test_una_corrida_fallida_se_reintenta(self):
+        dia = self.hoy + timedelta(days=15)
+        with mock.patch.object(services, 'actualizar_estados_documentos', side_effect=RuntimeError('caída')):
+            with self.assertRaises(RuntimeError):
+                services.asegurar_estados_al_dia(dia)
+        self.assertIsNone(cache.get(services._clave_rollover(dia)))
+        self.assertIsNone(cache.get(services._clave_bloqueo_rollover(dia)))
+
+        self.assertEqual(self.estado_el(15), 'proximo')
+        self.assertTrue(cache.get(services._clave_rollover(dia)))
+
+    def test_no_confirma_mientras_otro_proceso_corre(self):
+        dia = self.hoy + timedelta(days=15)
+        cache.add(services._clave_bloqueo_rollover(dia), True)
+        self.assertEqual(self.estado_el(15), 'vigente')
+        self.assertIsNone(services._rollover_confirmado)
+
+        cache.delete(services._clave_bloqueo_rollover(dia))
+        self.assertEqual(self.estado_el(15), 'proximo')
+        self.assertEqual(services._rollover_confirmado, dia)
+
+
+# =========================
+# Importación masiva (CSV y XLSX)
+# =========================
+
+class ImportacionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.empresa, _ = crear_empresa_y_usuario()
+        with usar_empresa(self.empresa):
+            self.tipo = TipoDocumento.objects.create(nombre='SOAT', empresa=self.empresa, dias_alerta=30)
+
+    def importar(self, tipo, contenido, nombre):
+        errores = StringIO()
+        with usar_empresa(self.empresa):
+            resultado = importar_archivo(tipo, BytesIO(contenido), nombre, errores_destino=errores)
+        return resultado, list(csv.reader(StringIO(errores.getvalue())))[1:]
+
+    def xlsx(self, encabezados, filas):
+        archivo = BytesIO()
+        escribir_xlsx(archivo, encabezados, filas)
+        return archivo.getvalue()
+
+    def test_csv_y_xlsx(self):
+        csv_texto = "Placa;Marca;Modelo;Año;Activo\nabc 123;Volvo;FH;2020;Sí\nABD124;Scania;R450;;no\n"
+        resultado, errores = self.importar('vehiculos', csv_texto.encode(), 'flota.csv')
+        self.assertEqual((resultado.creados, resultado.errores), (2, 0), errores)
+
+        contenido = self.xlsx(
+            ['Placa', 'Marca', 'Modelo', 'Año', 'Activo'],
+            [['XLS001', 'Kenworth', 'T800', 2019, 'Sí'], ['ABC123', 'Volvo', 'FH16', 2020, 'Sí']],
+        )
+        resultado, errores = self.importar('vehiculos', contenido, 'flota.xlsx')
+        self.assertEqual((resultado.creados, resultado.actualizados, resultado.errores), (1, 1, 0), errores)
+
+        with usar_empresa(self.empresa):
+            vehiculos = {v.placa: v for v in Vehiculo.objects.all()}
+        self.assertEqual(set(vehiculos), {'ABC123', 'ABD124', 'XLS001'})
+        self.assertEqual((vehiculos['ABC123'].modelo, vehiculos['ABC123'].anio), ('FH16', 2020))
+        self.assertFalse(vehiculos['ABD124'].activo)
+        self.assertEqual(vehiculos['XLS001'].anio, 2019)
+
+    def test_placa_repetida_en_el_archivo(self):
+        resultado, errores = self.importar(
+            'vehiculos', b"placa,marca,modelo\nREP001,Volvo,FH\nrep 001,Volvo,FM\n", 'flota.csv',
+        )
+        self.assertEqual((resultado.creados, resultado.errores), (1, 1))
+        self.assertEqual(errores[0][:2], ['3', 'Placa repetida en el archivo (fila 2).'])
+        with usar_empresa(self.empresa):
+            self.assertEqual(Vehiculo.objects.get(placa='REP001').modelo, 'FH')
+
+    def test_placa_de_otra_empresa(self):
+        otra = Empresa.objects.create(slug='otra', nombre='Otra')
+        with usar_empresa(otra):
+            Vehiculo.objects.create(placa='AJE001', marca='Volvo', modelo='FH', empresa=otra)
+
+        resultado, errores = self.importar('vehiculos', b"placa,marca,modelo\nAJE001,Scania,R450\n", 'flota.csv')
+        self.assertEqual((resultado.creados, resultado.actualizados, resultado.errores), (0, 0, 1))
+        self.assertEqual(errores[0][1], 'placa: el vehículo está registrado en otra empresa.')
+        self.assertEqual(Vehiculo._base_manager.get(placa='AJE001').marca, 'Volvo')
+
+    def test_estado_e_indice_tras_la_carga(self):
+        self.importar('vehiculos', b"placa,marca,modelo\nIDX001,Kenworth,T800\nIDX002,Scania,R450\n", 'flota.csv')
+        hoy = date.today()
+        contenido = self.xlsx(
+            ['Placa', 'Tipo documento', 'Fecha vencimiento'],
+            [['IDX001', 'SOAT', hoy - timedelta(days=1)], ['IDX002', 'SOAT', hoy + timedelta(days=10)]],
+        )
+        resultado, errores = self.importar('documentos', contenido, 'documentos.xlsx')
+        self.assertEqual(resultado.creados, 2, errores)
+        vigente = hoy + timedelta(days=90)
+        resultado, errores = self.importar(
+            'documentos', f"placa;tipo;fecha_vencimiento\nIDX002;soat;{vigente:%d/%m/%Y}\n".encode(), 'documentos.csv',
+        )
+        self.assertEqual(resultado.creados, 1, errores)
+
+        with usar_empresa(self.empresa):
+            estados = sorted(
+                DocumentoVehiculo.objects.values_list('vehiculo__placa', 'fecha_vencimiento', 'estado')
+            )
+            encontrados = [v.placa for v in buscar_vehiculos('kenworth')]
+        self.assertEqual([estado for _, _, estado in estados], ['vencido', 'proximo', 'vigente'])
+        self.assertEqual(estados[2][1], vigente)
+        self.assertEqual(encontrados, ['IDX001'])
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT rowid FROM gestion_flota_vehiculo_fts WHERE placa = 'IDX002'")
+                self.assertEqual(cursor.fetchall(), [(Vehiculo._base_manager.get(placa='IDX002').pk,)])
+
+
+# =========================
+# Blobs por contenido y recolección de huérfanos
+# =========================
+
+class RecoleccionArchivosTests(TestCase):
+
+    def setUp(self):
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=carpeta)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.empresa, _ = crear_empresa_y_usuario()
+        with usar_empresa(self.empresa):
+            self.tipo = TipoDocumento.objects.create(nombre='SOAT', empresa=self.empresa)
+            self.vehiculo = Vehiculo.objects.create(placa='BLB001', marca='Marca', modelo='Modelo')
+        self.creados = 0
+
+    def subir(self, contenido=PDF):
+        self.creados += 1
+        with usar_empresa(self.empresa):
+            return DocumentoVehiculo.objects.create(
+                vehiculo=self.vehiculo, tipo=self.tipo,
+                fecha_vencimiento=date.today() + timedelta(days=self.creados),
+                archivo=SimpleUploadedFile(f'soat{self.creados}.pdf', contenido),
+            )
+
+    def recolectar(self):
+        call_command('recolectar_archivos', '--borrar', stdout=StringIO())
+
+    def existe(self, blob):
+        return DocumentoVehiculo._meta.get_field('archivo').storage.exists(blob.nombre)
+
+    def test_mismo_contenido_comparte_blob(self):
+        primero, segundo = self.subir(), self.subir()
+        self.assertEqual(primero.contenido_id, segundo.contenido_id)
+        self.assertEqual(ArchivoContenido.objects.count(), 1)
+        self.assertEqual(primero.archivo.name, segundo.archivo.name)
+
+        primero.delete()
+        self.recolectar()
+        self.assertTrue(self.existe(ArchivoContenido.objects.get()))
+
+    def test_huerfano_dentro_de_la_gracia_se_conserva(self):
+        documento = self.subir()
+        blob = documento.contenido
+        # Subido hace mucho; la gracia cuenta desde que quedó sin documentos
+        ArchivoContenido.objects.filter(pk=blob.pk).update(creado_en=timezone.now() - timedelta(days=30))
+        documento.delete()
+
+        self.recolectar()
+        blob.refresh_from_db()
+        self.assertIsNotNone(blob.huerfano_desde)
+        self.assertTrue(self.existe(blob))
+
+    def test_huerfano_pasada_la_gracia_se_borra(self):
+        documento = self.subir()
+        blob = documento.contenido
+        documento.delete()
+        self.recolectar()
+        ArchivoContenido.objects.filter(pk=blob.pk).update(huerfano_desde=timezone.now() - timedelta(days=2))
+
+        self.recolectar()
+        self.assertFalse(ArchivoContenido.objects.filter(pk=blob.pk).exists())
+        self.assertFalse(self.existe(blob))
+
+    def test_huerfano_reutilizado_antes_de_borrar(self):
+        documento = self.subir()
+        blob = documento.contenido
+        documento.delete()
+        self.recolectar()
+        ArchivoContenido.objects.filter(pk=blob.pk).update(huerfano_desde=timezone.now() - timedelta(days=2))
+
+        contenidos, sueltos = buscar_huerfanos(timezone.now() - timedelta(hours=24))
+        self.assertEqual(contenidos, [blob])
+        nuevo = self.subir()
+        self.assertEqual(nuevo.contenido_id, blob.pk)
+        borrar_huerfanos(contenidos, sueltos)
+        self.assertTrue(self.existe(blob))
+        self.assertIsNone(ArchivoContenido.objects.get(pk=blob.pk).huerfano_desde)
+
+
+# =========================
+# API: ETag / Last-Modified
+# =========================
+
+class ETagApiTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        # El rollover de hoy ya corrió: el de los días siguientes lo hace el test
+        confirmado = mock.patch.object(services, '_rollover_confirmado', date.today())
+        confirmado.start()
+        self.addCleanup(confirmado.stop)
+        self.empresa, usuario = crear_empresa_y_usuario()
+        with usar_empresa(self.empresa):
+            tipo = TipoDocumento.objects.create(nombre='SOAT', empresa=self.empresa, dias_alerta=10)
+            vehiculo = Vehiculo.objects.create(placa='ETG001', marca='Marca', modelo='Modelo', empresa=self.empresa)
+            self.documento = DocumentoVehiculo.objects.create(
+                vehiculo=vehiculo, tipo=tipo, empresa=self.empresa,
+                fecha_vencimiento=date.today() + timedelta(days=20),
+            )
+        self.client.force_login(usuario)
+        self.url = reverse('api_documentos')
+
+    def pedir(self, etag=None):
+        cabeceras = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(self.url, **cabeceras)
+
+    def test_304_con_el_mismo_etag(self):
+        respuesta = self.pedir()
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta['ETag'])
+        self.assertTrue(respuesta['Last-Modified'])
+
+        respuesta = self.pedir(respuesta['ETag'])
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(respuesta.content, b'')
+
+    def test_un_cambio_da_200_y_etag_nuevo(self):
+        etag = self.pedir()['ETag']
+        self.documento.fecha_vencimiento += timedelta(days=1)
+        self.documento.save()
+
+        respuesta = self.pedir(etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+        self.assertEqual(self.pedir(respuesta['ETag']).status_code, 304)
+
+    def test_el_rollover_invalida_el_etag(self):
+        etag = self.pedir()['ETag']
+        self.assertEqual(self.pedir(etag).status_code, 304)
+
+        # Pasan quince días: el documento entra en la ventana de alerta
+        services.actualizar_estados_documentos(date.today() + timedelta(days=15))
+        respuesta = self.pedir(etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+        self.assertEqual(respuesta.json()['resultados'][0]['estado'], 'proximo')
+
+
+# =========================
+# Vistas async (ASGI)
+# =========================
+
+class VistasAsyncTests(TestCase):
+    """
+    Dashboard, listado de documentos y detalle de vehículo son corrutinas y
+    responden por el handler ASGI (AsyncClient) con la empresa del usuario.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.empresa, self.usuario = crear_empresa_y_usuario()
+        otra = Empresa.objects.create(slug='otra', nombre='Otra')
+        hoy = date.today()
+        for empresa, placa, dias in ((self.empresa, 'ASY001', -3), (self.empresa, 'ASY002', 90), (otra, 'ASY999', -3)):
+            with usar_empresa(empresa):
+                tipo, _ = TipoDocumento.objects.get_or_create(nombre='SOAT', empresa=empresa)
+                vehiculo = Vehiculo.objects.create(placa=placa, marca='Marca', modelo='Modelo', empresa=empresa)
+                DocumentoVehiculo.objects.create(
+                    vehiculo=vehiculo, tipo=tipo, empresa=empresa, fecha_vencimiento=hoy + timedelta(days=dias),
+                )
+        self.vehiculo = Vehiculo._base_manager.get(placa='ASY001')
+
+    def test_son_corrutinas(self):
+        for vista in (views.dashboard, views.vehiculo_detail, views.documento_list):
+            self.assertTrue(inspect.iscoroutinefunction(vista), vista.__name__)
+
+    async def test_sin_sesion_redirige_al_login(self):
+        respuesta = await self.async_client.get(reverse('documento_list'))
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertIn(reverse('login'), respuesta['Location'])
+
+    async def test_listado_de_documentos(self):
+        await self.async_client.aforce_login(self.usuario)
+        respuesta = await self.async_client.get(reverse('documento_list'), {'estado': 'vencidos'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([d.vehiculo.placa for d in respuesta.context['documentos']], ['ASY001'])
+        self.assertEqual((respuesta.context['total_vencidos'], respuesta.context['total_todos']), (1, 2))
+
+    async def test_detalle_de_vehiculo(self):
+        await self.async_client.aforce_login(self.usuario)
+        respuesta = await self.async_client.get(reverse('vehiculo_detail', args=[self.vehiculo.pk]))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.context['vehiculo'].estado_docs, 'con_vencidos')
+        self.assertEqual(len(respuesta.context['documentos']), 1)
+
+        ajeno = await Vehiculo._base_manager.aget(placa='ASY999')
+        respuesta = await self.async_client.get(reverse('vehiculo_detail', args=[ajeno.pk]))
+        self.assertEqual(respuesta.status_code, 404)
+
+    async def test_dashboard(self):
+        await self.async_client.aforce_login(self.usuario)
+        respuesta = await self.async_client.get(reverse('dashboard'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertContains(respuesta, 'ASY001')
+        self.assertNotContains(respuesta, 'ASY999')
@@ -1,14 +1,16 @@
 from django.urls import path
-from . import views
+from . import api, metricas, views
 
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
 
     path('vehiculos/', views.VehiculoListView.as_view(), name='vehiculo_list'),
     path('vehiculos/nuevo/', views.vehiculo_create, name='vehiculo_create'),
-    path('vehiculos/<int:pk>/', views.VehiculoDetailView.as_view(), name='vehiculo_detail'),
+    path('vehiculos/<int:pk>/', views.vehiculo_detail, name='vehiculo_detail'),
     path('vehiculos/<int:pk>/editar/', views.vehiculo_update, name='vehiculo_update'),
     path('vehiculos/exportar/csv/', views.vehiculo_export_csv, name='vehiculo_export_csv'),  # 👈 nueva
+    path('vehiculos/autocompletar/', views.vehiculo_autocompletar, name='vehiculo_autocompletar'),
+    path('vehiculos/buscar/', views.vehiculo_buscar, name='vehiculo_buscar'),
 
     path('vehiculos/<int:vehiculo_id>/documentos/nuevo/', views.documento_create, name='documento_create'),
     path('documentos/<int:pk>/editar/', views.documento_update, name='documento_update'),
@@ -16,6 +18,29 @@ urlpatterns = [
 
     path('documentos/', views.documento_list, name='documento_list'),
     path('documentos/exportar/csv/', views.documento_export_csv, name='documento_export_csv'),
+
+    path('exportaciones/<int:pk>/', views.exportacion_estado, name='exportacion_estado'),
+    path('exportaciones/<int:pk>/descargar/', views.exportacion_descargar, name='exportacion_descargar'),
+
+    path('importaciones/nueva/', views.importacion_nueva, name='importacion_nueva'),
+    path('importaciones/<int:pk>/', views.importacion_detalle, name='importacion_detalle'),
+    path('importaciones/<int:pk>/errores/', views.importacion_errores, name='importacion_errores'),
+
+    path('empresa/', views.empresa_cambiar, name='empresa_cambiar'),
+
+    path('subidas/', views.subida_firmar, name='subida_firmar'),
+    path('subidas/<uuid:token>/recibir/', views.subida_recibir, name='subida_recibir'),
+
+    path('api/v1/vehiculos/', api.vehiculos, name='api_vehiculos'),
+    path('api/v1/vehiculos/<int:pk>/', api.vehiculo, name='api_vehiculo'),
+    path('api/v1/documentos/', api.documentos, name='api_documentos'),
+    path('api/v1/documentos/<int:pk>/', api.documento, name='api_documento'),
+    path('api/v1/tipos-documento/', api.tipos_documento, name='api_tipos_documento'),
+    path('api/v1/cambios/', api.cambios, name='api_cambios'),
+
+    path('diagnostico/requests/', views.diagnostico_requests, name='diagnostico_requests'),
+    path('metrics', metricas.metricas, name='metricas'),
+
     path('debug-db/', views.debug_db, name='debug_db'),
     path("debug-fix-admin/", views.debug_fix_admin, name="debug_fix_admin"),
 ]
@@ -1,18 +1,71 @@
-from datetime import date, timedelta
-import csv
+from urllib.parse import urlencode
+import json
+import re
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.db.models import Q
-from django.http import HttpResponse, HttpResponseForbidden
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseForbidden,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
 from django.utils.decorators import method_decorator
-from django.views.generic import ListView, DetailView
-
-from .models import Vehiculo, DocumentoVehiculo
-from .forms import VehiculoForm, DocumentoVehiculoForm
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST, require_http_methods
+from django.views.generic import ListView
+
+from .busqueda import autocompletar_placas, buscar_vehiculos
+from .empresas import empresas_usuario
+from .exportaciones import (
+    ENCABEZADOS_DOCUMENTOS,
+    ENCABEZADOS_VEHICULOS,
+    csv_en_streaming,
+    filas_documentos,
+    filas_vehiculos,
+    solicitar_exportacion,
+    storage_exportaciones,
+)
+from .importacion import importar_subida
+from .instrumentacion import resumen_requests
+from .models import Vehiculo, DocumentoVehiculo, ExportacionJob, Importacion, SubidaArchivo
+from .forms import VehiculoForm, DocumentoVehiculoForm, ImportacionForm
+from .paginacion import apaginar_por_cursor, paginar_por_cursor
 from .permissions import user_is_operador, user_is_admin
+from .services import (
+    aasegurar_estados_al_dia,
+    acontar_documentos_por_estado,
+    aobtener_snapshot_dashboard,
+    asegurar_estados_al_dia,
+)
+from .subidas import (
+    asignar_subida,
+    crear_subida,
+    firma_valida,
+    obtener_destino,
+)
+
+
+# =========================
+# Vistas async
+# =========================
+#
+# Dashboard, listado de documentos y detalle de vehículo son async: bajo
+# ASGI (FLOTA_SERVIDOR=asgi en render_start.sh) leen caché y base sin
+# ocupar un worker mientras esperan. Los datos se leen completos con el ORM
+# async y la plantilla se renderiza en un hilo, porque los context
+# processors (roles, empresas) consultan de forma síncrona.
+# Bajo WSGI funcionan igual: Django las corre en un event loop propio.
+
+_render_async = sync_to_async(render)
 
 
 # =========================
@@ -20,23 +73,10 @@ from .permissions import user_is_operador, user_is_admin
 # =========================
 
 @login_required
-def dashboard(request):
-    hoy = date.today()
-    proximos = DocumentoVehiculo.objects.filter(
-        fecha_vencimiento__gte=hoy,
-        fecha_vencimiento__lte=hoy + timedelta(days=30),
-    )
-    vencidos = DocumentoVehiculo.objects.filter(
-        fecha_vencimiento__lt=hoy
-    )
-    total_vehiculos = Vehiculo.objects.filter(activo=True).count()
-
-    context = {
-        'total_vehiculos': total_vehiculos,
-        'proximos': proximos,
-        'vencidos': vencidos,
-    }
-    return render(request, 'gestion_flota/dashboard.html', context)
+async def dashboard(request):
+    # Todo el dashboard sale de un snapshot cacheado (ver services.py)
+    context = await aobtener_snapshot_dashboard()
+    return await _render_async(request, 'gestion_flota/dashboard.html', context)
 
 
 # =========================
@@ -48,31 +88,51 @@ class VehiculoListView(ListView):
     model = Vehiculo
     template_name = 'gestion_flota/vehiculo_list.html'
     context_object_name = 'vehiculos'
+    paginate_by = 24
 
     def get_queryset(self):
-        qs = Vehiculo.objects.filter(activo=True).order_by('placa')
         q = self.request.GET.get('q')
+        # El estado de documentos viene anotado en la misma consulta
+        # (evita una consulta por tarjeta en el template).
+        asegurar_estados_al_dia()
+        return (
+            Vehiculo.objects.filter(activo=True)
+            .buscar(q)
+            .con_estado_documentos()
+            .order_by('placa')
+        )
 
-        if q:
-            qs = qs.filter(
-                Q(placa__icontains=q) |
-                Q(marca__icontains=q) |
-                Q(modelo__icontains=q) |
-                Q(tipo__icontains=q)
-            )
-        return qs
+    def paginate_queryset(self, queryset, page_size):
+        # Paginación por cursor sobre (placa, id) en lugar de OFFSET
+        page = paginar_por_cursor(
+            queryset,
+            ('placa', 'id'),
+            cursor=self.request.GET.get('cursor'),
+            por_pagina=page_size,
+        )
+        return None, page, page.object_list, page.has_other_pages()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['q'] = self.request.GET.get('q', '')
+        q = self.request.GET.get('q', '')
+        context['q'] = q
+        context['filtros_url'] = urlencode({'q': q}) if q else ''
         return context
 
 
-@method_decorator(login_required, name='dispatch')
-class VehiculoDetailView(DetailView):
-    model = Vehiculo
-    template_name = 'gestion_flota/vehiculo_detail.html'
-    context_object_name = 'vehiculo'
+@login_required
+async def vehiculo_detail(request, pk):
+    await aasegurar_estados_al_dia()
+    try:
+        vehiculo = await Vehiculo.objects.con_estado_documentos().aget(pk=pk)
+    except Vehiculo.DoesNotExist:
+        raise Http404("No existe el vehículo.")
+
+    context = {
+        'vehiculo': vehiculo,
+        'documentos': [doc async for doc in vehiculo.documentos.select_related('tipo')],
+    }
+    return await _render_async(request, 'gestion_flota/vehiculo_detail.html', context)
 
 
 @login_required
@@ -81,14 +141,16 @@ def vehiculo_create(request):
         return HttpResponseForbidden("No tienes permiso para crear vehículos.")
 
     if request.method == 'POST':
-        form = VehiculoForm(request.POST, request.FILES)
+        form = VehiculoForm(request.POST, request.FILES, usuario=request.user)
         if form.is_valid():
             vehiculo = form.save(commit=False)
             vehiculo.creado_por = request.user
             vehiculo.save()
+            if form.cleaned_data.get('subida'):
+                asignar_subida(form.cleaned_data['subida'], vehiculo)
             return redirect('vehiculo_detail', pk=vehiculo.pk)
     else:
-        form = VehiculoForm()
+        form = VehiculoForm(usuario=request.user)
 
     context = {
         'form': form,
@@ -104,12 +166,14 @@ def vehiculo_update(request, pk):
         return HttpResponseForbidden("No tienes permiso para editar vehículos.")
 
     if request.method == 'POST':
-        form = VehiculoForm(request.POST, request.FILES, instance=vehiculo)
+        form = VehiculoForm(request.POST, request.FILES, instance=vehiculo, usuario=request.user)
         if form.is_valid():
             form.save()
+            if form.cleaned_data.get('subida'):
+                asignar_subida(form.cleaned_data['subida'], vehiculo)
             return redirect('vehiculo_detail', pk=vehiculo.pk)
     else:
-        form = VehiculoForm(instance=vehiculo)
+        form = VehiculoForm(instance=vehiculo, usuario=request.user)
 
     context = {
         'form': form,
@@ -118,6 +182,102 @@ def vehiculo_update(request, pk):
     return render(request, 'gestion_flota/vehiculo_form.html', context)
 
 
+# =========================
+# Búsqueda
+# =========================
+
+@login_required
+def vehiculo_autocompletar(request):
+    """
+    JSON con las placas de vehículos activos que empiezan por ?q=
+    (para el autocompletado del buscador).
+    """
+    resultados = autocompletar_placas(request.GET.get('q', ''))
+    return JsonResponse({'resultados': resultados})
+
+
+@login_required
+def vehiculo_buscar(request):
+    """
+    JSON con los vehículos activos que coinciden con ?q=, ordenados por
+    relevancia.
+    """
+    vehiculos = buscar_vehiculos(request.GET.get('q', ''))
+    return JsonResponse({
+        'resultados': [
+            {
+                'id': v.pk,
+                'placa': v.placa,
+                'marca': v.marca,
+                'modelo': v.modelo,
+                'tipo': v.tipo,
+                'url': reverse('vehiculo_detail', args=[v.pk]),
+            }
+            for v in vehiculos
+        ],
+    })
+
+
+# =========================
+# Subidas directas de archivos
+# =========================
+
+@login_required
+@require_POST
+def subida_firmar(request):
+    """
+    Registra una subida y devuelve la URL firmada a la que el navegador
+    envía el archivo directamente. Cuerpo JSON: destino, nombre, tamano.
+    """
+    if not user_is_operador(request.user):
+        return JsonResponse({'error': "No tienes permiso para subir archivos."}, status=403)
+
+    try:
+        datos = json.loads(request.body)
+        subida = crear_subida(
+            datos.get('destino'),
+            datos.get('nombre'),
+            datos.get('tamano'),
+            usuario=request.user,
+        )
+    except (ValueError, AttributeError) as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    return JsonResponse({
+        'token': str(subida.token),
+        'expira': subida.expira_en.isoformat(),
+        **obtener_destino().firmar(subida, request),
+    })
+
+
+@csrf_exempt
+@require_http_methods(['PUT'])
+def subida_recibir(request, token):
+    """
+    Receptor del almacenamiento local (DestinoLocal): hace las veces del
+    servicio de almacenamiento en desarrollo. Se autentica con la firma de
+    la URL, no con la sesión, y escribe el cuerpo en bloques sin pasar del
+    tamaño firmado (no se fía del Content-Length declarado).
+    """
+    if not firma_valida(token, request.GET.get('expira'), request.GET.get('firma')):
+        return HttpResponseForbidden("Firma no válida o vencida.")
+
+    subida = get_object_or_404(SubidaArchivo, token=token, estado='esperando')
+    try:
+        declarado = int(request.headers.get('Content-Length') or 0)
+    except ValueError:
+        declarado = 0
+    limite = min(subida.tamano, settings.SUBIDAS_TAMANO_MAX)
+    if not 0 < declarado <= limite:
+        return HttpResponse("Tamaño no permitido.", status=413)
+
+    try:
+        obtener_destino().guardar(subida.clave, iter(lambda: request.read(64 * 1024), b''), limite)
+    except ValueError as exc:
+        return HttpResponse(str(exc), status=413)
+    return HttpResponse(status=204)
+
+
 # =========================
 # Documentos de vehículo
 # =========================
@@ -130,14 +290,16 @@ def documento_create(request, vehiculo_id):
         return HttpResponseForbidden("No tienes permiso para crear documentos.")
 
     if request.method == 'POST':
-        form = DocumentoVehiculoForm(request.POST, request.FILES)
+        form = DocumentoVehiculoForm(request.POST, request.FILES, usuario=request.user)
         if form.is_valid():
             doc = form.save(commit=False)
             doc.vehiculo = vehiculo
             doc.save()
+            if form.cleaned_data.get('subida'):
+                asignar_subida(form.cleaned_data['subida'], doc)
             return redirect('vehiculo_detail', pk=vehiculo.pk)
     else:
-        form = DocumentoVehiculoForm()
+        form = DocumentoVehiculoForm(usuario=request.user)
 
     context = {
         'form': form,
@@ -158,12 +320,14 @@ def documento_update(request, pk):
         return HttpResponseForbidden("No tienes permiso para editar documentos.")
 
     if request.method == 'POST':
-        form = DocumentoVehiculoForm(request.POST, request.FILES, instance=doc)
+        form = DocumentoVehiculoForm(request.POST, request.FILES, instance=doc, usuario=request.user)
         if form.is_valid():
             form.save()
+            if form.cleaned_data.get('subida'):
+                asignar_subida(form.cleaned_data['subida'], doc)
             return redirect('vehiculo_detail', pk=vehiculo.pk)
     else:
-        form = DocumentoVehiculoForm(instance=doc)
+        form = DocumentoVehiculoForm(instance=doc, usuario=request.user)
 
     context = {
         'form': form,
@@ -195,103 +359,83 @@ def documento_delete(request, pk):
     return render(request, 'gestion_flota/documento_confirm_delete.html', context)
 
 
+DOCUMENTOS_POR_PAGINA = 50
+
+
 @login_required
-def documento_list(request):
+async def documento_list(request):
     """
     Listado filtrable de documentos:
     ?estado=vencidos|proximos|vigentes
     """
-    hoy = date.today()
-    dias_alerta = 30
     estado = request.GET.get('estado')  # 'vencidos', 'proximos', 'vigentes' o None
 
-    docs = DocumentoVehiculo.objects.select_related('vehiculo', 'tipo')
-
-    if estado == 'vencidos':
-        docs = docs.filter(fecha_vencimiento__lt=hoy)
-    elif estado == 'proximos':
-        docs = docs.filter(
-            fecha_vencimiento__gte=hoy,
-            fecha_vencimiento__lte=hoy + timedelta(days=dias_alerta),
-        )
-    elif estado == 'vigentes':
-        docs = docs.filter(
-            fecha_vencimiento__gt=hoy + timedelta(days=dias_alerta),
-        )
+    await aasegurar_estados_al_dia()
+    docs = DocumentoVehiculo.objects.select_related('vehiculo', 'tipo').por_estado(estado)
     # si no hay estado, mostramos todo
 
-    total_vencidos = DocumentoVehiculo.objects.filter(fecha_vencimiento__lt=hoy).count()
-    total_proximos = DocumentoVehiculo.objects.filter(
-        fecha_vencimiento__gte=hoy,
-        fecha_vencimiento__lte=hoy + timedelta(days=dias_alerta),
-    ).count()
-    total_vigentes = DocumentoVehiculo.objects.filter(
-        fecha_vencimiento__gt=hoy + timedelta(days=dias_alerta),
-    ).count()
-    total_todos = DocumentoVehiculo.objects.count()
+    # Paginación por cursor sobre (fecha_vencimiento, id)
+    pagina = await apaginar_por_cursor(
+        docs,
+        ('fecha_vencimiento', 'id'),
+        cursor=request.GET.get('cursor'),
+        por_pagina=DOCUMENTOS_POR_PAGINA,
+    )
+
+    # Contadores de las pestañas: una consulta agregada, cacheada por día
+    conteos = await acontar_documentos_por_estado()
 
     context = {
-        'documentos': docs.order_by('fecha_vencimiento'),
+        'documentos': pagina.object_list,
+        'page_obj': pagina,
+        'filtros_url': urlencode({'estado': estado}) if estado else '',
         'estado': estado,
-        'total_vencidos': total_vencidos,
-        'total_proximos': total_proximos,
-        'total_vigentes': total_vigentes,
-        'total_todos': total_todos,
+        'total_vencidos': conteos['vencidos'],
+        'total_proximos': conteos['proximos'],
+        'total_vigentes': conteos['vigentes'],
+        'total_todos': conteos['todos'],
     }
-    return render(request, 'gestion_flota/documento_list.html', context)
+    return await _render_async(request, 'gestion_flota/documento_list.html', context)
 
 
 # =========================
 # Export CSV
 # =========================
 
+def _formato_exportacion(request):
+    return 'xlsx' if request.GET.get('formato') == 'xlsx' else 'csv'
+
+
+def _exportacion_diferida(request):
+    return request.GET.get('diferido') == '1' or _formato_exportacion(request) == 'xlsx'
+
+
 @login_required
 def vehiculo_export_csv(request):
     """
     Exporta los vehículos a CSV, respetando el filtro de búsqueda 'q'.
+    El archivo se genera en streaming: la memoria no crece con el total de filas.
+    Con ?diferido=1 o ?formato=xlsx se encola como exportación en segundo plano.
     """
     q = request.GET.get('q')
 
-    qs = Vehiculo.objects.filter(activo=True).order_by('placa')
-    if q:
-        qs = qs.filter(
-            Q(placa__icontains=q) |
-            Q(marca__icontains=q) |
-            Q(modelo__icontains=q) |
-            Q(tipo__icontains=q)
+    if _exportacion_diferida(request):
+        job = solicitar_exportacion(
+            'vehiculos',
+            formato=_formato_exportacion(request),
+            filtro=q,
+            usuario=request.user,
         )
+        return redirect('exportacion_estado', pk=job.pk)
 
-    response = HttpResponse(content_type='text/csv')
+    response = StreamingHttpResponse(
+        csv_en_streaming(ENCABEZADOS_VEHICULOS, filas_vehiculos(q)),
+        content_type='text/csv',
+    )
     nombre_filtro = q if q else "todos"
     response['Content-Disposition'] = (
         f'attachment; filename="vehiculos_flota_{nombre_filtro}.csv"'
     )
-
-    writer = csv.writer(response)
-    # Encabezados
-    writer.writerow([
-        'Placa',
-        'Marca',
-        'Modelo',
-        'Año',
-        'Tipo',
-        'Activo',
-        'Responsable',
-        'Email responsable',
-    ])
-
-    for v in qs:
-        writer.writerow([
-            v.placa,
-            v.marca,
-            v.modelo,
-            v.anio or '',
-            v.tipo,
-            'Sí' if v.activo else 'No',
-            v.responsable_nombre or '',
-            v.responsable_email or '',
-        ])
-
     return response
 
 
@@ -300,57 +444,255 @@ def documento_export_csv(request):
     """
     Exporta los documentos a CSV, respetando el filtro 'estado'
     (vencidos, proximos, vigentes o todos).
+    El archivo se genera en streaming: la memoria no crece con el total de filas.
+    Con ?diferido=1 o ?formato=xlsx se encola como exportación en segundo plano.
     """
-    hoy = date.today()
-    dias_alerta = 30
     estado = request.GET.get('estado')
 
-    docs = DocumentoVehiculo.objects.select_related('vehiculo', 'tipo')
-
-    if estado == 'vencidos':
-        docs = docs.filter(fecha_vencimiento__lt=hoy)
-    elif estado == 'proximos':
-        docs = docs.filter(
-            fecha_vencimiento__gte=hoy,
-            fecha_vencimiento__lte=hoy + timedelta(days=dias_alerta),
-        )
-    elif estado == 'vigentes':
-        docs = docs.filter(
-            fecha_vencimiento__gt=hoy + timedelta(days=dias_alerta),
+    if _exportacion_diferida(request):
+        job = solicitar_exportacion(
+            'documentos',
+            formato=_formato_exportacion(request),
+            filtro=estado,
+            usuario=request.user,
         )
+        return redirect('exportacion_estado', pk=job.pk)
 
+    response = StreamingHttpResponse(
+        csv_en_streaming(ENCABEZADOS_DOCUMENTOS, filas_documentos(estado)),
+        content_type='text/csv',
+    )
     nombre_filtro = estado if estado else "todos"
-    response = HttpResponse(content_type='text/csv')
     response['Content-Disposition'] = (
         f'attachment; filename="documentos_flota_{nombre_filtro}.csv"'
     )
+    return response
 
-    writer = csv.writer(response)
-    # Encabezados
-    writer.writerow([
-        'Placa',
-        'Tipo documento',
-        'Fecha expedición',
-        'Fecha vencimiento',
-        'Estado',
-        'Responsable',
-        'Email responsable',
-    ])
-
-    for d in docs.order_by('fecha_vencimiento'):
-        writer.writerow([
-            d.vehiculo.placa,
-            d.tipo.nombre,
-            d.fecha_expedicion or '',
-            d.fecha_vencimiento,
-            d.estado,
-            d.vehiculo.responsable_nombre or '',
-            d.vehiculo.responsable_email or '',
-        ])
 
+# =========================
+# Exportaciones en segundo plano
+# =========================
+
+def _puede_ver_exportacion(user, job):
+    """
+    Las exportaciones idénticas se comparten dentro de la empresa (ver
+    solicitar_exportacion), así que cualquier miembro de la empresa del
+    trabajo puede verlo y descargarlo, no solo quien lo creó.
+    """
+    return (
+        job.creado_por_id == user.pk
+        or job.empresa_id in empresas_usuario(user)
+        or user_is_admin(user)
+    )
+
+
+@login_required
+def exportacion_estado(request, pk):
+    """
+    Estado de una exportación en segundo plano.
+    Responde JSON si el cliente lo pide (Accept: application/json).
+    """
+    job = get_object_or_404(ExportacionJob, pk=pk)
+    if not _puede_ver_exportacion(request.user, job):
+        return HttpResponseForbidden("No tienes permiso para ver esta exportación.")
+
+    if 'application/json' in request.headers.get('Accept', ''):
+        return JsonResponse({
+            'id': job.pk,
+            'tipo': job.tipo,
+            'formato': job.formato,
+            'estado': job.estado,
+            'filas': job.filas,
+            'bytes': job.bytes,
+            'duracion': job.duracion,
+            'error': job.error,
+            'descarga': (
+                reverse('exportacion_descargar', args=[job.pk])
+                if job.estado == 'listo' else None
+            ),
+        })
+
+    context = {
+        'job': job,
+    }
+    return render(request, 'gestion_flota/exportacion_estado.html', context)
+
+
+_RANGO_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _leer_rango(archivo, inicio, longitud, bloque=64 * 1024):
+    with archivo:
+        archivo.seek(inicio)
+        restante = longitud
+        while restante > 0:
+            datos = archivo.read(min(bloque, restante))
+            if not datos:
+                break
+            restante -= len(datos)
+            yield datos
+
+
+@login_required
+def exportacion_descargar(request, pk):
+    """
+    Descarga el archivo de una exportación terminada.
+    Soporta cabecera Range (un solo rango) para reanudar descargas.
+    """
+    job = get_object_or_404(ExportacionJob, pk=pk)
+    if not _puede_ver_exportacion(request.user, job):
+        return HttpResponseForbidden("No tienes permiso para descargar esta exportación.")
+
+    storage = storage_exportaciones()
+    if job.estado != 'listo' or not storage.exists(job.archivo):
+        raise Http404("La exportación no está disponible.")
+
+    tamano = storage.size(job.archivo)
+    content_type = (
+        'application/gzip' if job.formato == 'csv'
+        else 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+
+    rango = _RANGO_RE.match(request.headers.get('Range', '').strip())
+    if rango and (rango.group(1) or rango.group(2)):
+        if rango.group(1):
+            inicio = int(rango.group(1))
+            fin = int(rango.group(2)) if rango.group(2) else tamano - 1
+        else:
+            # bytes=-N: los últimos N bytes
+            inicio = max(tamano - int(rango.group(2)), 0)
+            fin = tamano - 1
+        fin = min(fin, tamano - 1)
+
+        if inicio >= tamano or inicio > fin:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{tamano}'
+            return response
+
+        longitud = fin - inicio + 1
+        response = StreamingHttpResponse(
+            _leer_rango(storage.open(job.archivo, 'rb'), inicio, longitud),
+            status=206,
+            content_type=content_type,
+        )
+        response['Content-Range'] = f'bytes {inicio}-{fin}/{tamano}'
+        response['Content-Length'] = str(longitud)
+    else:
+        response = FileResponse(storage.open(job.archivo, 'rb'), content_type=content_type)
+        response['Content-Length'] = str(tamano)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = f'attachment; filename="{job.nombre_descarga}"'
     return response
 
 
+# =========================
+# Importación masiva
+# =========================
+
+@login_required
+def importacion_nueva(request):
+    if not user_is_operador(request.user):
+        return HttpResponseForbidden("No tienes permiso para importar datos.")
+
+    if request.method == 'POST':
+        form = ImportacionForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                importacion = importar_subida(
+                    form.cleaned_data['tipo'],
+                    form.cleaned_data['archivo'],
+                    usuario=request.user,
+                )
+            except ValueError as exc:
+                form.add_error('archivo', str(exc))
+            else:
+                return redirect('importacion_detalle', pk=importacion.pk)
+    else:
+        form = ImportacionForm()
+
+    context = {
+        'form': form,
+    }
+    return render(request, 'gestion_flota/importacion_form.html', context)
+
+
+def _puede_ver_importacion(user, importacion):
+    return importacion.creado_por_id == user.pk or user_is_admin(user)
+
+
+@login_required
+def importacion_detalle(request, pk):
+    importacion = get_object_or_404(Importacion, pk=pk)
+    if not _puede_ver_importacion(request.user, importacion):
+        return HttpResponseForbidden("No tienes permiso para ver esta importación.")
+
+    context = {
+        'importacion': importacion,
+    }
+    return render(request, 'gestion_flota/importacion_detalle.html', context)
+
+
+@login_required
+def importacion_errores(request, pk):
+    """
+    Descarga el CSV con las filas rechazadas (número de fila, error y la
+    fila original).
+    """
+    importacion = get_object_or_404(Importacion, pk=pk)
+    if not _puede_ver_importacion(request.user, importacion):
+        return HttpResponseForbidden("No tienes permiso para ver esta importación.")
+
+    storage = storage_exportaciones()
+    if not importacion.archivo_errores or not storage.exists(importacion.archivo_errores):
+        raise Http404("No hay archivo de errores.")
+
+    return FileResponse(
+        storage.open(importacion.archivo_errores, 'rb'),
+        as_attachment=True,
+        filename=f"errores_importacion_{importacion.pk}.csv",
+        content_type='text/csv',
+    )
+
+
+# =========================
+# Empresa actual
+# =========================
+
+@login_required
+@require_POST
+def empresa_cambiar(request):
+    """
+    Cambia la empresa con la que trabaja el usuario (solo entre las suyas).
+    """
+    try:
+        empresa_id = int(request.POST.get('empresa', ''))
+    except ValueError:
+        empresa_id = None
+    if empresa_id not in empresas_usuario(request.user):
+        return HttpResponseForbidden("No perteneces a esa empresa.")
+
+    request.session['empresa_id'] = empresa_id
+    destino = request.POST.get('next', '')
+    if not url_has_allowed_host_and_scheme(destino, allowed_hosts={request.get_host()}):
+        destino = reverse('dashboard')
+    return redirect(destino)
+
+
+# =========================
+# Diagnóstico
+# =========================
+
+@staff_member_required
+def diagnostico_requests(request):
+    """
+    Percentiles de duración, consultas y tiempos por vista, de todos los
+    procesos, más las consultas repetidas (N+1) de cada una. Con la caché
+    local solo los de este worker, con un 'aviso'.
+    """
+    return JsonResponse(resumen_requests(), json_dumps_params={'ensure_ascii': False})
+
+
 # =========================
 # Vistas de depuración (usar solo temporalmente)
 # =========================
@@ -0,0 +1,200 @@
+import posixpath
+import re
+import zipfile
+from datetime import date, timedelta
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+# =========================
+# Escritura y lectura mínima de XLSX (sin dependencias externas)
+# =========================
+#
+# Un XLSX es un ZIP con unas pocas partes XML. La hoja se escribe y se lee
+# fila por fila directamente dentro del ZIP, así que la memoria no crece con
+# el total (salvo la tabla de textos compartidos al leer).
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{nombre}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+# Caracteres de control que XML 1.0 no admite
+_INVALIDOS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _celda(valor):
+    if valor is None or valor == '':
+        return '<c/>'
+    if isinstance(valor, bool):
+        valor = 'Sí' if valor else 'No'
+    elif isinstance(valor, (int, float)):
+        return f'<c><v>{valor}</v></c>'
+    texto = escape(_INVALIDOS.sub('', str(valor)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def escribir_xlsx(destino, encabezados, filas, nombre_hoja='Datos'):
+    """
+    Escribe un XLSX de una hoja en 'destino' (ruta o archivo binario).
+    Devuelve el número de filas de datos escritas.
+    """
+    total = 0
+    with zipfile.ZipFile(destino, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        zf.writestr('_rels/.rels', _RELS)
+        zf.writestr('xl/workbook.xml', _WORKBOOK.format(nombre=escape(nombre_hoja)))
+        zf.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+
+        with zf.open('xl/worksheets/sheet1.xml', 'w') as hoja:
+            hoja.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                b'<sheetData>'
+            )
+            hoja.write(('<row>' + ''.join(_celda(v) for v in encabezados) + '</row>').encode())
+            for fila in filas:
+                hoja.write(('<row>' + ''.join(_celda(v) for v in fila) + '</row>').encode())
+                total += 1
+            hoja.write(b'</sheetData></worksheet>')
+
+    return total
+
+
+# =========================
+# Lectura
+# =========================
+
+_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_NS_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_NS_PKG_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+_REF_RE = re.compile(r'^([A-Z]+)')
+
+
+def _indice_columna(referencia):
+    """
+    'A1' -> 0, 'C7' -> 2, 'AA3' -> 26.
+    """
+    letras = _REF_RE.match(referencia).group(1)
+    indice = 0
+    for letra in letras:
+        indice = indice * 26 + (ord(letra) - ord('A') + 1)
+    return indice - 1
+
+
+def _texto(elemento):
+    # Texto plano o con formato (varios <r><t>...</t></r>)
+    return ''.join(t.text or '' for t in elemento.iter(f'{_NS}t'))
+
+
+def _ruta_primera_hoja(zf):
+    try:
+        libro = ElementTree.fromstring(zf.read('xl/workbook.xml'))
+        relaciones = ElementTree.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+    except KeyError:
+        return 'xl/worksheets/sheet1.xml'
+
+    hoja = libro.find(f'{_NS}sheets/{_NS}sheet')
+    rel_id = hoja.get(f'{_NS_REL}id')
+    for rel in relaciones.iter(f'{_NS_PKG_REL}Relationship'):
+        if rel.get('Id') == rel_id:
+            destino = rel.get('Target')
+            if destino.startswith('/'):
+                return destino.lstrip('/')
+            return posixpath.normpath(posixpath.join('xl', destino))
+    return 'xl/worksheets/sheet1.xml'
+
+
+def _textos_compartidos(zf):
+    try:
+        contenido = zf.open('xl/sharedStrings.xml')
+    except KeyError:
+        return []
+    textos = []
+    with contenido:
+        for _, elemento in ElementTree.iterparse(contenido):
+            if elemento.tag == f'{_NS}si':
+                textos.append(_texto(elemento))
+                elemento.clear()
+    return textos
+
+
+def _valor_celda(celda, compartidos):
+    tipo = celda.get('t')
+    if tipo == 'inlineStr':
+        return _texto(celda)
+    v = celda.find(f'{_NS}v')
+    if v is None or v.text is None:
+        return None
+    if tipo == 's':
+        return compartidos[int(v.text)]
+    if tipo == 'b':
+        return v.text == '1'
+    if tipo in ('str', 'e'):
+        return v.text
+    numero = float(v.text)
+    return int(numero) if numero.is_integer() else numero
+
+
+# Día cero de las fechas de Excel (sistema 1900, con su 29/02/1900 ficticio)
+_EPOCA_EXCEL = date(1899, 12, 30)
+
+
+def fecha_desde_excel(numero):
+    return _EPOCA_EXCEL + timedelta(days=int(numero))
+
+
+def leer_xlsx(origen):
+    """
+    Genera las filas (listas de valores) de la primera hoja de 'origen'
+    (ruta o archivo binario con seek). Los números llegan como int/float:
+    las fechas de Excel son números de serie (ver fecha_desde_excel).
+    """
+    with zipfile.ZipFile(origen) as zf:
+        compartidos = _textos_compartidos(zf)
+        with zf.open(_ruta_primera_hoja(zf)) as hoja:
+            for _, elemento in ElementTree.iterparse(hoja):
+                if elemento.tag != f'{_NS}row':
+                    continue
+                fila = []
+                for celda in elemento.iter(f'{_NS}c'):
+                    referencia = celda.get('r')
+                    if referencia:
+                        # Las celdas vacías no se escriben: rellenar huecos
+                        fila.extend([None] * (_indice_columna(referencia) - len(fila)))
+                    fila.append(_valor_celda(celda, compartidos))
+                yield fila
+                elemento.clear()
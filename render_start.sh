@@ -2,4 +2,12 @@
 set -o errexit
 
 python manage.py migrate --no-input
-gunicorn flota.wsgi:application --timeout 600
+
+# FLOTA_SERVIDOR=asgi: workers de uvicorn (vistas async de dashboard,
+# documentos y detalle de vehículo). Por defecto, WSGI como siempre.
+# El número de workers lo toma gunicorn de WEB_CONCURRENCY.
+if [ "${FLOTA_SERVIDOR:-wsgi}" = "asgi" ]; then
+  exec gunicorn flota.asgi:application -k uvicorn_worker.UvicornWorker --timeout 600
+else
+  exec gunicorn flota.wsgi:application --timeout 600
+fi